@@ -1,6 +1,7 @@
 import tqdm
 import math
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import yfinance as yf
 import seaborn as sns
@@ -277,8 +278,11 @@ def define_label(data):
     #data = (data * STD[f'{tickers[0]}_close']) + MEAN[f'{tickers[0]}_close']
     return data
     
-# Shift the percentage change data to create labels
-labels = percent_change_data.shift(-1).map(define_label)
+# Shift the percentage change data to create labels; define_label is called once on the
+# whole numeric block instead of once per cell, so it has to be a vectorized function
+labels = percent_change_data.shift(-1)
+numeric = labels.select_dtypes('number').columns
+labels[numeric] = define_label(labels[numeric].to_numpy())
 
 # Drop the last row in both percent_change_data and labels as it won't have a corresponding label
 percent_change_data = percent_change_data.iloc[:-1]
@@ -289,34 +293,19 @@ labels = labels.iloc[:-1]
 ################################
 # Function to create X-day sequences for each ticker
 def create_sequences(data, datetime, labels, mean, std, sequence_length=SEQUENCE_LEN):
-    sequences = []
-    lab = []
-    data_size = len(data)
-    #datetime = data['Datetime'].values
-
-    for i in range(data_size - (sequence_length + 12)):
-        times = datetime[i:i + sequence_length]
-        sequence_ok = True  # A flag to indicate if the sequence is valid
-        
-        # Calculate time differences as total_seconds
-        # Need to ensure times is in a format that allows for subtraction and total_seconds calculation
-        #for j in range(1, len(times)):
-        #    delta = (times[j] - times[j-1]).astype('timedelta64[s]').astype(int)
-        #    if delta != 300:
-        #        sequence_ok = False
-        #        break
-        
-        # Only append the sequence if all timestamps are 5 minutes apart
-        if sequence_ok:
-            sequences.append(data[i:i + sequence_length])
-            lab.append([labels[i-1], labels[i+13], mean[0], std[0]])
-
-    #for i in range(10):
-    #    i *= -1
-    #    print(f'{sequences[i]=}')
-    #    print(f'{lab[i]=}')
-        
-    return np.array(sequences), np.array(lab)
+    # Every window start at once: windows are a strided view, labels two fancy-index gathers
+    # (labels[i-1] wraps to the last label for i == 0, as the original loop did)
+    n = max(0, len(data) - (sequence_length + 12))
+    if n == 0:
+        # too short for one labeled window (and sliding_window_view raises below sequence_length rows)
+        return np.empty((0, sequence_length) + data.shape[1:], dtype=data.dtype), np.empty((0, 4))
+    index = np.arange(n)
+    sequences = np.moveaxis(sliding_window_view(data, sequence_length, axis=0), -1, 1)[:n]
+    lab = np.column_stack([labels[index - 1],
+                           labels[index + 13],
+                           np.full(n, mean[0]),
+                           np.full(n, std[0])])
+    return np.array(sequences), lab
 
 ######################
 ## CREATE SEQUENCES ##
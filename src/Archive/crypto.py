@@ -9,14 +9,14 @@ import pandas as pd
 import numpy as np
 import robin_stocks.robinhood as robin_stocks
 
-from utils import utils, NN, upward_trend, resistance_line
+from utils import utils, NN, upward_trend, resistance_line, quote_service
 
 utils.login()
 
 #data = utils.collect_crypto_data("XLM", min_units=15, max_units=240, df=None)
 #while True:
 #    data = utils.collect_crypto_data("XLM", min_units=15, max_units=240, df=data)
-#    resistance_line.plot_ask_bid("XLM", data)
+#    resistance_line.plot_ask_bid("XLM", data.to_frame())
 #    time.sleep(10)
 #    
 #input()
@@ -36,8 +36,9 @@ utils.login()
 
 symbols = ['BTC', 'ETH', 'DOGE', 'SHIB', 'AVAX', 'ETC', 'UNI', 'LTC', 'LINK', 'XLM', 'BCH', 'XTZ', 'AAVE', 'COMP']
 spread_pcts = []
+scan = quote_service.CryptoClient().get_quotes(symbols)
 for symbol in symbols:
-    quote = robin_stocks.crypto.get_crypto_quote(symbol)
+    quote = scan[symbol]
     ask = float(quote["ask_price"])
     bid = float(quote["bid_price"])
     spread = ask - bid
@@ -105,10 +106,13 @@ def main():
         for key, value in position.items():
             print(f"{key} = {value}")
             
+    # quotes are polled in the background; order checks read the latest one instead of refetching
+    quote_feed = quote_service.QuoteService(quote_service.CryptoClient(), [symbol], interval=1.0).start()
+
     print("###########")
     print("## QUOTE ##")
     print("###########")
-    quote = robin_stocks.crypto.get_crypto_quote(symbol)
+    quote = quote_feed.latest(symbol)
     for key, value in quote.items():
         print(f"{key} = {value}")
     
@@ -153,7 +157,7 @@ def main():
         for buy_order_price in BUY_ORDER_PRICE:
 
             # get latest price
-            quote = robin_stocks.crypto.get_crypto_quote(symbol)
+            quote = quote_feed.latest(symbol)
             if quote is not None:
                 ask_price = float(quote["ask_price"])
                 bid_price = float(quote["bid_price"])
@@ -177,7 +181,7 @@ def main():
         for sell_order_price in SELL_ORDER_PRICE:
 
             # get latest price
-            quote = robin_stocks.crypto.get_crypto_quote(symbol)
+            quote = quote_feed.latest(symbol)
             if quote is not None:
                 ask_price = float(quote["ask_price"])
                 bid_price = float(quote["bid_price"])
@@ -321,8 +325,9 @@ def main():
                     #ORDER_IDS.append(order_id)
 
                     # get latest prices
-                    quote = robin_stocks.crypto.get_crypto_quote(symbol)
-                    
+                    quote = quote_feed.latest(symbol)
+                    if quote is None: print("503 Server Error: Service Unavailable for url"); continue
+
                     # Bid Price: The bid price is the highest price that a buyer is willing to pay
                     ask_price = float(quote["ask_price"])
                     bid_price = float(quote["bid_price"])
@@ -349,8 +354,9 @@ def main():
                     #ORDER_IDS.append(order_id)
 
                     # get latest prices
-                    quote = robin_stocks.crypto.get_crypto_quote(symbol)
-                    
+                    quote = quote_feed.latest(symbol)
+                    if quote is None: print("503 Server Error: Service Unavailable for url"); continue
+
                     # Asking Price: The asking price is the lowest price at which a seller is willing to sell
                     ask_price = float(quote["ask_price"])
                     bid_price = float(quote["bid_price"])
@@ -393,6 +399,8 @@ def main():
                                                                                                        METRIC=METRIC,
                                                                                                        plot_metrics=plot_metrics,
                                                                                                        PURCHASE=PURCHASE)
+        quote_feed.watch([symbol])
+
         # reset time
         start_time = time.time()
         
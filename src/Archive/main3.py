@@ -9,7 +9,7 @@ import pandas as pd
 import numpy as np
 import robin_stocks.robinhood as robin_stocks
 
-from utils import utils, NN, upward_trend, resistance_line
+from utils import utils, NN, upward_trend, resistance_line, quote_service, streaming
 
 utils.login()
 
@@ -28,8 +28,9 @@ symbols = [
     'XEL', 'ZM', 'ZS', 'NIO'
 ]
 spread_pcts = []
+scan = quote_service.StockClient().get_quotes(symbols)
 for symbol in symbols:
-    quote = robin_stocks.stocks.get_quotes(symbol, info=None)[0]
+    quote = scan[symbol]
     ask = float(quote["ask_price"])
     bid = float(quote["bid_price"])
     spread = ask - bid
@@ -84,8 +85,16 @@ def main():
     METRIC = "prices" # prices, volume, RSIs, macd, bollinger_bands
     min_units=15
     max_units=40
+
+    # indicator state is updated once per new quote instead of refit over the buffer
+    signals = streaming.SignalState(window=max_units)
+    signals_symbol = symbol
+    seen = 0
     
         
+    # quotes are polled in the background; order checks read the latest one instead of refetching
+    quote_feed = quote_service.QuoteService(quote_service.StockClient(), [symbol], interval=1.0).start()
+
     print(f"Processing symbol: {symbol}")
 
     start_cash = CASH
@@ -104,12 +113,24 @@ def main():
         ## METRICS ##
         #############
 
-        RESISTANCE_LINE = resistance_line.above_or_below_resistance_line(symbol, data, metric=METRIC, key="ask_price")
+        # a new symbol gets a new buffer (see utils.quote_buffer); restart the indicators and seed them from it
+        if signals_symbol != symbol:
+            signals = streaming.SignalState(window=max_units)
+            signals_symbol = symbol
+            seen = 0
+
+        _, new_asks, _ = data.latest(data.written - seen)
+        for ask_price in new_asks:
+            signals.update(ask_price)
+        seen = data.written
+
+        # fall back to the full refit while a metric is still warming up (e.g. RSI's first 15 quotes)
+        RESISTANCE_LINE = signals.signals(METRIC) or resistance_line.above_or_below_resistance_line(symbol, data.to_frame(), metric=METRIC, key="ask_price")
         print(f"Trading based on {METRIC}: {RESISTANCE_LINE[-10:]=}")
          
         if plot_metrics:
-            #resistance_line.plot_metrics_with_resistance(symbol, data)
-            resistance_line.plot_ask_bid(symbol, data)
+            #resistance_line.plot_metrics_with_resistance(symbol, data.to_frame())
+            resistance_line.plot_ask_bid(symbol, data.to_frame())
 
         ######################################
         ## check if any orders went through ##
@@ -117,7 +138,7 @@ def main():
         for buy_order_price in BUY_ORDER_PRICE:
 
             # get latest price
-            quote = robin_stocks.stocks.get_quotes(symbol)[0]
+            quote = quote_feed.latest(symbol)
             if quote is not None:
                 ask_price = float(quote["ask_price"])
                 bid_price = float(quote["bid_price"])
@@ -145,7 +166,7 @@ def main():
         for sell_order_price in SELL_ORDER_PRICE:
 
             # get latest price
-            quote = robin_stocks.stocks.get_quotes(symbol)[0]
+            quote = quote_feed.latest(symbol)
             if quote is not None:
                 ask_price = float(quote["ask_price"])
                 bid_price = float(quote["bid_price"])
@@ -192,8 +213,9 @@ def main():
                 if (CASH - current_price) > 0 and PURCHASE:
 
                     # get latest prices
-                    quote = robin_stocks.stocks.get_quotes(symbol)[0]
-                    
+                    quote = quote_feed.latest(symbol)
+                    if quote is None: print("503 Server Error: Service Unavailable for url"); continue
+
                     # Bid Price: The bid price is the highest price that a buyer is willing to pay
                     ask_price = float(quote["ask_price"])
                     bid_price = float(quote["bid_price"])
@@ -219,8 +241,9 @@ def main():
                 if len(BUY_PRICES) > 0:
 
                     # get latest prices
-                    quote = robin_stocks.stocks.get_quotes(symbol)[0]
-                    
+                    quote = quote_feed.latest(symbol)
+                    if quote is None: print("503 Server Error: Service Unavailable for url"); continue
+
                     # Asking Price: The asking price is the lowest price at which a seller is willing to sell
                     ask_price = float(quote["ask_price"])
                     bid_price = float(quote["bid_price"])
@@ -263,6 +286,8 @@ def main():
                                                                                                        METRIC=METRIC,
                                                                                                        plot_metrics=plot_metrics,
                                                                                                        PURCHASE=PURCHASE)
+        quote_feed.watch([symbol])
+
         # reset time
         start_time = time.time()
         
@@ -0,0 +1,74 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+##############################
+## Recursive filter kernels ##
+##############################
+# EMA, Wilder smoothing and MACD are all the first-order recursion
+#
+#     y[t] = decay * y[t-1] + gain * x[t]
+#
+# Compiled with numba when it is installed, otherwise solved in NumPy a block
+# at a time: inside a block the recursion has the closed form
+# y[s+j] = decay^(j+1) * (y[s-1] + cumsum(gain * x / decay^(i+1))[j]), and the
+# block length is capped so decay^-(j+1) stays well inside float range.
+
+MAX_SCALE = 1e6
+
+def _linear_filter_numpy(x, decay, gain, initial):
+    out = np.empty(len(x), dtype=np.float64)
+    if len(x) == 0:
+        return out
+    if decay <= 0.0:
+        out[:] = gain * x
+        return out
+
+    block = max(1, int(np.log(MAX_SCALE) / -np.log(decay))) if decay < 1.0 else len(x)
+    powers = decay ** np.arange(1, min(block, len(x)) + 1)
+
+    previous = initial
+    for start in range(0, len(x), block):
+        chunk = gain * x[start:start + block]
+        scale = powers[:len(chunk)]
+        out[start:start + len(chunk)] = scale * (previous + np.cumsum(chunk / scale))
+        previous = out[start + len(chunk) - 1]
+    return out
+
+def _linear_filter_loop(x, decay, gain, initial):
+    out = np.empty(len(x), dtype=np.float64)
+    previous = initial
+    for t in range(len(x)):
+        previous = decay * previous + gain * x[t]
+        out[t] = previous
+    return out
+
+if njit is not None:
+    _linear_filter = njit(cache=True)(_linear_filter_loop)
+else:
+    _linear_filter = _linear_filter_numpy
+
+def linear_filter(x, decay, gain, initial=0.0):
+    """y[t] = decay * y[t-1] + gain * x[t] with y[-1] = initial."""
+    return _linear_filter(np.ascontiguousarray(x, dtype=np.float64), float(decay), float(gain), float(initial))
+
+def ema(x, span):
+    """Exponential moving average, as pandas ewm(span=span, adjust=False).mean()."""
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) == 0:
+        return x.copy()
+    alpha = 2.0 / (span + 1.0)
+    # seeding with y[-1] = x[0] makes y[0] = x[0], as pandas does
+    return linear_filter(x, 1.0 - alpha, alpha, x[0])
+
+def wilder(x, n, initial):
+    """Wilder smoothing y[t] = (y[t-1] * (n - 1) + x[t]) / n, starting from initial."""
+    return linear_filter(x, (n - 1.0) / n, 1.0 / n, initial)
+
+def macd(prices, short_window=12, long_window=26, signal_window=9):
+    """MACD line and signal line of prices."""
+    line = ema(prices, short_window) - ema(prices, long_window)
+    return line, ema(line, signal_window)
@@ -0,0 +1,167 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import robin_stocks.robinhood as robin_stocks
+
+###################
+## Quote clients ##
+###################
+# A client is anything with get_quotes(symbols) -> {symbol: quote}, where a quote
+# is a dict with at least "ask_price", "bid_price" and "updated_at" (the fields
+# robin_stocks returns) and a symbol the broker had no quote for maps to None.
+# QuoteService only talks to that method, so a FakeClient can stand in for the
+# broker when running the strategy offline.
+
+class StockClient:
+    """Robinhood stock quotes: every symbol in one get_quotes request."""
+    def get_quotes(self, symbols):
+        quotes = robin_stocks.stocks.get_quotes(list(symbols), info=None) or []
+        by_symbol = {quote["symbol"]: quote for quote in quotes if quote is not None}
+        return {symbol: by_symbol.get(symbol) for symbol in symbols}
+
+class CryptoClient:
+    """Robinhood crypto quotes. There is no batch endpoint, so symbols are fetched concurrently."""
+    def __init__(self, workers=8):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def _get_quote(self, symbol):
+        try:
+            return robin_stocks.crypto.get_crypto_quote(symbol)
+        except Exception as e:
+            print(f"{symbol}: {e}")
+            return None
+
+    def get_quotes(self, symbols):
+        symbols = list(symbols)
+        return dict(zip(symbols, self.pool.map(self._get_quote, symbols)))
+
+class FakeClient:
+    """Serves quotes set with set_quote (or a price function) instead of calling the broker."""
+    def __init__(self, price_fn=None, spread=0.0):
+        self.price_fn = price_fn
+        self.spread = spread
+        self.quotes = {}
+        self.requests = 0
+
+    def set_quote(self, symbol, ask_price, bid_price, updated_at=None):
+        self.quotes[symbol] = {"symbol": symbol,
+                               "ask_price": str(ask_price),
+                               "bid_price": str(bid_price),
+                               "updated_at": updated_at or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+
+    def get_quotes(self, symbols):
+        self.requests += 1
+        if self.price_fn is not None:
+            for symbol in symbols:
+                price = self.price_fn(symbol)
+                self.set_quote(symbol, price + self.spread / 2, price - self.spread / 2)
+        return {symbol: self.quotes.get(symbol) for symbol in symbols}
+
+###################
+## Quote service ##
+###################
+
+class QuoteService:
+    """
+    Polls a client for every watched symbol on a fixed cadence in a background
+    thread and keeps the latest quote per symbol, so the trading loop reads
+    quotes from memory instead of making a round-trip per pending order.
+
+    Parameters:
+    - client: Object with get_quotes(symbols), see above.
+    - symbols (list): Symbols to watch.
+    - interval (float): Seconds between polls. Default is 1.
+    """
+    def __init__(self, client, symbols, interval=1.0):
+        self.client = client
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.quotes = {}
+        self.received = {}
+        self.version = 0
+        self.error = None
+        self._updated = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Fetch every watched symbol once and publish the result."""
+        try:
+            quotes = self.client.get_quotes(self.symbols)
+        except Exception as e:
+            # keep serving the previous quotes; age() tells how old they are getting
+            self.error = e
+            print(f"Quote poll failed: {e}")
+            return
+        received = time.time()
+        with self._updated:
+            for symbol, quote in quotes.items():
+                if quote is not None:
+                    self.quotes[symbol] = quote
+                    self.received[symbol] = received
+            self.error = None
+            self.version += 1
+            self._updated.notify_all()
+
+    def _run(self):
+        started = time.time()
+        while not self._stop.wait(max(0.0, self.interval - (time.time() - started))):
+            started = time.time()
+            self.poll()
+
+    def start(self):
+        """Poll once so quotes are available immediately, then keep polling in the background."""
+        self.poll()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def watch(self, symbols):
+        """
+        Replace the watched symbols (e.g. after the user switches ticker) and poll
+        once right away, so latest() has the new symbols' quotes on return instead
+        of after the next background poll. The trading loops call this every
+        iteration, so an unchanged list is a no-op.
+        """
+        symbols = list(symbols)
+        with self._updated:
+            if symbols == self.symbols:
+                return
+            self.symbols = symbols
+        self.poll()
+
+    def latest(self, symbol):
+        """Latest quote for symbol, or None if none has arrived yet."""
+        with self._updated:
+            return self.quotes.get(symbol)
+
+    def age(self, symbol):
+        """Seconds since symbol's latest quote was received, or None if none has arrived yet."""
+        with self._updated:
+            received = self.received.get(symbol)
+        return None if received is None else time.time() - received
+
+    def snapshot(self):
+        """Copy of the latest quote of every symbol."""
+        with self._updated:
+            return dict(self.quotes)
+
+    def wait(self, version, timeout=None):
+        """Block until a poll newer than version has been published; returns the current version."""
+        with self._updated:
+            self._updated.wait_for(lambda: self.version > version, timeout=timeout)
+            return self.version
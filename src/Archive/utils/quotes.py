@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+#################
+## Quote store ##
+#################
+# Fixed-capacity ring buffer of (Datetime, ask_price, bid_price) quotes backed
+# by NumPy arrays. Every quote is written twice, at i and i + capacity, so the
+# last `capacity` quotes always sit contiguously in time order and the column
+# views below are slices, never copies. Inserting is O(1): two writes and an
+# index bump, with no sort, no membership scan and no re-trim.
+
+def to_datetime64(timestamp):
+    """Parse a quote's updated_at into a tz-naive (UTC) datetime64[ns]."""
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    return timestamp.to_datetime64().astype('datetime64[ns]')
+
+class QuoteBuffer:
+    """The last `capacity` quotes of one symbol, oldest first."""
+
+    def __init__(self, capacity, symbol=None):
+        self.capacity = capacity
+        self.symbol = symbol
+        self._datetime = np.zeros(2 * capacity, dtype='datetime64[ns]')
+        self._ask = np.zeros(2 * capacity, dtype=np.float64)
+        self._bid = np.zeros(2 * capacity, dtype=np.float64)
+        self._next = 0  # ring slot the next quote goes to
+        self._size = 0
+        # total quotes ever stored, so a reader can tell how many arrived since it last looked
+        self.written = 0
+
+    def __len__(self):
+        return self._size
+
+    def _slice(self):
+        # the window ends on the mirrored copy of the newest quote
+        end = self._next + self.capacity if self._size else 0
+        return slice(end - self._size, end)
+
+    @property
+    def last_datetime(self):
+        return self._datetime[self._next + self.capacity - 1] if self._size else None
+
+    def append(self, datetime, ask_price, bid_price):
+        """
+        Add one quote unless it is not newer than the last one stored.
+
+        Quotes of one symbol arrive in time order, so comparing against the
+        last timestamp both de-duplicates a re-polled quote and drops stale
+        ones. A buffer only ever holds one symbol (see utils.quote_buffer), so
+        a switch never compares against another symbol's timestamps.
+
+        Returns:
+        - bool: True if the quote was stored.
+        """
+        datetime = to_datetime64(datetime)
+        if self._size and datetime <= self.last_datetime:
+            return False
+
+        i = self._next
+        for column, value in ((self._datetime, datetime), (self._ask, ask_price), (self._bid, bid_price)):
+            column[i] = value
+            column[i + self.capacity] = value
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.written += 1
+        return True
+
+    @property
+    def datetime(self):
+        return self._datetime[self._slice()]
+
+    @property
+    def ask_price(self):
+        return self._ask[self._slice()]
+
+    @property
+    def bid_price(self):
+        return self._bid[self._slice()]
+
+    def __getitem__(self, key):
+        """Column view by name, so data['ask_price'] keeps working where data used to be a DataFrame."""
+        if key == 'Datetime': return self.datetime
+        if key == 'ask_price': return self.ask_price
+        if key == 'bid_price': return self.bid_price
+        raise KeyError(key)
+
+    def latest(self, n):
+        """Views of the newest n quotes (fewer if the buffer holds fewer)."""
+        n = min(n, len(self))
+        return self.datetime[len(self) - n:], self.ask_price[len(self) - n:], self.bid_price[len(self) - n:]
+
+    def resized(self, capacity):
+        """A copy holding the newest quotes in a buffer of a different capacity."""
+        buffer = QuoteBuffer(capacity, self.symbol)
+        for row in zip(*self.latest(capacity)):
+            buffer.append(*row)
+        buffer.written = self.written
+        return buffer
+
+    def to_frame(self):
+        """Copy the buffer into the DataFrame layout the plotting and batch signal code expects."""
+        return pd.DataFrame({'Datetime': self.datetime, 'ask_price': self.ask_price, 'bid_price': self.bid_price})
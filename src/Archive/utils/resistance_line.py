@@ -5,6 +5,8 @@ import matplotlib.pyplot as plt
 
 import yfinance as yf
 
+from utils import kernels
+
 #####################
 ## Resistance Line ##
 #####################
@@ -154,37 +156,27 @@ def plot_metrics_with_resistance(ticker, data):
     plt.pause(2)
 
 def calculate_rsi(prices, n=14):
+    prices = np.asarray(prices)
     deltas = np.diff(prices)
     seed = deltas[:n + 1]
     up = seed[seed >= 0].sum() / n
     down = -seed[seed < 0].sum() / n
-    rs = up / down
     rsi = np.zeros_like(prices)
-    rsi[:n] = 100. - 100. / (1. + rs)
-
-    for i in range(n, len(prices)):
-        delta = deltas[i - 1]  # cause the diff is 1 shorter
-
-        if delta > 0:
-            upval = delta
-            downval = 0.
-        else:
-            upval = 0.
-            downval = -delta
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi[:n] = 100. - 100. / (1. + up / down)
 
-        up = (up * (n - 1) + upval) / n
-        down = (down * (n - 1) + downval) / n
-
-        rs = up / down
-        rsi[i] = 100. - 100. / (1. + rs)
+        # Wilder smoothing of the gains and losses from bar n on (the diff is 1 shorter)
+        deltas = deltas[n - 1:]
+        up = kernels.wilder(np.clip(deltas, 0., None), n, up)
+        down = kernels.wilder(np.clip(-deltas, 0., None), n, down)
+        rsi[n:] = 100. - 100. / (1. + up / down)
 
     return rsi
 
 def calculate_macd(prices, short_window=12, long_window=26, signal_window=9):
-    exp_short = prices.ewm(span=short_window, adjust=False).mean()
-    exp_long = prices.ewm(span=long_window, adjust=False).mean()
-    macd = exp_short - exp_long
-    signal = macd.ewm(span=signal_window, adjust=False).mean()
+    macd, signal = kernels.macd(np.asarray(prices), short_window, long_window, signal_window)
+    if isinstance(prices, pd.Series):
+        return pd.Series(macd, index=prices.index), pd.Series(signal, index=prices.index)
     return macd, signal
 
 def calculate_bollinger_bands(prices, window=20, k=2):
@@ -196,50 +188,44 @@ def calculate_bollinger_bands(prices, window=20, k=2):
 
 def above_or_below_resistance_line(ticker, data, metric=None, key="Close"):
     #data = yf.download(ticker, period=peroid, interval=interval, progress=False)
-    minute_data = data.reset_index().to_dict('records')
-    prices = np.array([point[key] for point in minute_data])
+    prices = data[key].to_numpy(dtype=np.float64)
     resistance_line = find_resistance_line(prices)
 
-    if metric == "volume":
-        volumes = np.array([point['Volume'] for point in minute_data])
-        volume_resistance_line = find_resistance_line(volumes)
-    
-    rsi = calculate_rsi(prices)
-    rsi_resistance_line = find_resistance_line(rsi)
-    
-    prices_series = pd.Series(prices)
-    macd, signal = calculate_macd(prices_series)
-    upper_band, lower_band = calculate_bollinger_bands(prices_series)
-    
+    # Each metric is only computed once it is needed, so a single-metric call
+    # returns before the indicators it does not use are evaluated.
+
     # Compare each price data point with the resistance line
-    PRICES = ['Above' if price > resistance_line[i] else 'Below' for i, price in enumerate(prices)]
+    PRICES = np.where(prices > resistance_line, 'Above', 'Below').tolist()
     if metric == "prices": return PRICES
 
     # Compare each volume with the resistance line
-    VOL = ['Above' if volume > volume_resistance_line[i] else 'Below' for i, volume in enumerate(volumes)]
+    volumes = data['Volume'].to_numpy(dtype=np.float64)
+    volume_resistance_line = find_resistance_line(volumes)
+    VOL = np.where(volumes > volume_resistance_line, 'Above', 'Below').tolist()
     if metric == "volume": return VOL
 
     # Compare each RSIs value with the resistance line
-    RSI = ['Above' if value > rsi_resistance_line[i] else 'Below' for i, value in enumerate(rsi)]
+    rsi = calculate_rsi(prices)
+    rsi_resistance_line = find_resistance_line(rsi)
+    RSI = np.where(rsi > rsi_resistance_line, 'Above', 'Below').tolist()
     if metric == "RSIs": return RSI
 
     # Compare each MACD value with the signal line and the resistance line
-    MACD = ['Above' if macd[i] > signal[i] and prices[i] > resistance_line[i] else 'Below' for i in range(len(macd))]
+    macd, signal = kernels.macd(prices)
+    MACD = np.where((macd > signal) & (prices > resistance_line), 'Above', 'Below').tolist()
     if metric == "macd": return MACD
 
     # Compare each price with the resistance line, upper band, and lower band
-    bollinger_bands = []
-    for i, price in enumerate(prices):
-        if price > resistance_line[i] and price > upper_band[i]:
-            bollinger_bands.append('Above (Breakout)')
-        elif price > resistance_line[i] and price <= upper_band[i]:
-            bollinger_bands.append('Above')
-        elif price < resistance_line[i] and price < lower_band[i]:
-            bollinger_bands.append('Below (Breakout)')
-        elif price < resistance_line[i] and price >= lower_band[i]:
-            bollinger_bands.append('Below')
-        else:
-            bollinger_bands.append('Equal to Resistance Line')
+    upper_band, lower_band = calculate_bollinger_bands(pd.Series(prices))
+    upper_band, lower_band = upper_band.to_numpy(), lower_band.to_numpy()
+    above = prices > resistance_line
+    below = prices < resistance_line
+    bollinger_bands = np.select([above & (prices > upper_band),
+                                 above & (prices <= upper_band),
+                                 below & (prices < lower_band),
+                                 below & (prices >= lower_band)],
+                                ['Above (Breakout)', 'Above', 'Below (Breakout)', 'Below'],
+                                default='Equal to Resistance Line').tolist()
     if metric == "bollinger_bands": return bollinger_bands
     
     return PRICES, VOL, RSI, MACD, bollinger_bands
@@ -0,0 +1,218 @@
+from collections import deque
+
+import numpy as np
+
+#################################
+## Streaming (O(1)) indicators ##
+#################################
+# Each class keeps just enough running state to produce the next value from
+# one new price, so a live loop pays a constant cost per tick instead of
+# recomputing over its whole buffer. Fed a series one price at a time they
+# reproduce the batch functions in resistance_line.py / kernels.py for the
+# same series.
+
+class RollingStats:
+    """Rolling mean and sample std over the last `window` prices (min_periods=1), via a sliding Welford update."""
+    def __init__(self, window=20):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, price):
+        price = float(price)
+        self.values.append(price)
+        delta = price - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (price - self.mean)
+
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            delta = old - self.mean
+            self.mean -= delta / len(self.values)
+            self.m2 -= delta * (old - self.mean)
+
+        return self.mean, self.std
+
+    @property
+    def std(self):
+        n = len(self.values)
+        return np.sqrt(max(self.m2, 0.0) / (n - 1)) if n > 1 else np.nan
+
+class BollingerBands:
+    """Streaming resistance_line.calculate_bollinger_bands."""
+    def __init__(self, window=20, k=2):
+        self.k = k
+        self.stats = RollingStats(window)
+
+    def update(self, price):
+        mean, std = self.stats.update(price)
+        return mean + self.k * std, mean - self.k * std
+
+class EMA:
+    """Streaming ewm(span=span, adjust=False).mean(), seeded with the first price."""
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def update(self, price):
+        price = float(price)
+        if self.value is None:
+            self.value = price
+        else:
+            self.value += self.alpha * (price - self.value)
+        return self.value
+
+class MACD:
+    """Streaming kernels.macd: (macd, signal) after every price."""
+    def __init__(self, short_window=12, long_window=26, signal_window=9):
+        self.short = EMA(short_window)
+        self.long = EMA(long_window)
+        self.signal = EMA(signal_window)
+
+    def update(self, price):
+        macd = self.short.update(price) - self.long.update(price)
+        return macd, self.signal.update(macd)
+
+class WilderRSI:
+    """
+    Streaming resistance_line.calculate_rsi.
+
+    The batch version seeds its averages from the first n + 1 price changes,
+    so values exist from the (n + 2)th price on; update returns None before that.
+    """
+    def __init__(self, n=14):
+        self.n = n
+        self.previous = None
+        self.seed = []
+        self.up = None
+        self.down = None
+
+    def _smooth(self, delta):
+        self.up = (self.up * (self.n - 1) + max(delta, 0.0)) / self.n
+        self.down = (self.down * (self.n - 1) + max(-delta, 0.0)) / self.n
+
+    def update(self, price):
+        price = float(price)
+        if self.previous is None:
+            self.previous = price
+            return None
+        delta = price - self.previous
+        self.previous = price
+
+        if self.up is None:
+            self.seed.append(delta)
+            if len(self.seed) < self.n + 1:
+                return None
+            seed = np.array(self.seed)
+            self.up = seed[seed >= 0].sum() / self.n
+            self.down = -seed[seed < 0].sum() / self.n
+            # the batch recursion starts again from the last two seed deltas
+            self._smooth(self.seed[-2])
+            self._smooth(self.seed[-1])
+            self.seed = None
+        else:
+            self._smooth(delta)
+
+        return self.value
+
+    @property
+    def value(self):
+        if self.up is None:
+            return None
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100. - 100. / (1. + np.float64(self.up) / self.down)
+
+class ResistanceLine:
+    """
+    Least-squares line through the last `window` prices (all prices if None),
+    as resistance_line.find_resistance_line fits over a buffer. update returns
+    the line's value at the newest price.
+    """
+    def __init__(self, window=None):
+        self.window = window
+        self.values = deque()
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+
+    def update(self, price):
+        price = float(price)
+        self.sum_xy += len(self.values) * price
+        self.sum_y += price
+        self.values.append(price)
+
+        if self.window is not None and len(self.values) > self.window:
+            # drop the oldest point and shift every x index down by one
+            old = self.values.popleft()
+            self.sum_y -= old
+            self.sum_xy -= self.sum_y
+
+        return self.value
+
+    @property
+    def value(self):
+        n = len(self.values)
+        if n < 2:
+            return self.sum_y
+        sum_x = n * (n - 1) / 2.0
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6.0
+        slope = (n * self.sum_xy - sum_x * self.sum_y) / (n * sum_xx - sum_x ** 2)
+        intercept = (self.sum_y - slope * sum_x) / n
+        return intercept + slope * (n - 1)
+
+class SignalState:
+    """
+    Latest above_or_below_resistance_line signal for every metric, updated per tick.
+
+    window is the buffer length the batch version would see (max_units in the
+    live loops); it bounds the resistance-line fits. Volume is optional since
+    quote streams only carry prices.
+
+    The batch version restarts RSI and MACD from the first quote of the buffer
+    on every tick. Here they are recursive over every quote fed since the state
+    was created, i.e. the usual definition of the indicators rather than one
+    truncated to the buffer, so their values (and the RSI / MACD signals) can
+    differ from the batch ones while the other metrics match. A state only ever
+    covers one symbol: create a new one when the traded symbol changes and feed
+    it the new symbol's buffer to seed it.
+    """
+    METRICS = ("prices", "volume", "RSIs", "macd", "bollinger_bands")
+
+    def __init__(self, window=None, history=10):
+        self.price_line = ResistanceLine(window)
+        self.volume_line = ResistanceLine(window)
+        self.rsi = WilderRSI()
+        self.rsi_line = ResistanceLine(window)
+        self.macd = MACD()
+        self.bands = BollingerBands()
+        self.history = {metric: deque(maxlen=history) for metric in self.METRICS}
+
+    def update(self, price, volume=None):
+        price = float(price)
+        line = self.price_line.update(price)
+        above, below = price > line, price < line
+        self.history["prices"].append('Above' if above else 'Below')
+
+        if volume is not None:
+            self.history["volume"].append('Above' if volume > self.volume_line.update(volume) else 'Below')
+
+        rsi = self.rsi.update(price)
+        if rsi is not None:
+            self.history["RSIs"].append('Above' if rsi > self.rsi_line.update(rsi) else 'Below')
+
+        macd, signal = self.macd.update(price)
+        self.history["macd"].append('Above' if macd > signal and above else 'Below')
+
+        upper, lower = self.bands.update(price)
+        if above and price > upper: band = 'Above (Breakout)'
+        elif above and price <= upper: band = 'Above'
+        elif below and price < lower: band = 'Below (Breakout)'
+        elif below and price >= lower: band = 'Below'
+        else: band = 'Equal to Resistance Line'
+        self.history["bollinger_bands"].append(band)
+
+        return {metric: values[-1] for metric, values in self.history.items() if values}
+
+    def signals(self, metric):
+        """The last few signals for a metric, oldest first."""
+        return list(self.history[metric])
@@ -10,6 +10,8 @@ import tensorflow as tf
 import pyotp
 import robin_stocks.robinhood as robin_stocks
 
+from utils import quotes
+
 # Colors
 black = '\033[30m'
 red = '\033[31m'
@@ -29,10 +31,18 @@ light_gray = '\033[37m'
 white = '\033[37m'
 reset = '\033[0m'
 
+def quote_buffer(df, max_units, symbol=None):
+    """Return a quotes.QuoteBuffer of symbol holding max_units quotes, creating or growing df as needed."""
+    if df is None or df.symbol != symbol:
+        # a new symbol starts an empty buffer; its quotes are never compared with the old symbol's
+        return quotes.QuoteBuffer(max_units, symbol)
+    if df.capacity != max_units:
+        return df.resized(max_units)
+    return df
+
 def collect_crypto_data(symbol, min_units=1, max_units=1, df=None):
 
-    if df is None:
-        df = pd.DataFrame(columns=['Datetime', 'ask_price', 'bid_price'])
+    df = quote_buffer(df, max_units, symbol)
 
     while True:
         quote = robin_stocks.crypto.get_crypto_quote(symbol)
@@ -41,16 +51,8 @@ def collect_crypto_data(symbol, min_units=1, max_units=1, df=None):
         bid_price = float(quote["bid_price"])
         updated_at = quote["updated_at"]
         
-        new_row = {'Datetime': pd.to_datetime(updated_at), 'ask_price': ask_price, 'bid_price': bid_price}
-
-        # Check if the new row already exists in the DataFrame
-        if new_row['Datetime'] not in df['Datetime'].values:
-            df = df.append(new_row, ignore_index=True)
-            df.sort_values(by='Datetime', inplace=True)
-            df.reset_index(drop=True, inplace=True)
-
-        # remove first element if too long
-        if len(df) > max_units: df = df.iloc[1:]
+        # skipped if it is not newer than the last stored quote; the oldest drops out once full
+        df.append(updated_at, ask_price, bid_price)
 
         # exit loop
         if len(df) >= min_units: break
@@ -69,8 +71,7 @@ def collect_stock_data(symbol, min_units=1, max_units=1, downtime=1, df=None):
     target_hour = 13
     target_minute = 0
     
-    if df is None:
-        df = pd.DataFrame(columns=['Datetime', 'ask_price', 'bid_price'])
+    df = quote_buffer(df, max_units, symbol)
 
     while True:
        #if (current_hour, current_minute) >= (target_hour, target_minute):
@@ -87,16 +88,8 @@ def collect_stock_data(symbol, min_units=1, max_units=1, downtime=1, df=None):
         bid_price = float(quote["bid_price"])
         updated_at = quote["updated_at"]
         
-        new_row = {'Datetime': pd.to_datetime(updated_at), 'ask_price': ask_price, 'bid_price': bid_price}
-
-        # Check if the new row already exists in the DataFrame
-        if new_row['Datetime'] not in df['Datetime'].values:
-            df = df.append(new_row, ignore_index=True)
-            df.sort_values(by='Datetime', inplace=True)
-            df.reset_index(drop=True, inplace=True)
-
-        # remove first element if too long
-        if len(df) > max_units: df = df.iloc[1:]
+        # skipped if it is not newer than the last stored quote; the oldest drops out once full
+        df.append(updated_at, ask_price, bid_price)
 
         # sleep
         time.sleep(downtime)
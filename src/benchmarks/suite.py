@@ -0,0 +1,226 @@
+"""
+End-to-end benchmark suite on synthetic data, compared against a stored baseline.
+
+Generates seeded OHLCV bars for N tickers x T bars (benchmarks/synthetic.py,
+no network access) and times each stage of the pipeline:
+
+    indicators        utils/indicators.compute_features over the (T x tickers) panel
+    build_features    utils/features.build_features per ticker (indicators, z-score, IQR mask)
+    create_sequences  window views and labels for every ticker
+    assemble          the 90/5/5 split, concatenation and shuffle transformer.py does
+    stream_batches    batches drawn from the utils/dataset.py tf.data pipeline
+    fit_steps         a fixed number of model.fit steps of build_transformer_model
+    predict_single    latency of one window through the model
+    predict_batch     latency of one batch of windows
+
+Each benchmark reports the median seconds over --repeats runs. Results are
+compared against benchmarks/baseline.json (recorded with the same config),
+and anything more than --tolerance slower is flagged. Run from src/:
+
+    python -m benchmarks.suite                  # compare against the baseline
+    python -m benchmarks.suite --check          # exit 1 on a regression (for CI)
+    python -m benchmarks.suite --save-baseline  # record a new baseline
+
+benchmarks/training.py covers train-step throughput per fast-mode configuration.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+CONFIG = {'tickers': 8, 'bars': 5000, 'seed': 0,
+          'batch_size': 512, 'fit_steps': 20, 'stream_batches': 20, 'predict_calls': 50,
+          'head_size': 12, 'num_heads': 8, 'ff_dim': 24, 'num_layers': 2, 'dropout': 0.9}
+
+# Keys that have to match for a baseline to be comparable (repeats and tolerance do not)
+COMPARABLE = tuple(CONFIG)
+
+def timed(fn, repeats, per=1):
+    """Median and minimum wall time of fn() over repeats calls, divided by per (e.g. calls made inside fn)."""
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        seconds.append((time.perf_counter() - start) / per)
+    return {'seconds': float(np.median(seconds)), 'min': float(np.min(seconds)), 'repeats': repeats}
+
+def machine():
+    import tensorflow as tf
+    return {'host': socket.gethostname(), 'platform': platform.platform(), 'python': platform.python_version(),
+            'cpus': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__, 'tensorflow': tf.__version__}
+
+def run(config=CONFIG, repeats=5, only=None):
+    """
+    Run every benchmark (or the ones named in only) on synthetic data.
+
+    Parameters:
+    - config (dict): Universe size, batch sizes and model shape, see CONFIG.
+    - repeats (int): Timed runs per benchmark.
+    - only (list): Benchmark names to run. Default is all of them.
+
+    Returns:
+    - dict: {'config', 'machine', 'results'} where results maps benchmark -> timing.
+    """
+    import tensorflow as tf
+    from utils import artifact, dataset, features, indicators, models, panel
+    from utils import sequences as seq
+
+    tf.keras.utils.set_random_seed(config['seed'])
+    results = {}
+
+    def bench(name, fn, per=1):
+        if only and name not in only:
+            return
+        results[name] = timed(fn, repeats, per)
+        print(f"{name:<18} {results[name]['seconds'] * 1000:12.3f} ms")
+
+    # Data preparation
+    bars = synthetic.ohlcv_panel(config['tickers'], config['bars'], config['seed'])
+    close, volume = bars['Close'].to_numpy(), bars['Volume'].to_numpy()
+    tickers = list(bars['Close'].columns)
+    per_ticker = {t: pd.DataFrame({column: frame[t] for column, frame in bars.items()}) for t in tickers}
+
+    bench("indicators", lambda: indicators.compute_features(close, volume))
+    bench("build_features", lambda: [features.build_features(t, per_ticker[t]) for t in tickers])
+
+    # The normalized per-ticker matrices transformer.py trains on
+    frames, stats = [], {}
+    for ticker in tickers:
+        cleaned, ticker_stats, _ = features.build_features(ticker, per_ticker[ticker])
+        cleaned = cleaned.reset_index()
+        cleaned['Datetime'] = cleaned['Datetime'].dt.tz_localize(None)
+        frames.append(cleaned)
+        stats[ticker] = (ticker_stats[ticker + '_close_mean'], ticker_stats[ticker + '_close_std'])
+    ticker_panel = panel.from_frames(frames, tickers, artifact.MODEL_FEATURES).drop_last()
+    matrices = ticker_panel.matrices()
+    means = [stats[t][0] for t in tickers]
+    stds = [stats[t][1] for t in tickers]
+
+    def create_sequences():
+        return [seq.create_sequences(m, mean, std) for m, mean, std in zip(matrices, means, stds)]
+
+    def assemble():
+        parts = {split: ([], []) for split in dataset.SPLITS}
+        for sequences, labels in create_sequences():
+            for split in dataset.SPLITS:
+                start, stop = dataset.split_range(len(sequences), split)
+                parts[split][0].append(sequences[start:stop])
+                parts[split][1].append(labels[start:stop])
+        arrays = {split: (np.concatenate(s), np.concatenate(l)) for split, (s, l) in parts.items()}
+        order = np.random.default_rng(42).permutation(len(arrays['train'][0]))
+        arrays['train'] = (arrays['train'][0][order], arrays['train'][1][order])
+        return arrays
+
+    bench("create_sequences", create_sequences)
+    bench("assemble", assemble)
+
+    train = dataset.make_datasets(matrices, means, stds, splits=('train',), batch_size=config['batch_size'])['train']
+    bench("stream_batches", lambda: [None for _ in train.take(config['stream_batches'])])
+
+    # Training steps and inference latency
+    train_sequences, train_labels = assemble()['train']
+    window = train_sequences.shape[1:]
+    model = models.build_transformer_model(window, config['head_size'], config['num_heads'], config['ff_dim'],
+                                           config['num_layers'], config['dropout'])
+    models.compile_model(model, models.directional_bce_loss)
+
+    samples = config['fit_steps'] * config['batch_size']
+    x, y = train_sequences[:samples], train_labels[:samples]
+    model.fit(x[:config['batch_size']], y[:config['batch_size']], batch_size=config['batch_size'], epochs=1, verbose=0)
+    bench("fit_steps", lambda: model.fit(x, y, batch_size=config['batch_size'], epochs=1, shuffle=False, verbose=0))
+
+    @tf.function
+    def serve(windows):
+        return model(windows, training=False)
+
+    single = tf.constant(train_sequences[:1])
+    batch = tf.constant(train_sequences[:config['batch_size']])
+    serve(single), serve(batch)  # trace both shapes before timing
+
+    calls = config['predict_calls']
+    bench("predict_single", lambda: [serve(single).numpy() for _ in range(calls)], per=calls)
+    bench("predict_batch", lambda: [serve(batch).numpy() for _ in range(calls)], per=calls)
+
+    return {'config': dict(config), 'machine': machine(), 'results': results}
+
+def compare(report, baseline, tolerance=0.25):
+    """
+    Ratio of every result to the baseline.
+
+    Returns:
+    - pandas.DataFrame: Indexed by benchmark with baseline / current seconds, their
+                        ratio and a status of 'ok', 'faster', 'REGRESSION' or 'new'.
+    """
+    rows = []
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            rows.append({'benchmark': name, 'baseline': np.nan, 'current': result['seconds'], 'ratio': np.nan, 'status': 'new'})
+            continue
+        ratio = result['seconds'] / base['seconds']
+        status = 'REGRESSION' if ratio > 1 + tolerance else 'faster' if ratio < 1 - tolerance else 'ok'
+        rows.append({'benchmark': name, 'baseline': base['seconds'], 'current': result['seconds'], 'ratio': ratio, 'status': status})
+    return pd.DataFrame(rows).set_index('benchmark')
+
+def comparable(report, baseline):
+    """Config keys that differ between a report and a baseline."""
+    return [key for key in COMPARABLE if report['config'].get(key) != baseline['config'].get(key)]
+
+def load(path):
+    with open(path, "r") as file:
+        return json.load(file)
+
+def save(path, report):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark data preparation, training steps and inference latency on synthetic data.')
+    parser.add_argument('--tickers', type=int, default=CONFIG['tickers'], help='Synthetic tickers')
+    parser.add_argument('--bars', type=int, default=CONFIG['bars'], help='Bars per ticker')
+    parser.add_argument('--fit-steps', type=int, default=CONFIG['fit_steps'], help='Timed model.fit steps')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per benchmark (the median is reported)')
+    parser.add_argument('--only', nargs='+', default=None, help='Benchmarks to run (default: all)')
+    parser.add_argument('--baseline', default=BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown before a result is a regression')
+    parser.add_argument('--out', default=None, help='Also write this run as JSON')
+    parser.add_argument('--save-baseline', action='store_true', help='Write this run to --baseline instead of comparing')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 if any benchmark regressed')
+    args = parser.parse_args()
+
+    config = dict(CONFIG, tickers=args.tickers, bars=args.bars, fit_steps=args.fit_steps)
+    report = run(config, repeats=args.repeats, only=args.only)
+    if args.out:
+        save(args.out, report)
+
+    if args.save_baseline:
+        save(args.baseline, report)
+        print(f"Baseline written to {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.isfile(args.baseline):
+        print(f"No baseline at {args.baseline}, record one with --save-baseline")
+        sys.exit(0)
+
+    baseline = load(args.baseline)
+    differing = comparable(report, baseline)
+    if differing:
+        print(f"Baseline was recorded with a different config ({', '.join(differing)}), not comparing")
+        sys.exit(0)
+
+    table = compare(report, baseline, tolerance=args.tolerance)
+    print(table.to_string(float_format=lambda value: f"{value:.4f}"))
+    if args.check and (table['status'] == 'REGRESSION').any():
+        sys.exit(1)
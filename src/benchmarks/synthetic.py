@@ -0,0 +1,36 @@
+"""
+Seeded synthetic OHLCV bars, so the benchmarks run offline.
+
+Closes are a geometric random walk per ticker and the rest of the bar is
+built around them. The values are not meant to look like any real market,
+only to have the same shapes, dtypes and NaN-free layout as the bars
+prepare_data.py fetches.
+"""
+import numpy as np
+import pandas as pd
+
+def tickers(n):
+    return [f"T{i:04d}" for i in range(n)]
+
+def ohlcv_panel(num_tickers=8, bars=5000, seed=0, freq="5min", start="2024-01-02 14:30"):
+    """
+    (bars x tickers) Open / High / Low / Close / Volume frames on one 5m calendar.
+
+    Returns:
+    - dict: 'Open', 'High', 'Low', 'Close', 'Volume' -> pandas.DataFrame, one column per ticker.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=bars, freq=freq, tz="UTC", name="Datetime")
+    names = tickers(num_tickers)
+
+    start_price = rng.uniform(20, 500, num_tickers)
+    returns = rng.normal(0.0, rng.uniform(0.0005, 0.003, num_tickers), (bars, num_tickers))
+    close = start_price * np.exp(np.cumsum(returns, axis=0))
+    open_ = np.vstack([start_price, close[:-1]])
+    spread = np.abs(rng.normal(0.0, 0.001, (bars, num_tickers))) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(10.0, 1.0, (bars, num_tickers)).round()
+
+    return {name: pd.DataFrame(values, index=index, columns=names)
+            for name, values in (('Open', open_), ('High', high), ('Low', low), ('Close', close), ('Volume', volume))}
@@ -0,0 +1,71 @@
+"""
+Training throughput of the transformer in each fast-mode configuration.
+
+Trains on random (batch x 24 x 7) windows, so no data is needed, and prints
+steps/sec for the float64 reference metrics, the default float32 metrics,
+XLA, and (when the CPU supports it) XLA with mixed bfloat16. Run from src/:
+
+    python -m benchmarks.training --steps 50 --batch-size 512
+"""
+import time
+import argparse
+
+import numpy as np
+import tensorflow as tf
+
+from utils import models
+from utils import sequences as seq
+
+# name, compile kwargs, precision
+CONFIGS = [
+    ("fp64 metrics",       dict(fp32_metrics=False), "float32"),
+    ("default",            dict(), "float32"),
+    ("xla",                dict(fast=True), "float32"),
+    ("xla+bfloat16",       dict(fast=True), "bfloat16"),
+]
+
+def synthetic_batch(batch_size, sequence_length=seq.SEQUENCE_LEN, features=7, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((batch_size, sequence_length, features)).astype(np.float32)
+    y = np.column_stack([rng.standard_normal(batch_size),
+                         rng.standard_normal(batch_size),
+                         np.full(batch_size, 100.0),
+                         np.full(batch_size, 5.0)]).astype(np.float32)
+    return x, y
+
+def steps_per_second(model, x, y, steps, warmup=5):
+    for _ in range(warmup):
+        model.train_on_batch(x, y)
+    start = time.perf_counter()
+    for _ in range(steps):
+        model.train_on_batch(x, y)
+    return steps / (time.perf_counter() - start)
+
+def run(steps=50, batch_size=512, head_size=12, num_heads=8, ff_dim=24, num_layers=2, dropout=0.9):
+    x, y = synthetic_batch(batch_size)
+    results = {}
+    for name, kwargs, precision in CONFIGS:
+        if precision == "bfloat16" and not models.bfloat16_supported():
+            print(f"{name:<20} skipped (no native bfloat16 on this CPU)")
+            continue
+
+        tf.keras.backend.clear_session()
+        models.enable_fast_mode(precision)
+        model = models.build_transformer_model(x.shape[1:], head_size, num_heads, ff_dim, num_layers, dropout)
+        models.compile_model(model, models.directional_bce_loss, **kwargs)
+
+        results[name] = steps_per_second(model, x, y, steps)
+        print(f"{name:<20} {results[name]:8.2f} steps/sec")
+
+    tf.keras.mixed_precision.set_global_policy("float32")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark transformer training steps/sec per configuration.')
+    parser.add_argument('--steps', type=int, default=50, help='Timed train steps per configuration')
+    parser.add_argument('--batch-size', type=int, default=512, help='Batch size')
+    parser.add_argument('--num-layers', type=int, default=2, help='Transformer blocks')
+    args = parser.parse_args()
+
+    run(steps=args.steps, batch_size=args.batch_size, num_layers=args.num_layers)
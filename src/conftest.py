@@ -0,0 +1 @@
+# Puts src/ on sys.path so tests import modules the way the scripts do (from utils import ...)
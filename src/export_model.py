@@ -0,0 +1,57 @@
+import os
+import argparse
+
+import numpy as np
+import tensorflow as tf
+
+from utils import lite
+
+
+parser = argparse.ArgumentParser(description='Export the trained transformer to TFLite and/or ONNX.')
+
+parser.add_argument('--model',
+                    default='transformer_val_model.keras',
+                    help='Keras model saved by training')
+
+parser.add_argument('--out',
+                    default='exports/transformer',
+                    help='Output path without extension')
+
+parser.add_argument('--formats',
+                    nargs='+',
+                    default=['tflite'],
+                    choices=['tflite', 'onnx'],
+                    help='Formats to export')
+
+parser.add_argument('--check',
+                    action='store_true',
+                    help='Compare the exported models against Keras on random windows')
+
+parser.add_argument('--atol', type=float, default=1e-4, help='Largest allowed difference for --check')
+
+args = parser.parse_args()
+
+# Custom losses/metrics are only needed to resume training, not to export
+model = tf.keras.models.load_model(args.model, compile=False)
+os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+
+exported = []
+for fmt in args.formats:
+    path = f"{args.out}.{fmt}"
+    if fmt == 'tflite':
+        lite.export_tflite(model, path)
+    else:
+        lite.export_onnx(model, path)
+    exported.append(path)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1024:.1f} KiB)")
+
+if args.check:
+    windows = np.random.default_rng(0).standard_normal((1024,) + tuple(model.input_shape[1:])).astype(np.float32)
+    failed = False
+    for path in exported:
+        diff = lite.parity(model, lite.LitePredictor(path), windows)
+        ok = diff <= args.atol
+        failed |= not ok
+        print(f"{path}: max |keras - exported| = {diff:.2e} {'OK' if ok else 'FAILED'}")
+    if failed:
+        exit(1)
@@ -0,0 +1,39 @@
+import argparse
+
+import numpy as np
+
+from utils import artifact, feature_store
+
+
+parser = argparse.ArgumentParser(description='Forecast the next close from the latest bars using an exported artifact.')
+
+parser.add_argument('--tickers',
+                    nargs='+',
+                    default=None,
+                    help='Tickers to forecast (default: every ticker in the artifact)')
+
+parser.add_argument('--artifact',
+                    default='artifacts/transformer',
+                    help='Inference artifact written by transformer.py')
+
+parser.add_argument('--store',
+                    default='store/data',
+                    help='Feature store to read the latest normalized bars from')
+
+args = parser.parse_args()
+
+predictor = artifact.load(args.artifact)
+tickers = args.tickers or predictor.tickers
+L = predictor.sequence_length
+
+# The latest window of every ticker, in the artifact's feature order
+windows = []
+for ticker in tickers:
+    _, values, _ = feature_store.read_ticker(args.store, ticker, columns=predictor.features)
+    windows.append(np.asarray(values[-L:], dtype=np.float32))
+
+forecast = predictor.predict(tickers, np.stack(windows))
+for i, ticker in enumerate(tickers):
+    direction = 'UP' if forecast['direction'][i] > 0 else 'DOWN'
+    print(f"{ticker}: {forecast['last_close'][i]:.4f} -> {forecast['next_close'][i]:.4f} "
+          f"in {predictor.horizon} bars ({direction})")
@@ -0,0 +1,60 @@
+import argparse
+
+import pandas as pd
+
+from utils import download
+
+
+parser = argparse.ArgumentParser(description='Download bars and write the per-ticker feature CSVs.')
+
+parser.add_argument('--tickers',
+                    nargs='+',
+                    help='List of ticker symbols to process, or NASDAQ for nasdaq_tickers.csv',
+                    required=True)
+
+parser.add_argument('--out',
+                    default=None,
+                    help='Output directory (default: data, or data_nasdaq for NASDAQ)')
+
+parser.add_argument('--period', default="60d", help='yfinance period')
+parser.add_argument('--interval', default="5m", help='yfinance interval')
+parser.add_argument('--workers', type=int, default=8, help='Concurrent downloads')
+
+parser.add_argument('--base-url',
+                    default=None,
+                    help='Fetch {base-url}/{ticker}.csv instead of Yahoo (e.g. a local fixture server)')
+
+parser.add_argument('--store',
+                    default=None,
+                    help='Also write a feature store to this directory (see utils/feature_store.py)')
+
+parser.add_argument('--update',
+                    action='store_true',
+                    help='Only fetch bars newer than the last stored one and append them')
+
+parser.add_argument('--force',
+                    action='store_true',
+                    help='Re-download tickers that were already completed')
+
+args = parser.parse_args()
+
+tickers = args.tickers
+out = args.out
+if tickers[0] == "NASDAQ":
+    tickers = list(pd.read_csv(f"nasdaq_tickers.csv")['Ticker'])
+    out = out or "data_nasdaq"
+out = out or "data"
+
+if args.base_url is not None:
+    fetch = download.HTTPFetcher(args.base_url)
+else:
+    fetch = download.YahooFetcher(period=args.period, interval=args.interval)
+
+if args.update:
+    failed = download.refresh_data(tickers, fetch, out=out, workers=args.workers, store=args.store)
+else:
+    failed = download.prepare_data(tickers, fetch, out=out, workers=args.workers, store=args.store, force=args.force)
+
+print(f"Done: {len(tickers) - len(failed)} ok, {len(failed)} failed")
+for ticker, error in failed.items():
+    print(f"  {ticker}: {error}")
@@ -0,0 +1,34 @@
+import argparse
+
+from utils import artifact, serving
+
+
+parser = argparse.ArgumentParser(description='Serve transformer forecasts over HTTP with micro-batching.')
+
+parser.add_argument('--artifact',
+                    default='artifacts/transformer',
+                    help='Inference artifact written by transformer.py')
+
+parser.add_argument('--host', default='127.0.0.1', help='Address to bind')
+parser.add_argument('--port', type=int, default=8500, help='Port to bind')
+parser.add_argument('--max-batch', type=int, default=64, help='Largest batch per model call')
+
+parser.add_argument('--max-wait-ms',
+                    type=float,
+                    default=5.0,
+                    help='How long to hold the first request of a batch waiting for others')
+
+args = parser.parse_args()
+
+predictor = artifact.load(args.artifact)
+batcher = serving.MicroBatcher(predictor, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000.0)
+
+# Warm up the model so the first real request does not pay for tracing
+batcher.predict(predictor.tickers[0], [[0.0] * len(predictor.features)] * predictor.sequence_length)
+
+server = serving.make_server(batcher, host=args.host, port=args.port)
+print(f"Serving {len(predictor.tickers)} tickers on http://{args.host}:{args.port} (POST /predict, GET /health)")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    server.server_close()
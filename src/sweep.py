@@ -0,0 +1,61 @@
+import os
+import argparse
+
+from utils import cache, feature_store, panel, sweep
+from utils import sequences as seq
+
+
+parser = argparse.ArgumentParser(description='Parallel hyperparameter sweep for the transformer (see utils/sweep.py).')
+
+parser.add_argument('--tickers',
+                    nargs='+',
+                    help='List of ticker symbols to train on',
+                    required=True)
+
+parser.add_argument('--store',
+                    default='store/data',
+                    help='Feature store to read the tickers from')
+
+parser.add_argument('--data',
+                    default='sweeps/data',
+                    help='Where to write the shared memory-mapped train/validation windows (reused while the inputs are unchanged)')
+
+parser.add_argument('--trials', type=int, default=16, help='Random configurations to try (0 for the full grid)')
+parser.add_argument('--workers', type=int, default=2, help='Concurrent trial processes')
+parser.add_argument('--threads', type=int, default=None, help='Cores / TF threads per worker (default: cores // workers)')
+parser.add_argument('--epochs', type=int, default=10, help='Epoch budget per trial')
+parser.add_argument('--patience', type=int, default=3, help='Early-stopping patience on val_dir_acc')
+parser.add_argument('--grace', type=int, default=2, help='Epochs before a trial can be pruned against the median')
+parser.add_argument('--out', default='sweeps/results.csv', help='Results table')
+
+# Pool workers are spawned and re-import this file, so everything runs under the main guard
+if __name__ == "__main__":
+    # these import TF, which has to wait until the workers have pinned their cores and threads
+    from utils import artifact, dataset
+
+    args = parser.parse_args()
+
+    # One long panel, each ticker keeping its own clean rows, minus the unlabeled last one (see utils/panel.py)
+    stats = feature_store.read_stats(args.store)
+    data = panel.from_store(args.store, args.tickers, artifact.MODEL_FEATURES).drop_last()
+    tickers = [t for t in data.tickers if t + '_close_mean' in stats]
+
+    matrices = [data.matrix(t) for t in tickers]
+    means = [stats[t + '_close_mean'].values[0] for t in tickers]
+    stds = [stats[t + '_close_std'].values[0] for t in tickers]
+    key = cache.build_key(tickers=tickers,
+                          features=artifact.MODEL_FEATURES,
+                          sequence_length=seq.SEQUENCE_LEN,
+                          horizon=seq.HORIZON,
+                          splits=(dataset.TRAIN_FRAC, dataset.VAL_FRAC),
+                          sources=cache.fingerprint(cache.walk(args.store)))
+    sweep.prepare(args.data, matrices, means, stds, sequence_length=seq.SEQUENCE_LEN, horizon=seq.HORIZON, key=key)
+
+    trials = sweep.grid() if args.trials == 0 else sweep.sample(n=args.trials)
+    print(f"{len(trials)} trials on {args.workers} workers over {len(data.values)} rows of {len(tickers)} tickers")
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    results = sweep.sweep(args.data, trials, workers=args.workers, threads=args.threads, epochs=args.epochs,
+                          patience=args.patience, grace=args.grace, results_path=args.out)
+    results.to_csv(args.out, index=False)
+    print(results.head(10).to_string())
@@ -0,0 +1,26 @@
+import numpy as np
+
+from utils import backtest
+
+def test_gap_holds_the_position():
+    prices = np.array([[100.0, 101.0, np.nan, 103.0, 104.0]]).T
+    result = backtest.backtest(prices, backtest.positions(np.ones_like(prices)), spread=0.01)
+
+    # one round trip, and the move across the gap is earned on the next priced bar
+    assert len(result['trades']['pnl']) == 1
+    np.testing.assert_allclose(result['equity'][-1, 0], 0.995 * 1.01 * (103 / 101) * (104 / 103 - 0.005))
+    np.testing.assert_allclose(result['returns'][3, 0], 103.0 / 101.0 - 1.0)
+
+def test_flat_outside_the_span():
+    prices = np.array([[100.0, 101.0, 102.0, np.nan, np.nan],
+                       [np.nan, 50.0, np.nan, 55.0, 60.0]]).T
+    result = backtest.backtest(prices, backtest.positions(np.ones_like(prices)))
+
+    np.testing.assert_array_equal(result['position'].T, [[1, 1, 0, 0, 0], [0, 1, 1, 1, 0]])
+    np.testing.assert_allclose(result['equity'][-1], [1.02, 1.2])
+    np.testing.assert_array_equal(result['trades']['exit'], [2, 4])
+
+def test_no_gaps_matches_buy_and_hold():
+    prices = np.cumprod(1 + np.random.default_rng(0).normal(0, 0.01, (50, 3)), axis=0) * 100
+    result = backtest.backtest(prices, np.ones_like(prices))
+    np.testing.assert_allclose(result['equity'][-1], prices[-1] / prices[0])
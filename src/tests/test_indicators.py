@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import indicators
+
+def gapped_series(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = pd.Series(np.cumsum(rng.normal(size=n)) + 100)
+    x[rng.random(n) < 0.1] = np.nan   # scattered one-bar gaps
+    x[:5] = np.nan                    # late start
+    x[100:160] = np.nan               # a long interior gap
+    return x
+
+@pytest.mark.parametrize("span", [2, 9, 12, 26, 200])
+@pytest.mark.parametrize("adjust", [True, False])
+def test_ewm_mean_matches_pandas_across_nan_gaps(span, adjust):
+    x = gapped_series()
+    expected = x.ewm(span=span, adjust=adjust).mean()
+    result = indicators.ewm_mean(x, span, adjust=adjust)
+    pd.testing.assert_series_equal(result, expected, rtol=1e-9, atol=1e-9)
+
+def test_macd_matches_pandas_across_nan_gaps():
+    frame = pd.DataFrame({i: gapped_series(seed=i) for i in range(4)})
+    macd, signal = indicators.calculate_macd(frame)
+    expected = frame.ewm(span=12, adjust=False).mean() - frame.ewm(span=26, adjust=False).mean()
+    pd.testing.assert_frame_equal(macd, expected, rtol=1e-9, atol=1e-9)
+    pd.testing.assert_frame_equal(signal, expected.ewm(span=9, adjust=False).mean(), rtol=1e-9, atol=1e-9)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from utils import labeling
+from utils import sequences as seq
+
+def test_make_labels_matches_shift():
+    close = np.random.default_rng(0).uniform(50, 150, (40, 3)).astype(np.float32)
+    labels = labeling.make_labels(close)
+    assert labels['next'].dtype == np.float32
+    for i, h in enumerate(labeling.HORIZONS):
+        expected = np.full_like(close, np.nan)
+        expected[:-h] = close[h:]
+        np.testing.assert_array_equal(labels['next'][:, i], expected)
+        np.testing.assert_array_equal(labels['direction'][:-h, i], np.sign(close[h:] - close[:-h]))
+        assert np.isnan(labels['return'][-h:, i]).all()
+
+def test_transform_is_called_once_on_the_whole_array():
+    calls = []
+    def define_label(values):
+        calls.append(values.shape)
+        return values > 100
+    labels = labeling.make_labels(np.arange(30.0).reshape(10, 3) * 10, transform=define_label)
+    assert calls == [(10, len(labeling.HORIZONS), 3)]
+    assert labels['label'].dtype == bool
+
+def test_horizon_labels_line_up_with_windows():
+    data = np.random.default_rng(1).normal(size=(80, 7)).astype(np.float32)
+    sequences, _ = seq.create_sequences(data, 0.0, 1.0)
+    labels = seq.create_horizon_labels(data)
+    assert labels['direction'].shape == (len(sequences), len(labeling.HORIZONS))
+    ends = np.arange(len(sequences)) + seq.SEQUENCE_LEN - 1
+    for i, h in enumerate(labeling.HORIZONS):
+        known = ends + h < len(data)
+        ahead = data[ends[known] + h, 0]
+        np.testing.assert_array_equal(labels['direction'][known, i], np.sign(ahead - sequences[known, -1, 0]))
+        assert np.isnan(labels['direction'][~known, i]).all()
+
+def test_short_input_gives_no_windows():
+    labels = seq.create_horizon_labels(np.zeros((10, 7), dtype=np.float32))
+    assert labels['direction'].shape == (0, len(labeling.HORIZONS))
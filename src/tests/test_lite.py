@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from utils import lite, models
+
+ATOL = 1e-4
+
+@pytest.fixture(scope="module")
+def model():
+    tf.keras.utils.set_random_seed(0)
+    return models.build_transformer_model((8, 3), head_size=8, num_heads=2, ff_dim=8, num_layers=1)
+
+@pytest.fixture(scope="module")
+def windows():
+    return np.random.default_rng(0).standard_normal((37, 8, 3)).astype(np.float32)
+
+def has_tflite():
+    return lite.Interpreter is not None or hasattr(tf, "lite")
+
+def test_tflite_parity(model, windows, tmp_path):
+    if not has_tflite():
+        pytest.skip("no TFLite interpreter")
+    path = lite.export_tflite(model, str(tmp_path / "model.tflite"))
+    predictor = lite.LitePredictor(path)
+    # batch_size 16 leaves a short last batch, so the interpreter is resized too
+    assert lite.parity(model, predictor, windows, batch_size=16) <= ATOL
+
+def test_onnx_parity(model, windows, tmp_path):
+    pytest.importorskip("tf2onnx")
+    if lite.onnxruntime is None:
+        pytest.skip("onnxruntime is not installed")
+    path = lite.export_onnx(model, str(tmp_path / "model.onnx"))
+    predictor = lite.LitePredictor(path)
+    assert lite.parity(model, predictor, windows, batch_size=16) <= ATOL
+
+def test_rejects_wrong_window_shape(model, tmp_path):
+    if not has_tflite():
+        pytest.skip("no TFLite interpreter")
+    predictor = lite.LitePredictor(lite.export_tflite(model, str(tmp_path / "model.tflite")))
+    with pytest.raises(ValueError):
+        predictor.predict(np.zeros((2, 7, 3), dtype=np.float32))
@@ -0,0 +1,56 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from utils import serving
+
+class FakePredictor:
+    """Stands in for artifact.Predictor: known tickers get a constant forecast."""
+    tickers = ['AAPL', 'MSFT']
+    features = ['close', 'volume']
+    sequence_length = 4
+    horizon = 1
+
+    def predict(self, tickers, windows, raw=False):
+        n = len(tickers)
+        return {'prediction': np.full(n, 0.5), 'next_close': np.full(n, 101.0),
+                'last_close': np.full(n, 100.0), 'direction': np.ones(n)}
+
+@pytest.fixture
+def url():
+    server = serving.make_server(serving.MicroBatcher(FakePredictor()), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def post(url, body):
+    request = urllib.request.Request(url + "/predict", data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_known_ticker(url):
+    status, body = post(url, {'ticker': 'AAPL', 'bars': np.zeros((4, 2)).tolist()})
+    assert status == 200
+    assert body['ticker'] == 'AAPL'
+    assert body['next_close'] == 101.0
+    assert body['direction'] == 'UP'
+
+def test_unknown_ticker(url):
+    status, body = post(url, {'ticker': 'NOPE', 'bars': np.zeros((4, 2)).tolist()})
+    assert status == 400
+    assert 'NOPE' in body['error']
+
+def test_bad_shape(url):
+    status, body = post(url, {'ticker': 'AAPL', 'bars': np.zeros((3, 2)).tolist()})
+    assert status == 400
+    assert 'shape' in body['error']
@@ -1,5 +1,7 @@
+import os
 import tqdm
 import math
+import time
 import argparse
 import numpy as np
 import pandas as pd
@@ -15,6 +17,8 @@ from tensorflow.keras.regularizers import l2
 from tensorflow.keras.callbacks import ModelCheckpoint
 from tensorflow.keras.layers import Input, LSTM, Dense, Dropout, Concatenate, Permute, Reshape, Multiply, Flatten, LayerNormalization, MultiHeadAttention, Add, GlobalAveragePooling1D, Embedding
 
+from utils import artifact, backtest, cache, dataset, distributed, download, evaluation, feature_store, mmap_dataset, models, panel, profiling, sequences as seq
+
 
 
 parser = argparse.ArgumentParser(description='Process some stock tickers.')
@@ -24,47 +28,82 @@ parser.add_argument('--tickers',
                     help='List of ticker symbols to process',
                     required=True)
 
+parser.add_argument('--stream',
+                    action='store_true',
+                    help='Stream shuffled training windows through tf.data instead of materializing train_sequences')
+
+parser.add_argument('--mmap',
+                    default=None,
+                    help='Directory of memory-mapped train windows to train from, rebuilt when the inputs change (see utils/mmap_dataset.py)')
+
+parser.add_argument('--cache',
+                    default=cache.CACHE_DIR,
+                    help='Directory of cached dataset builds, reused while the inputs are unchanged (see utils/cache.py)')
+
+parser.add_argument('--no-cache',
+                    action='store_true',
+                    help='Rebuild the dataset even if a cached build matches')
+
+parser.add_argument('--align',
+                    default='ticker',
+                    choices=['ticker', 'calendar'],
+                    help='ticker: keep every clean row of each ticker; calendar: only the timestamps all tickers share')
+
+parser.add_argument('--store',
+                    default=None,
+                    help='Feature store directory to read instead of the per-ticker CSVs (see utils/feature_store.py)')
+
+parser.add_argument('--fast',
+                    action='store_true',
+                    help='XLA-compile the train step and use bfloat16 where the CPU supports it')
+
+parser.add_argument('--precision',
+                    default='auto',
+                    choices=['auto', 'bfloat16', 'float32'],
+                    help='Compute precision for --fast (auto: bfloat16 if the CPU has native support)')
+
+parser.add_argument('--artifact',
+                    default='artifacts/transformer',
+                    help='Where to export the self-contained inference artifact (see utils/artifact.py)')
+
+parser.add_argument('--distributed',
+                    action='store_true',
+                    help='Train data-parallel with MultiWorkerMirroredStrategy, one ticker shard per worker (see utils/distributed.py)')
+
+parser.add_argument('--report',
+                    default=None,
+                    help='JSON file for the per-stage timing / memory report (default: profiles/run-{time}.json)')
+
+parser.add_argument('--cprofile',
+                    action='store_true',
+                    help='Run under cProfile; the .prof file goes next to the report and the slowest functions into it')
+
+parser.add_argument('--tf-profile',
+                    default=None,
+                    help='Capture a TensorFlow profiler trace of the fit stage into this log directory')
+
 # Parse the arguments
 args = parser.parse_args()
 
+# Per-stage wall time, RSS, array sizes and dropped rows, written as JSON at the end (see utils/profiling.py)
+profiler = profiling.Profiler(cprofile=args.cprofile, tf_logdir=args.tf_profile)
+report_path = args.report or time.strftime("profiles/run-%Y%m%d-%H%M%S.json")
+
+# The multi-worker strategy has to exist before any other TF op runs
+if args.distributed:
+    strategy = distributed.get_strategy()
+    worker_index, num_workers = distributed.worker_info()
+    print(f"Worker {worker_index + 1}/{num_workers}, {strategy.num_replicas_in_sync} replicas in sync")
+    args.stream = True  # each worker streams windows from its own shard
+    args.mmap = None
+else:
+    strategy = tf.distribute.get_strategy()
+
 tickers = args.tickers
 print(tickers)
 
 SEQUENCE_LEN = 24 #20
 
-def calculate_momentum(data, periods=10):
-    """Calculate Momentum."""
-    momentum = data - data.shift(periods)
-    return momentum
-
-def calculate_roc(data, periods=10):
-    """Calculate Rate of Change."""
-    roc = ((data - data.shift(periods)) / data.shift(periods)) * 100
-    return roc
-
-def calculate_sma(data, window=10):
-    """Calculate Simple Moving Average."""
-    sma = data.rolling(window=window).mean()
-    return sma
-
-def calculate_rsi(data, window=10):
-    delta = data.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=window, min_periods=1).mean()
-    avg_loss = loss.rolling(window=window, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_bollinger_bands(data, window=10, num_of_std=2):
-    """Calculate Bollinger Bands"""
-    rolling_mean = data.rolling(window=window).mean()
-    rolling_std = data.rolling(window=window).std()
-    upper_band = rolling_mean + (rolling_std * num_of_std)
-    lower_band = rolling_mean - (rolling_std * num_of_std)
-    return upper_band, lower_band
-
 #tickers = ['AAPL','ABBV','ACN', 'ADBE','AEP','AFL','AIG','ALGN', ]
 #           'ALL','AMAT','AMD','AMGN','AMZN','AON','APA','APD','APH',
 #           'ASML','AVB','AVGO','AXP','AZO','BA','BAC','BBY','BDX','BEN',
@@ -113,205 +152,166 @@ def calculate_bollinger_bands(data, window=10, num_of_std=2):
 ###################
 ## DOWNLOAD DATA ##
 ###################
-# List to hold data for each ticker
-#stats = {}
-#for ticker in tickers:
-#    # Download historical data for the ticker
-#    #data = yf.download(ticker, start=start_date, end=end_date)
-#    #data = yf.download(ticker, period="10y", interval="1d")
-#    #data = yf.download(ticker, period="60d", interval="90m")
-#    #data = yf.download(ticker, period="730d", interval="60m")
-#    #data = yf.download(ticker, period="60d", interval="30m")
-#    #data = yf.download(ticker, period="60d", interval="15m")
-#    data = yf.download(ticker, period="60d", interval="5m")
-#    #data = yf.download(ticker, period="7d", interval="1m")
-#
-#    # Calculate the daily percentage change
-#    close = data['Close']
-#    upper, lower = calculate_bollinger_bands(close, window=14, num_of_std=2)
-#    width = upper - lower
-#    rsi = calculate_rsi(close, window=14)
-#    sma = calculate_sma(close, window=14).ewm(span=14).mean()
-#    roc = calculate_roc(close, periods=14)
-#    momentum = calculate_momentum(close, periods=14)
-#    volume = data['Volume']
-#    diff = data['Close'].diff(1)
-#    percent_change_close = data['Close'].pct_change() * 100
-#
-#    # Create a DataFrame for the current ticker and append it to the list
-#    ticker_df = pd.DataFrame({
-#        ticker+'_close': close,
-#        ticker+'_upper': upper,
-#        ticker+'_lower': lower,
-#        ticker+'_width': width,
-#        ticker+'_rsi': rsi,
-#        ticker+'_sma': sma,
-#        ticker+'_roc': roc,
-#        ticker+'_momentum': momentum,
-#        ticker+'_volume': volume,
-#        ticker+'_diff': diff,
-#        ticker+'_percent_change_close': percent_change_close,
-#    })
-#    
-#    MEAN = ticker_df.mean()
-#    STD = ticker_df.std()
-#    MIN = ticker_df.min()
-#    MAX = ticker_df.max()
-#
-#    for column in MEAN.index:
-#        mean_key = f"{column}_mean"
-#        std_key = f"{column}_std"
-#        stats[mean_key] = MEAN[column]
-#        stats[std_key] = STD[column]
-#    
-#    # Normalize the training features
-#    ticker_df = (ticker_df - MEAN) / STD
-#
-#    #pairplot = sns.pairplot(ticker_df)
-#    #plt.savefig(f"pairplot/{ticker}_pairplot.png")
-#    #plt.close()
-#    #ticker_data_frames.append(ticker_df)
-#
-#    # Set threshold
-#    Q1 = ticker_df.quantile(0.005)
-#    Q3 = ticker_df.quantile(0.995)
-#    IQR = Q3 - Q1
-#
-#    # Define a mask to filter out outliers
-#    mask = ~((ticker_df < (Q1 - 1.5 * IQR)) | (ticker_df > (Q3 + 1.5 * IQR))).any(axis=1)
-#
-#    # Apply the mask to your dataframe to remove outliers
-#    cleaned_df = ticker_df[mask]
-#    
-#    #pairplot_cleaned = sns.pairplot(cleaned_df)
-#    #pairplot_cleaned.savefig(f"pairplot/{ticker}_pairplot_cleaned.png")
-#    #plt.close()
-#    cleaned_df.to_csv(f"data/{ticker}.csv")
-#stats = pd.DataFrame([stats], index=[0])
-#stats.to_csv(f"data/STATS.csv", index=False)
-#print(stats)
-#exit()
-
-if tickers[0] == "NASDAQ":
-    stats = pd.read_csv(f"data_nasdaq/STATS.csv")
+# data/{ticker}.csv and STATS.csv are written by prepare_data.py, e.g.
+#   python3 prepare_data.py --tickers NASDAQ --workers 16 --store store/data_nasdaq
+
+profiler.stage("load")
+
+# Tickers are packed into one long float32 panel (see utils/panel.py) instead of a wide
+# concat(axis=1) frame, and cached under a hash of everything they depend on (see
+# utils/cache.py), so a relaunch on unchanged data skips the loading entirely
+if args.store is not None:
+    stats_path = os.path.join(args.store, "STATS.csv")
+    if tickers[0] == "NASDAQ":
+        sources = cache.walk(args.store) + ["nasdaq_tickers.csv"]
+    else:
+        sources = [os.path.join(feature_store.ticker_dir(args.store, t), "values.npy") for t in tickers] + [stats_path]
+elif tickers[0] == "NASDAQ":
+    stats_path = "data_nasdaq/STATS.csv"
+    sources = cache.walk("data_nasdaq") + ["nasdaq_tickers.csv"]
+else:
+    stats_path = "data/STATS.csv"
+    sources = [f"data/{t}.csv" for t in tickers] + [stats_path]
+
+cache_key = cache.build_key(tickers=tickers,
+                            shard=distributed.worker_info() if args.distributed else None,
+                            features=artifact.MODEL_FEATURES,
+                            align=args.align,
+                            sequence_length=SEQUENCE_LEN,
+                            horizon=seq.HORIZON,
+                            splits=(dataset.TRAIN_FRAC, dataset.VAL_FRAC),
+                            sources=cache.fingerprint(sources))
+cached = None if args.no_cache else cache.load(args.cache, cache_key)
+
+if cached is not None:
+    arrays, meta = cached
+    stats = pd.read_csv(stats_path)
+    ticker_panel = panel.Panel.from_arrays(arrays, meta["tickers"], meta["columns"])
+    print(f"Loaded cached panel ({cache_key})")
+    profiler.record("cached", True)
+else:
+    if args.store is not None:
+        stats = feature_store.read_stats(args.store)
+
+        if tickers[0] == "NASDAQ":
+            candidates = pd.read_csv(f"nasdaq_tickers.csv")['Ticker']
+            min_rows = 4000
+        else:
+            candidates = tickers
+            min_rows = 0
+        if args.distributed: candidates = distributed.shard(candidates)
+        ticker_panel = panel.from_store(args.store, candidates, artifact.MODEL_FEATURES, min_rows=min_rows)
+    elif tickers[0] == "NASDAQ":
+        stats = pd.read_csv(f"data_nasdaq/STATS.csv")
     
-    nasdaq = pd.read_csv(f"nasdaq_tickers.csv")
-    nasdaq = nasdaq['Ticker']
-    ticker_data_frames = []
-    tickers = []
-    for ticker in tqdm.tqdm(nasdaq):
-        try:
-            df = pd.read_csv(f"data_nasdaq/{ticker}.csv")
-            if len(df) < 4000: continue
+        nasdaq = pd.read_csv(f"nasdaq_tickers.csv")
+        nasdaq = nasdaq['Ticker']
+        if args.distributed: nasdaq = distributed.shard(nasdaq)
+        ticker_data_frames = []
+        tickers = []
+        for ticker in tqdm.tqdm(nasdaq):
+            try:
+                df = feature_store.read_csv(f"data_nasdaq/{ticker}.csv")
+                if len(df) < 4000: continue
+                df['Datetime'] = pd.to_datetime(df['Datetime'], utc=True)
+                df['Datetime'] = df['Datetime'].dt.tz_localize(None)
+                ticker_data_frames.append(df)
+                tickers.append(ticker)
+            except Exception as e:
+                print(e)
+        ticker_panel = panel.from_frames(ticker_data_frames, tickers, artifact.MODEL_FEATURES)
+    else:
+        stats = pd.read_csv(f"data/STATS.csv")
+        if args.distributed: tickers = distributed.shard(tickers)
+        ticker_data_frames = []
+        for ticker in tqdm.tqdm(tickers):
+            df = feature_store.read_csv(f"data/{ticker}.csv")
             df['Datetime'] = pd.to_datetime(df['Datetime'], utc=True)
             df['Datetime'] = df['Datetime'].dt.tz_localize(None)
             ticker_data_frames.append(df)
-            tickers.append(ticker)
-        except Exception as e:
-            print(e)
-else:
-    stats = pd.read_csv(f"data/STATS.csv")
-    ticker_data_frames = []
-    for ticker in tqdm.tqdm(tickers):
-        df = pd.read_csv(f"data/{ticker}.csv")
-        df['Datetime'] = pd.to_datetime(df['Datetime'], utc=True)
-        df['Datetime'] = df['Datetime'].dt.tz_localize(None)
-        ticker_data_frames.append(df)
-    
-# Concatenate all ticker DataFrames)
-percent_change_data = pd.concat(ticker_data_frames, axis=1)
-print(stats)
-
-# Remove any NaN values that may have occurred from the pct_change() calculation
-percent_change_data.replace([np.inf, -np.inf], np.nan, inplace=True)
-percent_change_data.dropna(inplace=True)
-
-print(percent_change_data)
-
-###############################
-## CREATE LABELS (TRANSFORM) ##
-###############################
-# Example trading strategy for labeling
-def define_label(data):
-    # Apply any transformations needed to the label data
-    return data
-
-# Shift the percentage change data to create labels
-labels = percent_change_data.shift(-1).map(define_label)
-
-# Drop the last row in both percent_change_data and labels as it won't have a corresponding label
-percent_change_data = percent_change_data.iloc[:-1]
-labels = labels.iloc[:-1]
-
-################################
-## HELPER TO CREATE SEQUENCES ##
-################################
-# Function to create X-day sequences for each ticker
-def create_sequences(data, labels, mean, std, sequence_length=24):
-    sequences = []
-    lab = []
-    data_size = len(data)
-
-    # Loop to create each sequence and its corresponding label
-    for i in range(data_size - (sequence_length + 12)):  # Ensure we have data for the label 12 steps ahead
-        sequences.append(data[i:i + sequence_length])
-        # Assign the labels
-        lab.append([data[i + sequence_length - 1][0], data[i + sequence_length + 12][0], mean[0], std[0]])
-
-    # Validate the sequences and labels
-    for i in range(10):  # Print first 10 sequences and labels for validation
-        last_value_in_sequence = sequences[i][-1][0]
-        first_value_in_label = lab[i][0]
-        if not np.isclose(last_value_in_sequence, first_value_in_label):
-            print(f"{last_value_in_sequence=} != {first_value_in_label=}")
-            input()
-            
-    return np.array(sequences), np.array(lab)
-
+        ticker_panel = panel.from_frames(ticker_data_frames, tickers, artifact.MODEL_FEATURES)
+    print(stats)
+    profiler.record("cached", False)
+    profiler.record("rows_loaded", int(len(ticker_panel.values) + ticker_panel.dropped.sum()))
+    profiler.record("rows_dropped_nonfinite", int(ticker_panel.dropped.sum()))
+
+    # prepare_data.py already dropped the IQR outliers; it counts them per ticker in STATS.csv
+    # (a STATS.csv written before that has no such columns)
+    outliers = [download.outliers_key(t) for t in ticker_panel.tickers]
+    outliers = [stats[key].values[0] for key in outliers if key in stats]
+    if outliers:
+        profiler.record("rows_dropped_outliers", int(sum(outliers)))
+
+    # NaN/inf rows were dropped per ticker; only --align calendar puts every ticker on the shared bars
+    if args.align == 'calendar':
+        rows = len(ticker_panel.values)
+        ticker_panel = ticker_panel.align()
+        profiler.record("rows_dropped_calendar", rows - len(ticker_panel.values))
+
+    # Drop each ticker's last row as it won't have a corresponding label
+    ticker_panel = ticker_panel.drop_last()
+
+    cache.save(args.cache, cache_key, ticker_panel.arrays(), meta={'tickers': ticker_panel.tickers, 'columns': ticker_panel.columns})
+
+tickers = ticker_panel.tickers
+print(f"{len(tickers)} tickers, {len(ticker_panel.values)} rows, {ticker_panel.nbytes / 2**20:.1f} MiB")
+profiler.record("tickers", len(tickers))
+profiler.record("rows", len(ticker_panel.values))
+profiler.array("panel", ticker_panel.values)
+
+# Per-ticker (T x features) views into the panel and the close stats to de-normalize with
+ticker_matrices = {}
+ticker_stats = {}
+for ticker in tickers:
+    try:
+        ticker_stats[ticker] = (stats[ticker+'_close_mean'].values[0], stats[ticker+'_close_std'].values[0])
+        ticker_matrices[ticker] = ticker_panel.matrix(ticker)
+    except Exception as e:
+        pass
+        #print("Exception", e)
 
 ######################
 ## CREATE SEQUENCES ##
 ######################
+profiler.stage("sequences")
+
 # Create sequences and labels for each ticker
 sequences_dict = {}
 sequence_labels = {}
-for ticker in tqdm.tqdm(tickers):
-    try:
-        # Extract necessary data columns for the ticker
-        close = percent_change_data[ticker+'_close'].values
-        upper = percent_change_data[ticker+'_upper'].values
-        lower = percent_change_data[ticker+'_lower'].values
-        width = percent_change_data[ticker+'_width'].values
-        rsi = percent_change_data[ticker+'_rsi'].values
-        sma = percent_change_data[ticker+'_sma'].values
-        roc = percent_change_data[ticker+'_roc'].values
-        momentum = percent_change_data[ticker+'_momentum'].values
-        volume = percent_change_data[ticker+'_volume'].values
-        diff = percent_change_data[ticker+'_diff'].values
-        pct_change = percent_change_data[ticker+'_percent_change_close'].values
-        
-        # Combine the data into a single array
-        ticker_data = np.column_stack((close, width, rsi, roc, volume, diff, pct_change))
-        
-        # Generate sequences and labels
-        ticker_sequences, lab = create_sequences(ticker_data,
-                                                 labels[ticker+'_close'].values,
-                                                 stats[ticker+'_close_mean'].values,
-                                                 stats[ticker+'_close_std'].values)
-        
-        sequences_dict[ticker] = ticker_sequences
-        sequence_labels[ticker] = lab
-    except Exception as e:
-        pass
-        #print("Exception", e)
+sequence_directions = {}
+too_short = 0
+for ticker in tqdm.tqdm(list(ticker_matrices)):
+    # No labeled window fits (<= SEQUENCE_LEN + HORIZON rows): drop the ticker from every later stage
+    if seq.num_sequences(len(ticker_matrices[ticker]), SEQUENCE_LEN) == 0:
+        del ticker_matrices[ticker]
+        too_short += 1
+        continue
+
+    # Generate sequences (a strided view over the ticker matrix) and labels;
+    # ticker_stats keeps the float64 STATS.csv values, the label columns are only float32 copies
+    ticker_sequences, lab = seq.create_sequences(ticker_matrices[ticker],
+                                                 ticker_stats[ticker][0],
+                                                 ticker_stats[ticker][1],
+                                                 sequence_length=SEQUENCE_LEN)
+    sequences_dict[ticker] = ticker_sequences
+    sequence_labels[ticker] = lab
+
+    # Direction 1 / 6 / 12 / 24 bars after each window, for scoring the forecast per horizon (see utils/labeling.py)
+    sequence_directions[ticker] = seq.create_horizon_labels(ticker_matrices[ticker], sequence_length=SEQUENCE_LEN)['direction']
+profiler.record("tickers_without_stats", len(tickers) - len(ticker_matrices) - too_short)
+profiler.record("tickers_too_short", too_short)
+profiler.record("windows", sum(len(lab) for lab in sequence_labels.values()))
 
 ########################################
 ## Create TRAIN, VALID, AND TEST DATA ##
 ########################################
+profiler.stage("split")
+
 train_sequences = []
 train_labels = []
 validation_sequences = []
 validation_labels = []
+validation_directions = []
 test_sequences = []
 test_labels = []
 
@@ -324,167 +324,65 @@ for ticker in tqdm.tqdm(tickers):
         train_size = int(total_size * 0.9)
         val_size = int(total_size * 0.05)
         
-        train_sequences.extend(sequences[:train_size])
-        train_labels.extend(labels[:train_size])
+        if not (args.stream or args.mmap):
+            train_sequences.append(sequences[:train_size])
+            train_labels.append(labels[:train_size])
         
-        validation_sequences.extend(sequences[train_size:train_size + val_size])
-        validation_labels.extend(labels[train_size:train_size + val_size])
+        validation_sequences.append(sequences[train_size:train_size + val_size])
+        validation_labels.append(labels[train_size:train_size + val_size])
+        validation_directions.append(sequence_directions[ticker][train_size:train_size + val_size])
         
-        test_sequences.extend(sequences[train_size + val_size:])
-        test_labels.extend(labels[train_size + val_size:])
+        test_sequences.append(sequences[train_size + val_size:])
+        test_labels.append(labels[train_size + val_size:])
     except Exception as e:
         pass
         #print(e)
 
-# Convert lists to numpy arrays
-train_sequences = np.array(train_sequences)
-train_labels = np.array(train_labels)
-validation_sequences = np.array(validation_sequences)
-validation_labels = np.array(validation_labels)
-test_sequences = np.array(test_sequences)
-test_labels = np.array(test_labels)
+# Materialize the window views once, straight into the final arrays
+# (with --stream / --mmap the train windows are gathered per batch by utils/dataset.py / utils/mmap_dataset.py instead)
+if not (args.stream or args.mmap):
+    train_sequences = np.concatenate(train_sequences)
+    train_labels = np.concatenate(train_labels)
+validation_sequences = np.concatenate(validation_sequences)
+validation_labels = np.concatenate(validation_labels)
+validation_directions = np.concatenate(validation_directions)
+test_sequences = np.concatenate(test_sequences)
+test_labels = np.concatenate(test_labels)
 
 # Shuffle train sequences and labels
-np.random.seed(42)
-shuffled_indices = np.random.permutation(len(train_sequences))
-train_sequences = train_sequences[shuffled_indices]
-train_labels = train_labels[shuffled_indices]
-
-print(f"{train_sequences.shape=}, {train_labels.shape=}")
+if not (args.stream or args.mmap):
+    np.random.seed(42)
+    shuffled_indices = np.random.permutation(len(train_sequences))
+    train_sequences = train_sequences[shuffled_indices]
+    train_labels = train_labels[shuffled_indices]
+
+    print(f"{train_sequences.shape=}, {train_labels.shape=}")
+    profiler.array("train_sequences", train_sequences)
 print(f"{validation_sequences.shape=}, {validation_labels.shape=}")
 print(f"{test_sequences.shape=}, {test_labels.shape=}")
+profiler.array("validation_sequences", validation_sequences)
+profiler.array("test_sequences", test_sequences)
 
 ###########################
 ## DEFINE NEURAL NETWORK ##
 ###########################
-def transformer_encoder(inputs, head_size, num_heads, ff_dim, dropout=0):
-    # Attention and Normalization
-    x = LayerNormalization(epsilon=1e-6)(inputs)
-    x = MultiHeadAttention(key_dim=head_size, num_heads=num_heads, dropout=dropout)(x, x)
-    x = Add()([x, inputs])
-
-    # Feed Forward Part
-    y = LayerNormalization(epsilon=1e-6)(x)
-    y = Dense(ff_dim, activation="relu")(y)
-    y = Dropout(dropout)(y)
-    y = Dense(inputs.shape[-1])(y)
-    return Add()([y, x])
-
-def build_transformer_model(input_shape, head_size, num_heads, ff_dim, num_layers, dropout=0):
-    inputs = Input(shape=input_shape)
-    x = inputs
-
-    #vocab_size=10000
-    #embedding_dim=32
-    #x = Embedding(vocab_size, embedding_dim)(x)
-    
-    # Create multiple layers of the Transformer block
-    for _ in range(num_layers):
-        x = transformer_encoder(x, head_size, num_heads, ff_dim, dropout)
-
-    # Final part of the model
-    x = GlobalAveragePooling1D()(x)
-    x = LayerNormalization(epsilon=1e-6)(x)
-    outputs = Dense(1, activation="linear")(x)
+# transformer_encoder / build_transformer_model, the losses and dir_acc live in utils/models.py
+profiler.stage("build")
 
-    # Compile model
-    model = Model(inputs=inputs, outputs=outputs)
-    return model
+if args.fast:
+    print(f"Fast mode: {models.enable_fast_mode(args.precision)} policy, XLA-compiled train step")
 
 # Model parameters
-input_shape = train_sequences.shape[1:]
+input_shape = validation_sequences.shape[1:]
 head_size = 12 #128 #512 #256 #128 #32
 num_heads = 8 #24 #16 #8 #2
 ff_dim = 24 #512 #1024 #1024 #512 #64
 num_layers = 2 #24 #12 #6 #2
 dropout = 0.90
 
-# Build the model
-model = build_transformer_model(input_shape, head_size, num_heads, ff_dim, num_layers, dropout)
-
-##########################
-## CUSTOM LOSS FUNCTION ##
-##########################
-
-def directional_mse_loss(y_true, y_pred):
-    """
-    This loss function penalizes predictions that are in the wrong direction more heavily than those that are merely inaccurate in magnitude.
-    It can be seen as an extension of the mean squared error that incorporates the directionality:
-    """
-    mean = y_true[:, 2]
-    std = y_true[:, 3]
-    
-    def unnormalize(values):
-        return values * std + mean
-
-    y_true_prev = unnormalize(y_true[:, 0])
-    y_true_next = unnormalize(y_true[:, 1])
-    y_pred_next = unnormalize(y_pred[:, 0])
-    
-    true_change = y_true_next - y_true_prev
-    pred_change = y_pred_next - y_true_prev
-
-    # Calculate squared error
-    squared_error = tf.square(y_true_next - y_pred_next)
-
-    # Check if predicted and true change have the same sign
-    same_direction = tf.equal(tf.sign(true_change), tf.sign(pred_change))
-    same_direction = tf.cast(same_direction, tf.float32)
-
-    # Penalize errors in the wrong direction more
-    direction_penalty = 1 + (1 - same_direction) * 10  # Increase the weight of wrong direction errors
-
-    directional_mse = squared_error * direction_penalty
-    return tf.reduce_mean(directional_mse)
-
-
-def directional_bce_loss(y_true, y_pred):
-    """
-    This loss function treats the problem as a classification task where the classes are "price went up" and "price went down".
-    It uses the sigmoid of the predicted change and actual change to compute a binary cross-entropy loss, which inherently captures the direction:
-    """
-    mean = y_true[:, 2]
-    std = y_true[:, 3]
-    
-    def unnormalize(values):
-        return values * std + mean
-
-    y_true_prev = unnormalize(y_true[:, 0])
-    y_true_next = unnormalize(y_true[:, 1])
-    y_pred_next = unnormalize(y_pred[:, 0])
-    
-    true_change = y_true_next - y_true_prev
-    pred_change = y_pred_next - y_true_prev
-
-    # Compute binary labels for direction
-    true_label = tf.cast(tf.greater(true_change, 0), tf.float32)
-    pred_prob = tf.sigmoid(pred_change)  # Use sigmoid to squash the output between 0 and 1
-
-    # Use binary cross-entropy
-    loss = tf.keras.losses.binary_crossentropy(true_label, pred_prob)
-    return tf.reduce_mean(loss)
-
-def custom_mae_loss(y_true, y_pred):
-    y_true_next = tf.cast(y_true[:, 1], tf.float64)
-    y_pred_next = tf.cast(y_pred[:, 0], tf.float64)
-    abs_error = tf.abs(y_true_next - y_pred_next)
-    
-    return tf.reduce_mean(abs_error)
-
-def dir_acc(y_true, y_pred):
-    mean, std = tf.cast(y_true[:, 2], tf.float64), tf.cast(y_true[:, 3], tf.float64)
-    
-    y_true_prev = (tf.cast(y_true[:, 0], tf.float64) * std) + mean
-    y_true_next = (tf.cast(y_true[:, 1], tf.float64) * std) + mean
-    y_pred_next = (tf.cast(y_pred[:, 0], tf.float64) * std) + mean
-    
-    true_change = y_true_next - y_true_prev
-    pred_change = y_pred_next - y_true_prev
-    
-    correct_direction = tf.equal(tf.sign(true_change), tf.sign(pred_change))
-    
-    return tf.reduce_mean(tf.cast(correct_direction, tf.float64))
-
+# Build the model (variables are mirrored across workers with --distributed)
+with strategy.scope():
+    model = models.build_transformer_model(input_shape, head_size, num_heads, ff_dim, num_layers, dropout)
 
 ###################
 ## COMPILE MODEL ##
@@ -494,9 +392,12 @@ BATCH_SIZE = 512
 #EPOCHS = math.ceil( (500000 // SCALE) / math.ceil(len(train_sequences) / BATCH_SIZE) )
 EPOCHS = 100
 
+# BATCH_SIZE is per replica; the LR schedule scales with the global batch
+GLOBAL_BATCH_SIZE = distributed.global_batch_size(BATCH_SIZE, strategy)
+
 # Compile the model
-optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
-model.compile(optimizer=optimizer, loss=directional_bce_loss, metrics=[dir_acc])
+with strategy.scope():
+    models.compile_model(model, models.directional_bce_loss, learning_rate=0.001, fast=args.fast)
 
 model.summary()
 
@@ -506,7 +407,7 @@ model.summary()
 #################
 # Define a callback to save the best model
 checkpoint_callback_train = ModelCheckpoint(
-    "transformer_train_model.keras",  # Filepath to save the best model
+    distributed.checkpoint_path("transformer_train_model.keras"),  # Filepath to save the best model
     monitor="dir_acc",  #"loss",  # Metric to monitor
     save_best_only=True,  # Save only the best model
     mode="max",  # Minimize the monitored metric 
@@ -515,7 +416,7 @@ checkpoint_callback_train = ModelCheckpoint(
 
 # Define a callback to save the best model
 checkpoint_callback_val = ModelCheckpoint(
-    "transformer_val_model.keras",  # Filepath to save the best model
+    distributed.checkpoint_path("transformer_val_model.keras"),  # Filepath to save the best model
     monitor="val_dir_acc", #"val_loss",  # Metric to monitor
     save_best_only=True,  # Save only the best model
     mode="max",  # Minimize the monitored metric 
@@ -523,23 +424,8 @@ checkpoint_callback_val = ModelCheckpoint(
 )
 
 def get_lr_callback(batch_size=16, mode='cos', epochs=500, plot=False):
-    lr_start, lr_max, lr_min = 5e-6, 6e-6 * batch_size, 1e-6  # Adjust learning rate boundaries
-    lr_ramp_ep = int(0.25 * epochs)  # 35% of epochs for warm-up
-    lr_sus_ep = max(0, int(0.10 * epochs) - lr_ramp_ep)  # Optional sustain phase, adjust as needed
-
-    def lrfn(epoch):
-        if epoch < lr_ramp_ep:  # Warm-up phase
-            lr = (lr_max - lr_start) / lr_ramp_ep * epoch + lr_start
-        elif epoch < lr_ramp_ep + lr_sus_ep:  # Sustain phase at max learning rate
-            lr = lr_max
-        elif mode == 'cos':
-            decay_total_epochs, decay_epoch_index = epochs - lr_ramp_ep - lr_sus_ep, epoch - lr_ramp_ep - lr_sus_ep
-            phase = math.pi * decay_epoch_index / decay_total_epochs
-            lr = (lr_max - lr_min) * 0.5 * (1 + math.cos(phase)) + lr_min
-        else:
-            lr = lr_min  # Default to minimum learning rate if mode is not recognized
-
-        return lr
+    # 25% of epochs for warm-up, then cosine decay (shared with sweep.py through utils/models.py)
+    lrfn = models.lr_schedule(batch_size=batch_size, mode=mode, epochs=epochs)
 
     if plot:  # Plot learning rate curve if plot is True
         plt.figure(figsize=(10, 5))
@@ -555,6 +441,8 @@ def get_lr_callback(batch_size=16, mode='cos', epochs=500, plot=False):
 #################
 ## TRAIN MODEL ##
 #################
+profiler.stage("fit")
+
 try:
     #print("No Weights")
     model.load_weights("transformer_val_model.keras")
@@ -562,26 +450,89 @@ try:
 except Exception as e:
     print(e)
 
+if args.distributed:
+    # Shards differ in size, so every worker repeats its data and runs the same agreed number of steps
+    streamed = [ticker for ticker in tickers if ticker in ticker_matrices]
+    matrices = [ticker_matrices[t] for t in streamed]
+    datasets = dataset.make_datasets(matrices,
+                                     [ticker_stats[t][0] for t in streamed],
+                                     [ticker_stats[t][1] for t in streamed],
+                                     splits=('train', 'validation'),
+                                     batch_size=GLOBAL_BATCH_SIZE,
+                                     sequence_length=SEQUENCE_LEN)
+    # each step takes GLOBAL_BATCH_SIZE / num_workers windows from every shard, so an epoch is counted in those
+    worker_batch = distributed.worker_batch_size(GLOBAL_BATCH_SIZE, num_workers)
+    steps = {split: distributed.agreed_steps(math.ceil(dataset.num_windows(matrices, split, SEQUENCE_LEN) / worker_batch), strategy)
+             for split in datasets}
+    fit_data = dict(x=distributed.distribute_options(datasets['train'].repeat()),
+                    steps_per_epoch=steps['train'],
+                    validation_data=distributed.distribute_options(datasets['validation'].repeat()),
+                    validation_steps=steps['validation'])
+elif args.mmap:
+    # written once per build key; later runs reshuffle the same files with a per-epoch seeded permutation
+    if not mmap_dataset.has_dataset(args.mmap, key=cache_key):
+        streamed = [ticker for ticker in tickers if ticker in ticker_matrices]
+        mmap_dataset.write_dataset(args.mmap,
+                                   [ticker_matrices[t] for t in streamed],
+                                   [ticker_stats[t][0] for t in streamed],
+                                   [ticker_stats[t][1] for t in streamed],
+                                   sequence_length=SEQUENCE_LEN,
+                                   key=cache_key)
+    fit_data = dict(x=mmap_dataset.MmapSequence(args.mmap, batch_size=BATCH_SIZE),
+                    validation_data=(validation_sequences, validation_labels))
+elif args.stream:
+    streamed = [ticker for ticker in tickers if ticker in ticker_matrices]
+    train_dataset = dataset.make_datasets([ticker_matrices[t] for t in streamed],
+                                          [ticker_stats[t][0] for t in streamed],
+                                          [ticker_stats[t][1] for t in streamed],
+                                          splits=('train',),
+                                          batch_size=BATCH_SIZE,
+                                          sequence_length=SEQUENCE_LEN)['train']
+    fit_data = dict(x=train_dataset, validation_data=(validation_sequences, validation_labels))
+else:
+    fit_data = dict(x=train_sequences, y=train_labels, batch_size=BATCH_SIZE, shuffle=True,
+                    validation_data=(validation_sequences, validation_labels))
+
 # Train Model
-#model.fit(train_sequences, train_labels,
-#          validation_data=(validation_sequences, validation_labels),
+#model.fit(**fit_data,
 #          epochs=EPOCHS,
-#          batch_size=BATCH_SIZE,
-#          shuffle=True,
-#          callbacks=[checkpoint_callback_train, checkpoint_callback_val, get_lr_callback(batch_size=BATCH_SIZE, epochs=EPOCHS)])
+#          callbacks=[checkpoint_callback_train, checkpoint_callback_val, get_lr_callback(batch_size=GLOBAL_BATCH_SIZE, epochs=EPOCHS)])
+
+# predict/evaluate would need every worker in lockstep; evaluate with a normal run on the saved weights
+if args.distributed:
+    print("Distributed training done, evaluate with a run without --distributed")
+    profiler.finish(report_path if distributed.is_chief() else distributed.checkpoint_path(report_path))
+    exit()
 
 
 ########################
 ## INFER MODEL (TEST) ##
 ########################
+profiler.stage("evaluate")
+
 # Load Weights
 model.load_weights("transformer_val_model.keras")
 
+# Export the best weights with the feature order, window length and normalization stats baked in
+exported = [ticker for ticker in tickers if ticker in ticker_matrices]
+artifact.export(args.artifact, model, stats, exported, sequence_length=SEQUENCE_LEN, horizon=seq.HORIZON)
+print(f"Exported inference artifact for {len(exported)} tickers to {args.artifact}")
+
 # Make predictions
 accuracy = model.evaluate(validation_sequences, validation_labels)[1]
 print(f"{accuracy=}")
 predictions = model.predict(validation_sequences)
 
+# dir_acc is computed in float32 on the normalized values; check it against the float64 reference
+mismatches, acc_fp32, acc_fp64 = evaluation.direction_mismatches(validation_labels, predictions)
+print(f"dir_acc float32={acc_fp32:.6f} float64={acc_fp64:.6f} ({mismatches} of {len(predictions)} windows differ)")
+profiler.record("dir_acc_fp32_mismatches", mismatches)
+
+# The same forecast scored against the direction at every label horizon
+horizon_acc = evaluation.horizon_accuracy(validation_labels, predictions, validation_directions)
+print(horizon_acc)
+profiler.record("dir_acc_by_horizon", horizon_acc.to_dict())
+
 mean, std = validation_labels[:, 2], validation_labels[:, 3]
 
 # Correctly scale the actual and predicted values
@@ -604,40 +555,43 @@ from sklearn.metrics import r2_score
 r2 = r2_score(validation_labels[:, 1], predictions[:, 0])
 print(f"R-squared: {r2}")
 
-best_acc = 0
-best_ticker = ''
-for ticker in tqdm.tqdm(tickers):
-    try:
-        sequences = sequences_dict[ticker]
-        labels = sequence_labels[ticker]
-
-        total_size = len(sequences)
-        train_size = int(total_size * 0.9)
-        val_size = int(total_size * 0.05)
-        
-        tr_data = sequences[:train_size]
-        tr_labs = labels[:train_size]
-        
-        va_data = sequences[train_size:train_size + val_size]
-        va_labs = labels[train_size:train_size + val_size]
-        
-        te_data = sequences[train_size + val_size:]
-        te_labs = labels[train_size + val_size:]
-
-        tr_accuracy = model.evaluate(tr_data, tr_labs)[1]
-        va_accuracy = model.evaluate(va_data, va_labs)[1]
-        te_accuracy = model.evaluate(te_data, te_labs)[1]
-        print(f"{tr_accuracy=}")
-        print(f"{va_accuracy=}")
-        print(f"{te_accuracy=}")
-
-        if te_accuracy > best_acc:
-            best_acc = te_accuracy
-            best_ticker = ticker
-
-        
-    except Exception as e:
-        print(e)
-        pass
-
+# Per-ticker train/validation/test dir_acc from a single predict over every window
+evaluated = [ticker for ticker in tickers if ticker in ticker_matrices]
+ticker_metrics = evaluation.evaluate_tickers(model,
+                                             evaluated,
+                                             [ticker_matrices[t] for t in evaluated],
+                                             [ticker_stats[t][0] for t in evaluated],
+                                             [ticker_stats[t][1] for t in evaluated],
+                                             batch_size=BATCH_SIZE,
+                                             sequence_length=SEQUENCE_LEN)
+ticker_metrics = ticker_metrics.sort_values('test_dir_acc', ascending=False)
+ticker_metrics.to_csv("ticker_metrics.csv")
+print(ticker_metrics.head(20))
+
+best_ticker = ticker_metrics.index[0]
+best_acc = ticker_metrics['test_dir_acc'].iloc[0]
 print(f"{best_ticker} : {best_acc=}")
+
+# Walk-forward backtest of the test-split forecasts over every ticker at once (see utils/backtest.py)
+profiler.stage("backtest")
+FEE = 0.0       # commission, fraction of traded notional
+SPREAD = 0.0005 # bid/ask spread, fraction of price
+prices, signal = backtest.forecast_signal(model,
+                                          [ticker_matrices[t] for t in evaluated],
+                                          [ticker_stats[t][0] for t in evaluated],
+                                          [ticker_stats[t][1] for t in evaluated],
+                                          batch_size=BATCH_SIZE,
+                                          datetimes=[ticker_panel.times(t) for t in evaluated],
+                                          sequence_length=SEQUENCE_LEN)
+folds = backtest.walk_forward(prices, signal, folds=5, entries=(0.0, 0.001, 0.002, 0.005), fee=FEE, spread=SPREAD)
+print(folds)
+
+result = backtest.backtest(prices, backtest.positions(signal, entry=0.001), fee=FEE, spread=SPREAD)
+backtest_metrics = backtest.summary(result, evaluated).sort_values('total_return', ascending=False)
+backtest_metrics.to_csv("backtest_metrics.csv")
+print(backtest_metrics.head(20))
+print(backtest.portfolio_summary(result))
+
+profiler.finish(report_path)
+print(profiler.summary())
+print(f"Stage report written to {report_path}")
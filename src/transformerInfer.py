@@ -1,3 +1,4 @@
+import os
 import tqdm
 import math
 import argparse
@@ -7,49 +8,16 @@ import yfinance as yf
 import seaborn as sns
 from statistics import mean
 import matplotlib.pyplot as plt
+from sklearn.metrics import r2_score
 from sklearn.preprocessing import StandardScaler
 
 import tensorflow as tf
-from tensorflow.keras.models import Model
-from tensorflow.keras.regularizers import l2
-from tensorflow.keras.callbacks import ModelCheckpoint
-from tensorflow.keras.layers import Input, LSTM, Dense, Dropout, Concatenate, Permute, Reshape, Multiply, Flatten, LayerNormalization, MultiHeadAttention, Add, GlobalAveragePooling1D
 
+from utils import artifact, cache, dataset, feature_store, models, panel, sequences as seq
 
-SEQUENCE_LEN = 24
-
-def calculate_momentum(data, periods=10):
-    """Calculate Momentum."""
-    momentum = data - data.shift(periods)
-    return momentum
-
-def calculate_roc(data, periods=10):
-    """Calculate Rate of Change."""
-    roc = ((data - data.shift(periods)) / data.shift(periods)) * 100
-    return roc
-
-def calculate_sma(data, window=10):
-    """Calculate Simple Moving Average."""
-    sma = data.rolling(window=window).mean()
-    return sma
-
-def calculate_rsi(data, window=10):
-    delta = data.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=window, min_periods=1).mean()
-    avg_loss = loss.rolling(window=window, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
 
-def calculate_bollinger_bands(data, window=10, num_of_std=2):
-    """Calculate Bollinger Bands"""
-    rolling_mean = data.rolling(window=window).mean()
-    rolling_std = data.rolling(window=window).std()
-    upper_band = rolling_mean + (rolling_std * num_of_std)
-    lower_band = rolling_mean - (rolling_std * num_of_std)
-    return upper_band, lower_band
+SEQUENCE_LEN = 24
+STORE_DIR = "store/data" # written by `python -m utils.feature_store --src data --dst store/data`
 
 tickers = ['AAPL','ABBV','ACN', 'ADBE','AEP','AFL','AIG','ALGN',
            'ALL','AMAT','AMD','AMGN','AMZN','AON','APA','APD','APH',
@@ -100,57 +68,48 @@ tickers = tickers[-5:]
 tickers = ["AAPL"]
 
 
-stats = pd.read_csv(f"data/STATS.csv")
-ticker_data_frames = []
-for ticker in tqdm.tqdm(tickers):
-    df = pd.read_csv(f"data/{ticker}.csv")
-    df['Datetime'] = pd.to_datetime(df['Datetime'], utc=True)
-    df['Datetime'] = df['Datetime'].dt.tz_localize(None)
-    ticker_data_frames.append(df)
-    
-# Concatenate all ticker DataFrames
-percent_change_data = pd.concat(ticker_data_frames, axis=1)
-print(stats)
-
-# Remove any NaN values that may have occurred from the pct_change() calculation
-percent_change_data.replace([np.inf, -np.inf], np.nan, inplace=True)
-percent_change_data.dropna(inplace=True)
-
-print(percent_change_data)
-
-###############################
-## CREATE LABELS (TRANSFORM) ##
-###############################
-# Example trading strategy for labeling
-def define_label(data):
-    #data = (data * STD[f'{tickers[0]}_close']) + MEAN[f'{tickers[0]}_close']
-    return data
-    
-# Shift the percentage change data to create labels
-labels = percent_change_data.shift(-1).map(define_label)
-
-# Drop the last row in both percent_change_data and labels as it won't have a corresponding label
-percent_change_data = percent_change_data.iloc[:-1]
-labels = labels.iloc[:-1]
-
-################################
-## HELPER TO CREATE SEQUENCES ##
-################################
-# Function to create X-day sequences for each ticker
-def create_sequences(data, labels, mean, std, sequence_length=SEQUENCE_LEN):
-    sequences = []
-    lab = []
-    data_size = len(data)
-
-    # Loop to create each sequence and its corresponding label
-    for i in range(data_size - (sequence_length + 13)): # Ensure we have data for the label
-        if i == 0:
-          continue
-        sequences.append(data[i:i + sequence_length])  # The sequence of data
-        lab.append([labels[i-1], labels[i + 12], mean[0], std[0]]) # The label and scaling factors
-
-    return np.array(sequences), np.array(lab)
-
+# Same cache key as transformer.py, so a training run on the same tickers and data has already built this (see utils/cache.py)
+if os.path.isdir(STORE_DIR):
+    stats_path = os.path.join(STORE_DIR, "STATS.csv")
+    sources = [os.path.join(feature_store.ticker_dir(STORE_DIR, t), "values.npy") for t in tickers] + [stats_path]
+else:
+    stats_path = "data/STATS.csv"
+    sources = [f"data/{t}.csv" for t in tickers] + [stats_path]
+cache_key = cache.build_key(tickers=tickers,
+                            shard=None,
+                            features=artifact.MODEL_FEATURES,
+                            align='ticker',
+                            sequence_length=SEQUENCE_LEN,
+                            horizon=seq.HORIZON,
+                            splits=(dataset.TRAIN_FRAC, dataset.VAL_FRAC),
+                            sources=cache.fingerprint(sources))
+cached = cache.load(cache.CACHE_DIR, cache_key)
+
+# One long float32 panel, NaN/inf rows dropped per ticker (see utils/panel.py)
+if cached is not None:
+    arrays, meta = cached
+    stats = pd.read_csv(stats_path)
+    ticker_panel = panel.Panel.from_arrays(arrays, meta["tickers"], meta["columns"])
+else:
+    if os.path.isdir(STORE_DIR):
+        stats = feature_store.read_stats(STORE_DIR)
+        ticker_panel = panel.from_store(STORE_DIR, tickers, artifact.MODEL_FEATURES)
+    else:
+        stats = pd.read_csv(f"data/STATS.csv")
+        ticker_data_frames = []
+        for ticker in tqdm.tqdm(tickers):
+            df = feature_store.read_csv(f"data/{ticker}.csv")
+            df['Datetime'] = pd.to_datetime(df['Datetime'], utc=True)
+            df['Datetime'] = df['Datetime'].dt.tz_localize(None)
+            ticker_data_frames.append(df)
+        ticker_panel = panel.from_frames(ticker_data_frames, tickers, artifact.MODEL_FEATURES)
+    print(stats)
+
+    # Drop each ticker's last row as it won't have a corresponding label
+    ticker_panel = ticker_panel.drop_last()
+    cache.save(cache.CACHE_DIR, cache_key, ticker_panel.arrays(), meta={'tickers': ticker_panel.tickers, 'columns': ticker_panel.columns})
+
+ticker_matrices = {ticker: ticker_panel.matrix(ticker) for ticker in ticker_panel.tickers}
 
 ######################
 ## CREATE SEQUENCES ##
@@ -158,41 +117,11 @@ def create_sequences(data, labels, mean, std, sequence_length=SEQUENCE_LEN):
 sequences_dict = {}
 sequence_labels = {}
 for ticker in tickers:
-
-    # Extract close and volume data for the ticker
-    close = percent_change_data[ticker+'_close'].values
-    upper = percent_change_data[ticker+'_upper'].values
-    lower = percent_change_data[ticker+'_lower'].values
-    width = percent_change_data[ticker+'_width'].values
-    rsi = percent_change_data[ticker+'_rsi'].values
-    sma = percent_change_data[ticker+'_sma'].values
-    roc = percent_change_data[ticker+'_roc'].values
-    momentum = percent_change_data[ticker+'_momentum'].values
-    volume = percent_change_data[ticker+'_volume'].values
-    diff = percent_change_data[ticker+'_diff'].values
-    pct_change = percent_change_data[ticker+'_percent_change_close'].values
-    
-    # Combine close and volume data
-    ticker_data = np.column_stack((close,
-                                   #upper,
-                                   #lower,
-                                   width,
-                                   rsi,
-                                   #sma,
-                                   roc,
-                                   #momentum,
-                                   volume,
-                                   diff,
-                                   pct_change))
-    
-    # Generate sequences
-    #datetime = percent_change_data['Datetime'].to_numpy()
-    datetime = percent_change_data['Datetime'].values.astype('datetime64[s]')
     attribute=ticker+"_close"
-    ticker_sequences, lab = create_sequences(ticker_data,
-                                             labels[attribute].values[SEQUENCE_LEN-1:],
-                                             stats[attribute+"_mean"].values,
-                                             stats[attribute+"_std"].values)
+    ticker_sequences, lab = seq.create_sequences(ticker_matrices[ticker],
+                                                 stats[attribute+"_mean"].values[0],
+                                                 stats[attribute+"_std"].values[0],
+                                                 sequence_length=SEQUENCE_LEN)
     #print(f"{ticker}, {len(ticker_sequences)=}, {len(lab)=}, {len(ticker_sequences)==len(lab)=}")
     sequences_dict[ticker] = ticker_sequences
 
@@ -204,12 +133,12 @@ all_sequences = []
 all_labels = []
 
 for ticker in tickers:
-    all_sequences.extend(sequences_dict[ticker])
-    all_labels.extend(sequence_labels[ticker])
+    all_sequences.append(sequences_dict[ticker])
+    all_labels.append(sequence_labels[ticker])
 
-# Convert to numpy arrays
-all_sequences = np.array(all_sequences)
-all_labels = np.array(all_labels)
+# Materialize the window views into single arrays
+all_sequences = np.concatenate(all_sequences)
+all_labels = np.concatenate(all_labels)
 
 
 ##########
@@ -230,22 +159,22 @@ for ticker in tickers:
     train_size = int(total_size * 0.9)
     val_size = int(total_size * 0.05)
     
-    train_sequences.extend(sequences[:train_size])
-    train_labels.extend(labels[:train_size])
+    train_sequences.append(sequences[:train_size])
+    train_labels.append(labels[:train_size])
     
-    validation_sequences.extend(sequences[train_size:train_size + val_size])
-    validation_labels.extend(labels[train_size:train_size + val_size])
+    validation_sequences.append(sequences[train_size:train_size + val_size])
+    validation_labels.append(labels[train_size:train_size + val_size])
     
-    test_sequences.extend(sequences[train_size + val_size:])
-    test_labels.extend(labels[train_size + val_size:])
+    test_sequences.append(sequences[train_size + val_size:])
+    test_labels.append(labels[train_size + val_size:])
 
-# Convert lists to numpy arrays
-train_sequences = np.array(train_sequences)
-train_labels = np.array(train_labels)
-validation_sequences = np.array(validation_sequences)
-validation_labels = np.array(validation_labels)
-test_sequences = np.array(test_sequences)
-test_labels = np.array(test_labels)
+# Materialize the window views once, straight into the final arrays
+train_sequences = np.concatenate(train_sequences)
+train_labels = np.concatenate(train_labels)
+validation_sequences = np.concatenate(validation_sequences)
+validation_labels = np.concatenate(validation_labels)
+test_sequences = np.concatenate(test_sequences)
+test_labels = np.concatenate(test_labels)
 
 # Shuffle train sequences and labels
 np.random.seed(42)
@@ -253,86 +182,13 @@ shuffled_indices = np.random.permutation(len(train_sequences))
 train_sequences = train_sequences[shuffled_indices]
 train_labels = train_labels[shuffled_indices]
 
-###########################
-## DEFINE NEURAL NETWORK ##
-###########################
-def transformer_encoder(inputs, head_size, num_heads, ff_dim, dropout=0):
-    # Attention and Normalization
-    x = LayerNormalization(epsilon=1e-6)(inputs)
-    x = MultiHeadAttention(key_dim=head_size, num_heads=num_heads, dropout=dropout)(x, x)
-    x = Add()([x, inputs])
-
-    # Feed Forward Part
-    y = LayerNormalization(epsilon=1e-6)(x)
-    y = Dense(ff_dim, activation="relu")(y)
-    y = Dropout(dropout)(y)
-    y = Dense(inputs.shape[-1])(y)
-    return Add()([y, x])
-
-def build_transformer_model(input_shape, head_size, num_heads, ff_dim, num_layers, dropout=0):
-    inputs = Input(shape=input_shape)
-    x = inputs
-    
-    # Create multiple layers of the Transformer block
-    for _ in range(num_layers):
-        x = transformer_encoder(x, head_size, num_heads, ff_dim, dropout)
-
-    # Final part of the model
-    x = GlobalAveragePooling1D()(x)
-    x = LayerNormalization(epsilon=1e-6)(x)
-    outputs = Dense(1, activation="linear")(x)
-
-    # Compile model
-    model = Model(inputs=inputs, outputs=outputs)
-    return model
-
-# Model parameters
-input_shape = train_sequences.shape[1:]
-head_size = 12 #128 #512 #256 #128 #32
-num_heads = 8 #24 #16 #8 #2
-ff_dim = 24 #512 #1024 #1024 #512 #64
-num_layers = 6 #24 #12 #6 #2
-dropout = 0.90
-
-# Build the model
-model = build_transformer_model(input_shape, head_size, num_heads, ff_dim, num_layers, dropout)
-
-##########################
-## CUSTOM LOSS FUNCTION ##
-##########################
-
-def custom_mae_loss(y_true, y_pred):
-    y_true_next = tf.cast(y_true[:, 1], tf.float64)
-    y_pred_next = tf.cast(y_pred[:, 0], tf.float64)
-    abs_error = tf.abs(y_true_next - y_pred_next)
-    
-    return tf.reduce_mean(abs_error)
-
-def dir_acc(y_true, y_pred):
-    mean, std = tf.cast(y_true[:, 2], tf.float64), tf.cast(y_true[:, 3], tf.float64)
-    
-    y_true_prev = (tf.cast(y_true[:, 0], tf.float64) * std) + mean
-    y_true_next = (tf.cast(y_true[:, 1], tf.float64) * std) + mean
-    y_pred_next = (tf.cast(y_pred[:, 0], tf.float64) * std) + mean
-    
-    true_change = y_true_next - y_true_prev
-    pred_change = y_pred_next - y_true_prev
-    
-    correct_direction = tf.equal(tf.sign(true_change), tf.sign(pred_change))
-    
-    return tf.reduce_mean(tf.cast(correct_direction, tf.float64))
-
-
-###################
-## COMPILE MODEL ##
-###################
-BATCH_SIZE = 256
-SCALE = BATCH_SIZE // 16
-EPOCHS = math.ceil( (270000 // SCALE) / math.ceil(len(train_sequences) / BATCH_SIZE) )
-
-# Compile the model
-optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
-model.compile(optimizer=optimizer, loss=custom_mae_loss, metrics=[dir_acc])
+################
+## LOAD MODEL ##
+################
+# The checkpoint holds the architecture too, so the model is not rebuilt here; the
+# losses and dir_acc come from utils/models.py like in transformer.py
+model = tf.keras.models.load_model("transformer_val_model.keras", compile=False)
+models.compile_model(model, models.custom_mae_loss)
 
 model.summary()
 
@@ -340,20 +196,17 @@ model.summary()
 ########################
 ## INFER MODEL (TEST) ##
 ########################
-# Load Weights
-model.load_weights("transformer_val_model.keras")
-
 # Make predictions
-accuracy = model.evaluate(val_sequences, val_labels)[1]
+accuracy = model.evaluate(validation_sequences, validation_labels)[1]
 print(accuracy)
-predictions = model.predict(val_sequences)
+predictions = model.predict(validation_sequences)
 
 # Use a colorblind-friendly color palette
 colors = ['#377eb8', '#ff7f00', '#4daf4a']  # Blue, Orange, and Green
 
 plt.figure(figsize=(10, 6))
-plt.plot(val_labels[-500:, 0], label='Actual Line 1', color=colors[0])
-plt.plot(val_labels[-500:, 1], label='Actual Line 2', color=colors[1])
+plt.plot(validation_labels[-500:, 0], label='Actual Line 1', color=colors[0])
+plt.plot(validation_labels[-500:, 1], label='Actual Line 2', color=colors[1])
 plt.plot(predictions[-500:], label='Predicted', color=colors[2])
 plt.title(f'Actual vs. Predicted Val Values with accuracy={accuracy:.4f}')
 plt.legend()
@@ -361,5 +214,5 @@ plt.savefig(f"{ticker}_Actual_VS_Predicted.png")
 # plt.show()
 
 # Calculate additional metrics as needed
-r2 = r2_score(val_labels[:, 1], predictions[:, 0])
+r2 = r2_score(validation_labels[:, 1], predictions[:, 0])
 print(f"R-squared: {r2}")
@@ -9,29 +9,8 @@ from tensorflow.keras.layers import Input, Dense, Dropout, LayerNormalization, M
 
 import yfinance as yf
 
-
-def calculate_bollinger_bands(data, window=10, num_of_std=2):
-    """Calculate Bollinger Bands"""
-    rolling_mean = data.rolling(window=window).mean()
-    rolling_std = data.rolling(window=window).std()
-    upper_band = rolling_mean + (rolling_std * num_of_std)
-    lower_band = rolling_mean - (rolling_std * num_of_std)
-    return upper_band, lower_band
-
-def calculate_rsi(data, window=10):
-    delta = data.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=window, min_periods=1).mean()
-    avg_loss = loss.rolling(window=window, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_roc(data, periods=10):
-    """Calculate Rate of Change."""
-    roc = ((data - data.shift(periods)) / data.shift(periods)) * 100
-    return roc
+from utils import sequences as seq
+from utils.indicators import calculate_bollinger_bands, calculate_rsi, calculate_roc
 
 
 tickers = ['META', 'AAPL', 'MSFT', 'AMZN', 'GOOG']
@@ -89,31 +68,12 @@ df.dropna(inplace=True)
 df.head()
 
 
-# Shift the df data to create labels
-labels = df.shift(-1)
-
-# Drop the last row in both percent_change_data and labels as it won't have a corresponding label
-df = df.iloc[:-1]
-labels = labels.iloc[:-1]
-
-
 # Sequence len = 24 means that we have 2 hours of 5 min data
 SEQUENCE_LEN = 24 
 
-# Function to create X-day sequences for each ticker
-def create_sequences(data, labels, mean, std, sequence_length=SEQUENCE_LEN):
-    sequences = []
-    lab = []
-    data_size = len(data)
-    
-    # + 12 because we want to predict the next hour
-    for i in range(data_size - (sequence_length + 12)):
-          sequences.append(data[i:i + sequence_length])
-          lab.append([labels[i], labels[i+13], mean[0], std[0]])
-        
-    return np.array(sequences), np.array(lab)
-
-
+# Windows are strided views of each ticker matrix; the labels are the close one bar
+# after the window and 13 bars after that (the next hour), i.e. the df.shift(-1)
+# labels with the last row dropped
 sequences_dict = {}
 sequence_labels = {}
 for ticker in tickers:
@@ -138,25 +98,18 @@ for ticker in tickers:
     
     # Generate sequences
     attribute = ticker+"_close"
-    ticker_sequences, lab = create_sequences(ticker_data,
-                                             labels[attribute].values[SEQUENCE_LEN-1:],
-                                             stats[attribute+"_mean"].values,
-                                             stats[attribute+"_std"].values)
+    ticker_sequences, lab = seq.create_sequences(ticker_data,
+                                                 stats[attribute+"_mean"].values[0],
+                                                 stats[attribute+"_std"].values[0],
+                                                 sequence_length=SEQUENCE_LEN,
+                                                 label_offset=1)
     
     sequences_dict[ticker] = ticker_sequences
     sequence_labels[ticker] = lab
 
-# Combine data and labels from all tickers
-all_sequences = []
-all_labels = []
-
-for ticker in tickers:
-    all_sequences.extend(sequences_dict[ticker])
-    all_labels.extend(sequence_labels[ticker])
-
-# Convert to numpy arrays
-all_sequences = np.array(all_sequences)
-all_labels = np.array(all_labels)
+# Combine data and labels from all tickers, copying each window once
+all_sequences = np.concatenate([sequences_dict[ticker] for ticker in tickers])
+all_labels = np.concatenate([sequence_labels[ticker] for ticker in tickers])
 
 
 np.random.seed(42)
@@ -0,0 +1,137 @@
+"""
+Self-contained inference artifact.
+
+export() writes a SavedModel that carries everything inference needs:
+
+    {path}/saved_model.pb, variables/   trained weights and two serving signatures
+    {path}/assets/spec.json             feature order, window length, horizon and
+                                        per-ticker mean/std
+
+Both signatures take a batch of ticker symbols plus one window per symbol:
+
+    serving_default(ticker, windows)   windows already normalized, as stored in
+                                       data/{ticker}.csv or the feature store
+    raw(ticker, windows)               un-normalized indicator values; the
+                                       per-ticker z-scoring runs in the graph
+
+and return the normalized prediction, the de-normalized next close, the last
+close and the predicted direction. Loading needs only TensorFlow, not the
+training script or the code that built the graph:
+
+    predictor = artifact.load("artifacts/transformer")
+    predictor.predict(["AAPL"], windows)
+"""
+import os
+import json
+
+import numpy as np
+import tensorflow as tf
+
+# Columns the transformer is trained on, in input order
+MODEL_FEATURES = ['close', 'width', 'rsi', 'roc', 'volume', 'diff', 'percent_change_close']
+
+def ticker_stats(stats, tickers, features=MODEL_FEATURES):
+    """(tickers x features) mean and std arrays from a STATS.csv frame."""
+    means = np.array([[stats[f"{t}_{f}_mean"].values[0] for f in features] for t in tickers], dtype=np.float32)
+    stds = np.array([[stats[f"{t}_{f}_std"].values[0] for f in features] for t in tickers], dtype=np.float32)
+    return means, stds
+
+class InferenceModule(tf.Module):
+    def __init__(self, model, tickers, means, stds, sequence_length, features):
+        super().__init__()
+        self.model = model
+        self.index = tf.lookup.StaticHashTable(
+            tf.lookup.KeyValueTensorInitializer(tf.constant(tickers), tf.range(len(tickers), dtype=tf.int64)),
+            default_value=-1)
+        self.means = tf.constant(means, dtype=tf.float32)
+        self.stds = tf.constant(stds, dtype=tf.float32)
+
+        window_spec = tf.TensorSpec([None, sequence_length, len(features)], tf.float32)
+        ticker_spec = tf.TensorSpec([None], tf.string)
+        self.serve = tf.function(self._serve, input_signature=[ticker_spec, window_spec])
+        self.serve_raw = tf.function(self._serve_raw, input_signature=[ticker_spec, window_spec])
+
+    def _lookup(self, ticker):
+        index = self.index.lookup(ticker)
+        known = index >= 0
+        index = tf.maximum(index, 0)
+        nan = tf.fill(tf.shape(self.means[:1]), float('nan'))
+        mean = tf.where(known[:, None], tf.gather(self.means, index), nan)
+        std = tf.where(known[:, None], tf.gather(self.stds, index), nan)
+        return mean, std
+
+    def _serve(self, ticker, windows):
+        mean, std = self._lookup(ticker)
+        prediction = tf.cast(self.model(windows, training=False)[:, 0], tf.float32)
+        last = windows[:, -1, 0]
+
+        # column 0 is the close
+        return {'prediction': prediction,
+                'next_close': prediction * std[:, 0] + mean[:, 0],
+                'last_close': last * std[:, 0] + mean[:, 0],
+                'direction': tf.sign(prediction - last)}
+
+    def _serve_raw(self, ticker, windows):
+        mean, std = self._lookup(ticker)
+        return self._serve(ticker, (windows - mean[:, None, :]) / std[:, None, :])
+
+def export(path, model, stats, tickers, sequence_length, horizon, features=MODEL_FEATURES):
+    """
+    Write the inference artifact for model.
+
+    Parameters:
+    - path (str): Output directory.
+    - model (tf.keras.Model): Trained model.
+    - stats (pandas.DataFrame): STATS.csv frame with '{ticker}_{feature}_mean' / '_std' columns.
+    - tickers (list): Tickers the artifact can serve.
+    - sequence_length (int): Window length.
+    - horizon (int): Bars between the window's last close and the predicted one.
+    - features (list): Feature columns in model input order.
+    """
+    means, stds = ticker_stats(stats, tickers, features)
+    module = InferenceModule(model, list(tickers), means, stds, sequence_length, features)
+
+    spec = {'features': list(features),
+            'sequence_length': int(sequence_length),
+            'horizon': int(horizon),
+            'tickers': list(tickers),
+            'mean': means.tolist(),
+            'std': stds.tolist()}
+    os.makedirs(path, exist_ok=True)
+    spec_file = os.path.join(path, "spec.json")
+    with open(spec_file, "w") as file:
+        json.dump(spec, file)
+    module.spec = tf.saved_model.Asset(spec_file)
+
+    tf.saved_model.save(module, path, signatures={'serving_default': module.serve, 'raw': module.serve_raw})
+    os.remove(spec_file)  # copied into {path}/assets
+
+class Predictor:
+    """Loaded artifact: spec plus the two serving signatures."""
+    def __init__(self, path):
+        self.module = tf.saved_model.load(path)
+        with open(os.path.join(path, "assets", "spec.json"), "r") as file:
+            self.spec = json.load(file)
+        self.features = self.spec['features']
+        self.sequence_length = self.spec['sequence_length']
+        self.horizon = self.spec['horizon']
+        self.tickers = self.spec['tickers']
+
+    def predict(self, tickers, windows, raw=False):
+        """
+        Forecast one window per ticker.
+
+        Parameters:
+        - tickers (list): Ticker symbol per window.
+        - windows (numpy.ndarray): (batch x sequence_length x features) in spec['features'] order.
+        - raw (bool): windows are un-normalized indicator values.
+
+        Returns:
+        - dict: 'prediction', 'next_close', 'last_close', 'direction' arrays (NaN for unknown tickers).
+        """
+        fn = self.module.signatures['raw' if raw else 'serving_default']
+        out = fn(ticker=tf.constant(list(tickers)), windows=tf.constant(np.asarray(windows, dtype=np.float32)))
+        return {key: value.numpy() for key, value in out.items()}
+
+def load(path):
+    return Predictor(path)
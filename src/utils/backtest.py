@@ -0,0 +1,318 @@
+"""
+Vectorized walk-forward backtester over a (time x tickers) panel.
+
+Everything is whole-array NumPy: entry/exit thresholds become positions
+through a forward fill along time, fees and half the bid/ask spread are
+charged on turnover, and trades are found as runs of constant position
+sign and reduced with bincount. There is no per-bar or per-ticker Python
+loop, so thousands of tickers run in one pass.
+
+Timing: the position chosen on bar t (from the signal known at t's close)
+is traded at t's close and earns the return from t to t + 1.
+
+Gaps: a NaN bar inside a ticker's span (its first to last priced bar) holds
+the position and the last price, so the move across the gap is earned on the
+next priced bar and the gap costs no round trip. Outside its span a ticker is
+flat.
+"""
+import numpy as np
+import pandas as pd
+
+from utils import dataset
+from utils import sequences as seq
+
+def forward_fill(values):
+    """Carry the last non-NaN value of each column down; leading NaNs become 0."""
+    rows = np.arange(len(values))[:, None]
+    last = np.maximum.accumulate(np.where(np.isnan(values), -1, rows), axis=0)
+    filled = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+    return np.where(last >= 0, filled, 0.0)
+
+def positions(signal, entry=0.0, exit=None, short=False):
+    """
+    Target positions from a signal with hysteresis.
+
+    Long when signal > entry, held until signal <= exit; with short, also
+    short when signal < -entry, held until signal >= -exit. A NaN signal
+    holds the position (flat before the first signal).
+
+    Parameters:
+    - signal (numpy.ndarray): (T x tickers) forecast, e.g. the predicted return.
+    - entry (float): Threshold to open a position.
+    - exit (float): Threshold to close it. Default is entry (no hysteresis band).
+    - short (bool): Allow short positions.
+
+    Returns:
+    - numpy.ndarray: (T x tickers) positions in {-1, 0, 1}.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    exit = entry if exit is None else exit
+    if not -entry <= exit <= entry:
+        raise ValueError(f"exit must lie in [-entry, entry], got {entry=} {exit=}")
+
+    nan = np.full(signal.shape, np.nan)
+    held = forward_fill(np.where(signal > entry, 1.0, np.where(signal <= exit, 0.0, nan)))
+    if short:
+        # an entry on one side always crosses the other side's exit, so the two never overlap
+        held += forward_fill(np.where(signal < -entry, -1.0, np.where(signal >= -exit, 0.0, nan)))
+    return held
+
+def relative_spread(ask, bid):
+    """(ask - bid) / mid, the spread as a fraction of price."""
+    ask = np.asarray(ask, dtype=np.float64)
+    bid = np.asarray(bid, dtype=np.float64)
+    return (ask - bid) / ((ask + bid) / 2)
+
+def drawdown(equity):
+    """Fractional distance of equity below its running peak (<= 0)."""
+    return equity / np.maximum.accumulate(equity, axis=0) - 1.0
+
+def active_span(prices):
+    """(T x tickers) mask of the bars from each ticker's first to its last non-NaN price."""
+    valid = ~np.isnan(prices)
+    started = np.logical_or.accumulate(valid, axis=0)
+    ongoing = np.logical_or.accumulate(valid[::-1], axis=0)[::-1]
+    return started & ongoing
+
+def backtest(prices, position, fee=0.0, spread=0.0, close_out=True):
+    """
+    Run target positions over a price panel.
+
+    Parameters:
+    - prices (numpy.ndarray): (T x tickers) prices, NaN where a ticker has no bar.
+    - position (numpy.ndarray): (T x tickers) target positions (fraction of one unit of capital);
+                                NaN holds the previous one.
+    - fee (float or numpy.ndarray): Commission as a fraction of traded notional.
+    - spread (float or numpy.ndarray): Bid/ask spread as a fraction of price (see relative_spread);
+                                       half of it is paid on every unit traded.
+    - close_out (bool): Flatten every ticker on its last priced bar so open trades pay their exit costs.
+
+    Returns:
+    - dict: 'returns', 'equity', 'drawdown', 'position', 'costs' as (T x tickers) arrays,
+            'portfolio_returns', 'portfolio_equity', 'portfolio_drawdown' as (T,) arrays for an
+            equal-weight book, and 'trades' with per-trade 'ticker', 'entry', 'exit', 'pnl' arrays.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    position = np.array(position, dtype=np.float64)
+    if position.shape != prices.shape:
+        raise ValueError(f"position {position.shape} and prices {prices.shape} differ in shape")
+    T, N = prices.shape
+
+    # gaps inside a ticker's span hold the position and the last price; outside it the ticker is flat
+    active = active_span(prices)
+    position = np.where(active, forward_fill(position), 0.0)
+    if close_out:
+        priced = np.flatnonzero(active.any(axis=0))
+        last = T - 1 - np.argmax(active[::-1], axis=0)
+        position[last[priced], priced] = 0.0
+    filled = np.where(active, forward_fill(prices), np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bar_returns = np.zeros_like(prices)
+        bar_returns[1:] = filled[1:] / filled[:-1] - 1.0
+    bar_returns = np.nan_to_num(bar_returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    previous = np.vstack([np.zeros((1, N)), position[:-1]])
+    cost_rate = np.broadcast_to(np.asarray(fee, dtype=np.float64) + np.asarray(spread, dtype=np.float64) / 2,
+                                prices.shape)
+    gross = previous * bar_returns
+    costs = np.abs(position - previous) * cost_rate
+    returns = gross - costs
+
+    equity = np.cumprod(1.0 + returns, axis=0)
+    portfolio_returns = returns.mean(axis=1)
+    portfolio_equity = np.cumprod(1.0 + portfolio_returns)
+
+    return {'returns': returns,
+            'equity': equity,
+            'drawdown': drawdown(equity),
+            'position': position,
+            'costs': costs,
+            'portfolio_returns': portfolio_returns,
+            'portfolio_equity': portfolio_equity,
+            'portfolio_drawdown': drawdown(portfolio_equity),
+            'trades': trades(position, gross, cost_rate)}
+
+def trades(position, gross, cost_rate):
+    """
+    Split the book into trades (runs of constant nonzero position sign per ticker)
+    and total each trade's P&L, entry and exit costs included.
+    """
+    T, N = position.shape
+    sign = np.sign(position)
+    previous_sign = np.vstack([np.zeros((1, N)), sign[:-1]])
+    previous = np.vstack([np.zeros((1, N)), position[:-1]])
+    opened = (sign != 0) & (sign != previous_sign)
+
+    # global trade id of the position held after each bar, -1 when flat
+    per_ticker = opened.sum(axis=0)
+    first_id = np.concatenate([[0], np.cumsum(per_ticker)[:-1]])
+    ids = np.where(sign != 0, np.cumsum(opened, axis=0) - 1 + first_id, -1)
+    previous_ids = np.vstack([np.full((1, N), -1), ids[:-1]])
+    count = int(per_ticker.sum())
+
+    # a sign flip splits the turnover into the old trade's exit and the new trade's entry;
+    # a resize within one trade is charged to that trade
+    flipped = sign != previous_sign
+    exit_cost = np.where(flipped, np.abs(previous), 0.0) * cost_rate
+    entry_cost = np.where(flipped, np.abs(position), np.abs(position - previous)) * cost_rate
+
+    held, current = previous_ids >= 0, ids >= 0
+    pnl = (np.bincount(previous_ids[held], weights=gross[held] - exit_cost[held], minlength=count)
+           - np.bincount(ids[current], weights=entry_cost[current], minlength=count))
+
+    # ids run ticker by ticker, then in time, which is the column-major order of the masks
+    bars = np.broadcast_to(np.arange(T)[:, None], (T, N)).T
+    tickers = np.broadcast_to(np.arange(N), (T, N)).T
+    # a trade exits on the bar its position is traded away (the last bar if it is still open)
+    exit = np.full(count, T - 1, dtype=np.int64)
+    closing = held & (previous_ids != ids)
+    exit[previous_ids[closing]] = bars.T[closing]
+    return {'ticker': tickers[opened.T], 'entry': bars[opened.T],
+            'exit': exit, 'pnl': pnl}
+
+def summary(result, tickers=None):
+    """
+    Per-ticker statistics of a backtest() result.
+
+    Returns:
+    - pandas.DataFrame: Indexed by ticker with total_return, max_drawdown, trades,
+                        hit_rate (share of trades with positive P&L), mean_trade,
+                        exposure (share of bars in the market) and costs.
+    """
+    returns, trade = result['returns'], result['trades']
+    N = returns.shape[1]
+    tickers = range(N) if tickers is None else tickers
+
+    counts = np.bincount(trade['ticker'], minlength=N)
+    wins = np.bincount(trade['ticker'], weights=(trade['pnl'] > 0).astype(np.float64), minlength=N)
+    pnl = np.bincount(trade['ticker'], weights=trade['pnl'], minlength=N)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hit_rate = wins / counts
+        mean_trade = pnl / counts
+
+    return pd.DataFrame({'total_return': result['equity'][-1] - 1.0,
+                         'max_drawdown': result['drawdown'].min(axis=0),
+                         'trades': counts,
+                         'hit_rate': hit_rate,
+                         'mean_trade': mean_trade,
+                         'exposure': (result['position'] != 0).mean(axis=0),
+                         'costs': result['costs'].sum(axis=0)},
+                        index=pd.Index(list(tickers), name='ticker'))
+
+def portfolio_summary(result):
+    """Equal-weight book statistics of a backtest() result, as a dict."""
+    trade = result['trades']
+    return {'total_return': float(result['portfolio_equity'][-1] - 1.0),
+            'max_drawdown': float(result['portfolio_drawdown'].min()),
+            'trades': int(len(trade['pnl'])),
+            'hit_rate': float(np.mean(trade['pnl'] > 0)) if len(trade['pnl']) else float('nan'),
+            'costs': float(result['costs'].mean(axis=1).sum())}
+
+def walk_forward_folds(n, folds=5, min_train=None):
+    """
+    Rolling-origin folds over n bars: fold k tests on the k-th of `folds` equal
+    blocks after min_train, and everything before it is its in-sample history.
+
+    Returns:
+    - list: (test_start, test_stop) bar ranges.
+    """
+    min_train = n // (folds + 1) if min_train is None else min_train
+    edges = np.linspace(min_train, n, folds + 1).astype(np.int64)
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+def walk_forward(prices, signal, folds=5, min_train=None, entries=(0.0,), exit=None, short=False,
+                 fee=0.0, spread=0.0):
+    """
+    Walk-forward evaluation of threshold rules on a signal.
+
+    For each fold the entry threshold with the best equal-weight return on the
+    bars before the fold is chosen from entries, then traded out of sample on the
+    fold, starting flat. With a single entry this is a plain rolling-origin backtest.
+
+    Parameters:
+    - prices (numpy.ndarray): (T x tickers) prices.
+    - signal (numpy.ndarray): (T x tickers) forecast known at each bar's close.
+    - folds (int): Number of out-of-sample blocks.
+    - min_train (int): Bars before the first fold. Default is one block.
+    - entries (tuple): Candidate entry thresholds.
+    - exit (float): Exit threshold (see positions); None means each entry threshold itself.
+    - short (bool): Allow short positions.
+    - fee (float): Commission as a fraction of traded notional.
+    - spread (float): Bid/ask spread as a fraction of price.
+
+    Returns:
+    - pandas.DataFrame: One row per fold with its bar range, chosen entry and
+                        out-of-sample total_return, max_drawdown, trades, hit_rate, costs.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    signal = np.asarray(signal, dtype=np.float64)
+    spread = np.broadcast_to(np.asarray(spread, dtype=np.float64), prices.shape)
+
+    # the rules are causal, so one run per candidate over the full span serves every fold's in-sample choice
+    in_sample = np.stack([backtest(prices, positions(signal, e, exit, short), fee, spread, close_out=False)
+                          ['portfolio_returns'] for e in entries])
+    log_growth = np.cumsum(np.log1p(in_sample), axis=1)
+
+    rows = []
+    for start, stop in walk_forward_folds(len(prices), folds, min_train):
+        best = entries[int(np.argmax(log_growth[:, start - 1]))] if start > 0 else entries[0]
+        result = backtest(prices[start:stop], positions(signal[start:stop], best, exit, short),
+                          fee, spread[start:stop])
+        rows.append({'start': start, 'stop': stop, 'entry': best, **portfolio_summary(result)})
+    return pd.DataFrame(rows).rename_axis('fold')
+
+def forecast_signal(model, matrices, means, stds, split='test', batch_size=512, datetimes=None,
+                    sequence_length=seq.SEQUENCE_LEN, horizon=seq.HORIZON):
+    """
+    Prices and predicted returns of the transformer on one split, as (T x tickers) panels.
+
+    Bar t of ticker i is the last bar of one of its windows: the price is that
+    window's de-normalized last close and the signal is the model's predicted
+    relative move from it to the close `horizon` bars later.
+
+    Parameters:
+    - model (tf.keras.Model): Trained model.
+    - matrices (list): Per-ticker (T x features) arrays with the close in column 0.
+    - means (list): Close mean per ticker.
+    - stds (list): Close std per ticker.
+    - split (str): Which split's windows to trade.
+    - batch_size (int): Prediction batch size.
+    - datetimes (list): Per-ticker row timestamps. Needed when the matrices differ in
+                        length; bars are then lined up on the union of the window-end
+                        times, NaN where a ticker has no window.
+
+    Returns:
+    - tuple: (prices, signal), both (bars x tickers).
+    """
+    if datetimes is None and len({len(m) for m in matrices}) != 1:
+        raise ValueError("forecast_signal needs every ticker on the same bars, or their datetimes")
+    windows = dataset.make_datasets(matrices, means, stds, splits=(split,), batch_size=batch_size, shuffle=False,
+                                    sequence_length=sequence_length, horizon=horizon)[split]
+    predictions = model.predict(windows.map(lambda sequences, labels: sequences), verbose=0)[:, 0]
+
+    lengths = np.array([len(m) for m in matrices], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    rows, ticker_ids = dataset.window_starts(offsets, split, sequence_length, horizon)
+    close = np.concatenate([np.asarray(m[:, 0], dtype=np.float64) for m in matrices])
+    means = np.asarray(means, dtype=np.float64)[ticker_ids]
+    stds = np.asarray(stds, dtype=np.float64)[ticker_ids]
+
+    ends = rows + sequence_length - 1
+    prices = close[ends] * stds + means
+    predicted = predictions.astype(np.float64) * stds + means
+    with np.errstate(invalid='ignore', divide='ignore'):
+        signal = (predicted - prices) / np.abs(prices)
+
+    if datetimes is None:
+        # windows are ordered ticker by ticker with the same count each
+        shape = (len(matrices), -1)
+        return prices.reshape(shape).T, signal.reshape(shape).T
+
+    times = np.concatenate([np.asarray(d, dtype='datetime64[ns]') for d in datetimes])[ends]
+    calendar, bar = np.unique(times, return_inverse=True)
+    price_panel = np.full((len(calendar), len(matrices)), np.nan)
+    signal_panel = np.full((len(calendar), len(matrices)), np.nan)
+    price_panel[bar, ticker_ids] = prices
+    signal_panel[bar, ticker_ids] = signal
+    return price_panel, signal_panel
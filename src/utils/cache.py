@@ -0,0 +1,105 @@
+"""
+On-disk cache of built datasets, keyed by a hash of everything that went into them.
+
+build_key() hashes the build parameters (tickers, window length, horizon,
+feature columns, split ratios, ...) together with the size and mtime of
+every source file, so editing a CSV or re-running prepare_data.py is a miss
+while a second launch with the same inputs is a hit. Each build is a
+directory of .npy arrays:
+
+    {root}/{key}/{name}.npy   one file per array
+    {root}/{key}/meta.json    build parameters and any extra metadata
+
+Arrays are opened memory-mapped on a hit. Entries are evicted least recently
+used first once there are more than max_entries; a hit refreshes the entry's
+mtime, which is what the LRU order is read from.
+"""
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+CACHE_DIR = ".cache/datasets"
+MAX_ENTRIES = 8
+VERSION = 1  # bump when the layout of a cached build changes
+
+def fingerprint(paths):
+    """(path, size, mtime_ns) of every source; missing files are recorded as such."""
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((str(path), stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            stamps.append((str(path), None, None))
+    return stamps
+
+def walk(root):
+    """Every file under root, sorted, for fingerprinting a whole source directory."""
+    return sorted(os.path.join(dirpath, name) for dirpath, _, names in os.walk(root) for name in names)
+
+def build_key(**params):
+    """Stable hex digest of the build parameters (anything json can serialize via str())."""
+    payload = json.dumps({'version': VERSION, **params}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+def entry_dir(root, key):
+    return os.path.join(root, key)
+
+def load(root, key):
+    """
+    Read a cached build.
+
+    Returns:
+    - tuple: (arrays, meta) with arrays as a dict of memory-mapped arrays, or None on a miss.
+    """
+    path = entry_dir(root, key)
+    try:
+        with open(os.path.join(path, "meta.json"), "r") as file:
+            meta = json.load(file)
+    except FileNotFoundError:
+        return None
+
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in meta["arrays"]}
+    os.utime(path)  # most recently used
+    return arrays, meta["meta"]
+
+def save(root, key, arrays, meta=None, max_entries=MAX_ENTRIES):
+    """
+    Store a build and evict the least recently used ones beyond max_entries.
+
+    Parameters:
+    - root (str): Cache directory.
+    - key (str): build_key() of the inputs.
+    - arrays (dict): name -> numpy.ndarray.
+    - meta (dict): JSON-serializable metadata returned alongside the arrays by load().
+    - max_entries (int): Builds to keep.
+    """
+    path = entry_dir(root, key)
+    staging = f"{path}.tmp{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), array)
+
+    # meta.json last, then one rename, so a reader never sees a half-written build
+    with open(os.path.join(staging, "meta.json"), "w") as file:
+        json.dump({"arrays": list(arrays), "meta": meta or {}}, file)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+
+    evict(root, max_entries)
+
+def entries(root):
+    """Cached builds, least recently used first."""
+    if not os.path.isdir(root):
+        return []
+    keys = [key for key in os.listdir(root) if os.path.isfile(os.path.join(root, key, "meta.json"))]
+    return sorted(keys, key=lambda key: os.path.getmtime(entry_dir(root, key)))
+
+def evict(root, max_entries=MAX_ENTRIES):
+    keys = entries(root)
+    for key in keys[:max(0, len(keys) - max_entries)]:
+        shutil.rmtree(entry_dir(root, key), ignore_errors=True)
@@ -0,0 +1,97 @@
+"""
+Streaming tf.data input pipeline.
+
+Only the per-ticker (T x features) matrices are kept, packed end to end into
+one block. Each dataset element is just a (row, ticker id) pair; windows and
+their [prev, next, mean, std] labels are gathered from the block per batch,
+so the (N x 24 x features) training tensor is never materialized.
+"""
+import numpy as np
+import tensorflow as tf
+
+from utils import sequences as seq
+
+SPLITS = ('train', 'validation', 'test')
+TRAIN_FRAC = 0.9
+VAL_FRAC = 0.05
+
+def split_range(n, split, train_frac=TRAIN_FRAC, val_frac=VAL_FRAC):
+    """Window range [start, stop) of a split, using the same 90/5/5 cut as transformer.py."""
+    train_size = int(n * train_frac)
+    val_size = int(n * val_frac)
+    if split == 'train':
+        return 0, train_size
+    if split == 'validation':
+        return train_size, train_size + val_size
+    if split == 'test':
+        return train_size + val_size, n
+    raise ValueError(f"Unknown split {split!r}, expected one of {SPLITS}")
+
+def pack_matrices(matrices):
+    """Concatenate per-ticker matrices and return (features, offsets) where ticker i owns rows offsets[i]:offsets[i+1]."""
+    lengths = np.array([len(m) for m in matrices], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return np.concatenate(matrices), offsets
+
+def window_starts(offsets, split, sequence_length=seq.SEQUENCE_LEN, horizon=seq.HORIZON):
+    """First packed row of every window in a split, and the ticker id it belongs to."""
+    rows = []
+    ticker_ids = []
+    for i in range(len(offsets) - 1):
+        n = seq.num_sequences(offsets[i + 1] - offsets[i], sequence_length, horizon)
+        start, stop = split_range(n, split)
+        rows.append(np.arange(offsets[i] + start, offsets[i] + stop, dtype=np.int64))
+        ticker_ids.append(np.full(stop - start, i, dtype=np.int32))
+    return np.concatenate(rows), np.concatenate(ticker_ids)
+
+def num_windows(matrices, split, sequence_length=seq.SEQUENCE_LEN, horizon=seq.HORIZON):
+    """Number of windows a split has over all matrices."""
+    total = 0
+    for m in matrices:
+        start, stop = split_range(seq.num_sequences(len(m), sequence_length, horizon), split)
+        total += stop - start
+    return total
+
+def make_datasets(matrices, means, stds, splits=SPLITS, batch_size=512, shuffle=True, seed=42,
+                  sequence_length=seq.SEQUENCE_LEN, horizon=seq.HORIZON):
+    """
+    Build one tf.data.Dataset per split over the same packed feature block.
+
+    Parameters:
+    - matrices (list): Per-ticker (T x features) arrays with the close in column 0.
+    - means (list): Close mean per ticker.
+    - stds (list): Close std per ticker.
+    - splits (tuple): Which of 'train', 'validation', 'test' to build.
+    - batch_size (int): Windows per batch.
+    - shuffle (bool): Reshuffle the train windows every epoch.
+    - seed (int): Shuffle seed.
+
+    Returns:
+    - dict: split name -> dataset of (sequences, labels) batches.
+    """
+    packed, offsets = pack_matrices(matrices)
+    features = tf.convert_to_tensor(packed)
+    close = features[:, 0]
+    means = tf.constant(means, dtype=features.dtype)
+    stds = tf.constant(stds, dtype=features.dtype)
+    window = tf.range(sequence_length, dtype=tf.int64)
+
+    def gather(rows, ticker_ids):
+        sequences = tf.gather(features, rows[:, None] + window)
+        labels = tf.stack([tf.gather(close, rows + sequence_length - 1),
+                           tf.gather(close, rows + sequence_length + horizon),
+                           tf.gather(means, ticker_ids),
+                           tf.gather(stds, ticker_ids)], axis=1)
+        return sequences, labels
+
+    datasets = {}
+    for split in splits:
+        rows, ticker_ids = window_starts(offsets, split, sequence_length, horizon)
+        ds = tf.data.Dataset.from_tensor_slices((rows, ticker_ids))
+        if shuffle and split == 'train':
+            ds = ds.shuffle(len(rows), seed=seed, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size)
+        ds = ds.map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+        datasets[split] = ds.prefetch(tf.data.AUTOTUNE)
+
+    return datasets
@@ -0,0 +1,75 @@
+"""
+Multi-worker data-parallel training helpers.
+
+Workers are described by the usual TF_CONFIG environment variable, e.g. for
+worker 0 of two hosts:
+
+    TF_CONFIG='{"cluster": {"worker": ["host0:12345", "host1:12345"]},
+                "task": {"type": "worker", "index": 0}}' \
+        python3 transformer.py --tickers NASDAQ --store store/data_nasdaq --distributed
+
+Each worker loads only its own shard of tickers and builds its input pipeline
+from that shard, so tf.data auto-sharding is turned off. Batches are sized for
+the global batch (per-replica batch x replicas in sync over every worker),
+but Keras rebatches each worker's pipeline to global batch / workers per step
+whatever the shard policy, so a step consumes worker_batch_size() windows of
+each shard and the steps per epoch are counted in those.
+"""
+import os
+import json
+import tempfile
+
+import tensorflow as tf
+
+def worker_info():
+    """(task index, number of workers) from TF_CONFIG; (0, 1) when it is not set."""
+    config = json.loads(os.environ.get("TF_CONFIG", "{}"))
+    workers = config.get("cluster", {}).get("worker", [])
+    index = config.get("task", {}).get("index", 0)
+    return index, max(1, len(workers))
+
+def is_chief():
+    return worker_info()[0] == 0
+
+def get_strategy():
+    """MultiWorkerMirroredStrategy over CPU workers (works single-process too, without TF_CONFIG)."""
+    return tf.distribute.MultiWorkerMirroredStrategy()
+
+def shard(names, index=None, count=None):
+    """This worker's share of names: every count-th one starting at index."""
+    if index is None or count is None:
+        index, count = worker_info()
+    return list(names)[index::count]
+
+def global_batch_size(batch_size, strategy):
+    """Global batch for a per-replica batch_size."""
+    return batch_size * strategy.num_replicas_in_sync
+
+def worker_batch_size(global_batch, num_workers=None):
+    """Windows of its own shard each worker consumes per step (the global batch split over the workers)."""
+    if num_workers is None:
+        num_workers = worker_info()[1]
+    return max(1, global_batch // num_workers)
+
+def distribute_options(ds):
+    """Turn tf.data auto-sharding off: every worker already reads only its own tickers."""
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+    return ds.with_options(options)
+
+def agreed_steps(local_steps, strategy):
+    """
+    Steps per epoch every worker can run: the mean of the workers' local step
+    counts. Shards differ in size and a collective step must be taken by all
+    workers, so each worker repeats its dataset and runs this many steps.
+    """
+    per_replica = strategy.run(lambda: tf.constant(local_steps, dtype=tf.int64))
+    total = strategy.reduce(tf.distribute.ReduceOp.SUM, per_replica, axis=None)
+    return max(1, int(total) // strategy.num_replicas_in_sync)
+
+def checkpoint_path(path):
+    """The chief writes to path; other workers write to a throwaway temp file so they do not race it."""
+    index, _ = worker_info()
+    if index == 0:
+        return path
+    return os.path.join(tempfile.mkdtemp(), f"worker{index}_{os.path.basename(path)}")
@@ -0,0 +1,285 @@
+"""
+Parallel, resumable download of per-ticker bars into data/{ticker}.csv.
+
+The HTTP layer is a fetcher: any callable fetch(ticker, start=None) -> OHLCV
+DataFrame indexed by Datetime, where start limits it to newer bars.
+YahooFetcher goes through yfinance; HTTPFetcher reads {base_url}/{ticker}.csv
+so a local fixture server can stand in for Yahoo.
+
+Every ticker is checkpointed on its own: its stats part (normalization
+stats plus the count of rows the outlier mask dropped) is written to
+{out}/stats/{ticker}.json and then its CSV is atomically moved into place,
+so a ticker whose CSV exists is done and an interrupted run resumes where it
+stopped. STATS.csv is assembled from the parts at the end. Tickers are
+fetched concurrently in chunks and each chunk's indicators are computed in
+one vectorized pass (features.compute_panel_indicators).
+
+The raw bars are kept in {out}/raw/{ticker}.csv so refresh_data can fetch
+only bars newer than the last stored one, recompute the indicators over a
+LOOKBACK tail and append the result, instead of redoing the whole period.
+"""
+import io
+import os
+import json
+from collections import deque
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import tqdm
+import pandas as pd
+
+from utils import features, feature_store
+
+class YahooFetcher:
+    """Fetch bars through yfinance."""
+    def __init__(self, period="60d", interval="5m"):
+        self.period = period
+        self.interval = interval
+
+    def __call__(self, ticker, start=None):
+        import yfinance as yf
+        if start is None:
+            data = yf.Ticker(ticker).history(period=self.period, interval=self.interval)
+        else:
+            data = yf.Ticker(ticker).history(start=start, interval=self.interval)
+        data.index.name = 'Datetime'
+        return data
+
+class HTTPFetcher:
+    """Fetch bars as {base_url}/{ticker}.csv with a Datetime column."""
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def __call__(self, ticker, start=None):
+        url = f"{self.base_url}/{ticker}.csv"
+        if start is not None:
+            url += "?" + urllib.parse.urlencode({"start": pd.Timestamp(start).isoformat()})
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            body = response.read()
+        data = pd.read_csv(io.BytesIO(body))
+        data['Datetime'] = pd.to_datetime(data['Datetime'], utc=True)
+        data = data.set_index('Datetime')
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        return data
+
+def csv_path(out, ticker):
+    return os.path.join(out, f"{ticker}.csv")
+
+def stats_path(out, ticker):
+    return os.path.join(out, "stats", f"{ticker}.json")
+
+def raw_path(out, ticker):
+    return os.path.join(out, "raw", f"{ticker}.csv")
+
+def bounds_path(out, ticker):
+    return os.path.join(out, "stats", f"{ticker}.bounds.json")
+
+def outliers_key(ticker):
+    """STATS.csv column counting the rows of ticker dropped by the IQR outlier mask."""
+    return f"{ticker}_rows_dropped_outliers"
+
+def is_done(out, ticker):
+    return os.path.isfile(csv_path(out, ticker)) and os.path.isfile(stats_path(out, ticker))
+
+def write_atomic(path, write):
+    """Write through a temporary file and rename it, so readers never see a partial file."""
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+def save_stats(out, ticker, stats):
+    def write(path):
+        with open(path, "w") as file:
+            json.dump({key: float(value) for key, value in stats.items()}, file)
+    write_atomic(stats_path(out, ticker), write)
+
+def load_stats(out, ticker):
+    with open(stats_path(out, ticker), "r") as file:
+        return json.load(file)
+
+def save_bounds(out, ticker, bounds):
+    low, high = bounds
+    def write(path):
+        with open(path, "w") as file:
+            json.dump({"low": low.to_dict(), "high": high.to_dict()}, file)
+    write_atomic(bounds_path(out, ticker), write)
+
+def load_bounds(out, ticker):
+    with open(bounds_path(out, ticker), "r") as file:
+        bounds = json.load(file)
+    return pd.Series(bounds["low"]), pd.Series(bounds["high"])
+
+def read_tail(path, n):
+    """Read the header and last n rows of a CSV written by this module, without parsing the rest."""
+    with open(path, "r") as file:
+        header = file.readline()
+        lines = deque(file, maxlen=n)
+    data = pd.read_csv(io.StringIO(header + "".join(lines)))
+    data['Datetime'] = pd.to_datetime(data['Datetime'], utc=True)
+    return data.set_index('Datetime')
+
+def fetch_ticker(ticker, fetch):
+    data = fetch(ticker)
+    if data is None or len(data) == 0:
+        raise ValueError(f"no data returned for {ticker}")
+    return data
+
+def checkpoint_ticker(ticker, data, ticker_df, out, store=None):
+    """Normalize the raw features ticker_df of data and checkpoint the ticker. Returns the number of rows written."""
+    cleaned_df, stats, bounds = features.normalize_features(ticker_df)
+    stats[outliers_key(ticker)] = len(ticker_df) - len(cleaned_df)
+
+    raw = data[['Open', 'High', 'Low', 'Close', 'Volume']]
+    write_atomic(raw_path(out, ticker), raw.to_csv)
+    save_bounds(out, ticker, bounds)
+    save_stats(out, ticker, stats)
+    write_atomic(csv_path(out, ticker), cleaned_df.to_csv)
+    if store is not None:
+        feature_store.write_ticker(store, ticker, cleaned_df.reset_index())
+
+    return len(cleaned_df)
+
+def prepare_ticker(ticker, fetch, out, store=None):
+    """Fetch, featurize and checkpoint one ticker. Returns the number of rows written."""
+    data = fetch_ticker(ticker, fetch)
+    return checkpoint_ticker(ticker, data, features.compute_indicators(ticker, data), out, store)
+
+def assemble_stats(out, tickers):
+    """Merge the per-ticker stats parts into the single-row STATS.csv."""
+    stats = {}
+    for ticker in tickers:
+        if os.path.isfile(stats_path(out, ticker)):
+            stats.update(load_stats(out, ticker))
+
+    stats = pd.DataFrame([stats], index=[0])
+    write_atomic(os.path.join(out, "STATS.csv"), lambda path: stats.to_csv(path, index=False))
+    return stats
+
+def prepare_data(tickers, fetch, out="data", workers=8, store=None, force=False, chunk=256):
+    """
+    Download and featurize many tickers in a thread pool.
+
+    Parameters:
+    - tickers (list): Ticker symbols.
+    - fetch (callable): fetch(ticker, start=None) -> OHLCV DataFrame (see YahooFetcher, HTTPFetcher).
+    - out (str): Output directory for {ticker}.csv, stats parts and STATS.csv.
+    - workers (int): Concurrent fetches.
+    - store (str): Optional feature store directory to write alongside the CSVs.
+    - force (bool): Redo tickers that already have a checkpoint.
+    - chunk (int): Tickers fetched before their indicators are computed in one panel pass.
+
+    Returns:
+    - dict: ticker -> error message for every ticker that failed.
+    """
+    os.makedirs(os.path.join(out, "stats"), exist_ok=True)
+    os.makedirs(os.path.join(out, "raw"), exist_ok=True)
+
+    pending = [t for t in tickers if force or not is_done(out, t)]
+    print(f"{len(tickers) - len(pending)} tickers already done, {len(pending)} to fetch")
+
+    failed = {}
+    progress = tqdm.tqdm(total=len(pending))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(pending), chunk):
+            fetched = {}
+            futures = {pool.submit(fetch_ticker, ticker, fetch): ticker for ticker in pending[start:start + chunk]}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    fetched[ticker] = future.result()
+                except Exception as e:
+                    failed[ticker] = str(e)
+                    print(ticker, e)
+                    progress.update()
+
+            # indicators for the whole chunk in one vectorized pass, then one checkpoint per ticker
+            computed = features.compute_panel_indicators(fetched)
+            for ticker, data in fetched.items():
+                try:
+                    checkpoint_ticker(ticker, data, computed[ticker], out, store)
+                except Exception as e:
+                    failed[ticker] = str(e)
+                    print(ticker, e)
+                progress.update()
+    progress.close()
+
+    stats = assemble_stats(out, tickers)
+    if store is not None:
+        feature_store.write_stats(store, stats)
+
+    return failed
+
+def refresh_ticker(ticker, fetch, out, store=None, lookback=features.LOOKBACK):
+    """
+    Append only the bars newer than the last stored one.
+
+    The normalization stats and outlier bounds from the original build are
+    reused, so appended rows are on the same scale as the stored ones. Tickers
+    without a raw cache are built from scratch. Returns the number of rows appended.
+    """
+    if not (is_done(out, ticker) and os.path.isfile(raw_path(out, ticker)) and os.path.isfile(bounds_path(out, ticker))):
+        return prepare_ticker(ticker, fetch, out, store)
+
+    raw = read_tail(raw_path(out, ticker), lookback)
+    last = raw.index[-1]
+
+    data = fetch(ticker, start=last)
+    data.index = pd.to_datetime(data.index, utc=True)
+    new = data[data.index > last][['Open', 'High', 'Low', 'Close', 'Volume']]
+    if len(new) == 0:
+        return 0
+
+    history = pd.concat([raw, new])
+    stats = load_stats(out, ticker)
+    cleaned_df = features.update_features(ticker, history, len(new), stats, load_bounds(out, ticker))
+
+    # The raw cache is the checkpoint, so it is appended last; rows the feature CSV and the
+    # store already got from an interrupted refresh are skipped, each against its own last row.
+    stored = read_tail(csv_path(out, ticker), 1)
+    csv_rows = cleaned_df[cleaned_df.index > stored.index[-1]] if len(stored) else cleaned_df
+    csv_rows.to_csv(csv_path(out, ticker), mode="a", header=False)
+
+    if store is not None:
+        store_rows = cleaned_df
+        stored_last = feature_store.last_datetime(store, ticker)
+        if stored_last is not None:
+            times = pd.to_datetime(cleaned_df.index, utc=True).tz_localize(None)
+            store_rows = cleaned_df[times > stored_last]
+        feature_store.append_ticker(store, ticker, store_rows.reset_index())
+    stats[outliers_key(ticker)] = stats.get(outliers_key(ticker), 0) + len(new) - len(cleaned_df)
+    save_stats(out, ticker, stats)
+    new.to_csv(raw_path(out, ticker), mode="a", header=False)
+
+    return len(csv_rows)
+
+def refresh_data(tickers, fetch, out="data", workers=8, store=None):
+    """
+    Incrementally refresh many tickers in a thread pool (see refresh_ticker).
+
+    Returns:
+    - dict: ticker -> error message for every ticker that failed.
+    """
+    os.makedirs(os.path.join(out, "stats"), exist_ok=True)
+    os.makedirs(os.path.join(out, "raw"), exist_ok=True)
+
+    failed = {}
+    appended = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(refresh_ticker, ticker, fetch, out, store): ticker for ticker in tickers}
+        for future in tqdm.tqdm(as_completed(futures), total=len(futures)):
+            ticker = futures[future]
+            try:
+                appended += future.result()
+            except Exception as e:
+                failed[ticker] = str(e)
+                print(ticker, e)
+    print(f"Appended {appended} rows")
+
+    stats = assemble_stats(out, tickers)
+    if store is not None:
+        feature_store.write_stats(store, stats)
+
+    return failed
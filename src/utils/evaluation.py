@@ -0,0 +1,132 @@
+"""
+Grouped per-ticker evaluation.
+
+Every window of every ticker goes through one model.predict over the
+utils/dataset.py pipeline, then dir_acc is reduced per (ticker, split) with
+a bincount over a group-id array, instead of calling model.evaluate three
+times for each ticker.
+"""
+import numpy as np
+import pandas as pd
+
+from utils import dataset, labeling
+from utils import sequences as seq
+
+def direction_correct(labels, predictions):
+    """Per-window dir_acc: 1.0 where the predicted move has the sign of the true move."""
+    labels = np.asarray(labels, dtype=np.float64)
+    predictions = np.asarray(predictions, dtype=np.float64).reshape(len(labels), -1)
+    mean, std = labels[:, 2], labels[:, 3]
+
+    y_true_prev = (labels[:, 0] * std) + mean
+    y_true_next = (labels[:, 1] * std) + mean
+    y_pred_next = (predictions[:, 0] * std) + mean
+
+    return (np.sign(y_true_next - y_true_prev) == np.sign(y_pred_next - y_true_prev)).astype(np.float64)
+
+def direction_correct_fp32(labels, predictions):
+    """direction_correct as models.dir_acc_fp32 computes it: float32, signs taken on the normalized values."""
+    labels = np.asarray(labels, dtype=np.float32)
+    predictions = np.asarray(predictions, dtype=np.float32).reshape(len(labels), -1)
+    return (np.sign(labels[:, 1] - labels[:, 0]) == np.sign(predictions[:, 0] - labels[:, 0])).astype(np.float32)
+
+def direction_mismatches(labels, predictions):
+    """
+    Windows where the float32 and float64 dir_acc disagree.
+
+    Returns:
+    - tuple: (mismatches, float32 dir_acc, float64 dir_acc).
+    """
+    fp32 = direction_correct_fp32(labels, predictions)
+    fp64 = direction_correct(labels, predictions)
+    return int((fp32 != fp64).sum()), float(fp32.mean()), float(fp64.mean())
+
+def horizon_accuracy(labels, predictions, directions, horizons=labeling.HORIZONS):
+    """
+    How often the predicted move has the sign of the true move h bars after the window, for every horizon.
+
+    Parameters:
+    - labels (numpy.ndarray): (N x 4) [prev, next, mean, std] window labels.
+    - predictions (numpy.ndarray): (N x 1) normalized close forecasts.
+    - directions (numpy.ndarray): (N x len(horizons)) 'direction' labels from sequences.create_horizon_labels.
+
+    Returns:
+    - pandas.Series: dir_acc per horizon (windows without a bar h ahead are left out).
+    """
+    labels = np.asarray(labels, dtype=np.float64)
+    predictions = np.asarray(predictions, dtype=np.float64).reshape(len(labels), -1)
+    directions = np.asarray(directions, dtype=np.float64)
+
+    # std > 0, so the sign on the normalized values is the sign on the prices
+    predicted = np.sign(predictions[:, :1] - labels[:, :1])
+    known = ~np.isnan(directions)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        accuracy = ((predicted == directions) & known).sum(axis=0) / known.sum(axis=0)
+    return pd.Series(accuracy, index=pd.Index([f"{h}_bars" for h in horizons], name='horizon'), name='dir_acc')
+
+def window_groups(matrices, sequence_length=seq.SEQUENCE_LEN, horizon=seq.HORIZON):
+    """
+    Ticker id, split id and packed start row of every window, in the order the
+    train, validation and test datasets are concatenated for prediction.
+    """
+    lengths = np.array([len(m) for m in matrices], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    rows, ticker_ids, split_ids = [], [], []
+    for split_id, split in enumerate(dataset.SPLITS):
+        split_rows, split_tickers = dataset.window_starts(offsets, split, sequence_length, horizon)
+        rows.append(split_rows)
+        ticker_ids.append(split_tickers)
+        split_ids.append(np.full(len(split_rows), split_id, dtype=np.int32))
+    return np.concatenate(ticker_ids), np.concatenate(split_ids), np.concatenate(rows)
+
+def grouped_mean(values, groups, num_groups):
+    """Mean of values per group id (NaN for empty groups) and the group sizes."""
+    counts = np.bincount(groups, minlength=num_groups)
+    totals = np.bincount(groups, weights=values, minlength=num_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return totals / counts, counts
+
+def evaluate_tickers(model, tickers, matrices, means, stds, batch_size=512,
+                     sequence_length=seq.SEQUENCE_LEN, horizon=seq.HORIZON):
+    """
+    dir_acc of every ticker on its train, validation and test windows.
+
+    Parameters:
+    - model (tf.keras.Model): Trained model.
+    - tickers (list): Ticker symbols, one per matrix.
+    - matrices (list): Per-ticker (T x features) arrays with the close in column 0.
+    - means (list): Close mean per ticker.
+    - stds (list): Close std per ticker.
+    - batch_size (int): Prediction batch size.
+
+    Returns:
+    - pandas.DataFrame: Indexed by ticker with '{split}_dir_acc' and '{split}_n' columns
+                        (NaN accuracy for an empty split).
+    """
+    datasets = dataset.make_datasets(matrices, means, stds, batch_size=batch_size, shuffle=False,
+                                     sequence_length=sequence_length, horizon=horizon)
+    windows = datasets['train'].concatenate(datasets['validation']).concatenate(datasets['test'])
+    predictions = model.predict(windows.map(lambda sequences, labels: sequences), verbose=0)
+
+    # labels straight from the matrices, in the same order as the predictions
+    ticker_ids, split_ids, rows = window_groups(matrices, sequence_length, horizon)
+    close = np.concatenate([np.asarray(m[:, 0], dtype=np.float64) for m in matrices])
+    labels = np.column_stack([close[rows + sequence_length - 1],
+                              close[rows + sequence_length + horizon],
+                              np.asarray(means, dtype=np.float64)[ticker_ids],
+                              np.asarray(stds, dtype=np.float64)[ticker_ids]])
+
+    num_splits = len(dataset.SPLITS)
+    accuracy, counts = grouped_mean(direction_correct(labels, predictions),
+                                    ticker_ids * num_splits + split_ids,
+                                    len(tickers) * num_splits)
+    accuracy = accuracy.reshape(len(tickers), num_splits)
+    counts = counts.reshape(len(tickers), num_splits)
+
+    table = pd.DataFrame(index=pd.Index(tickers, name='ticker'))
+    for i, split in enumerate(dataset.SPLITS):
+        table[f'{split}_dir_acc'] = accuracy[:, i]
+    for i, split in enumerate(dataset.SPLITS):
+        table[f'{split}_n'] = counts[:, i]
+    return table
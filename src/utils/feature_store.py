@@ -0,0 +1,242 @@
+"""
+Columnar on-disk feature store for the normalized per-ticker frames.
+
+Each ticker is written once as a directory of NumPy arrays:
+
+    {root}/{ticker}/datetime.npy   datetime64[ns], already parsed and tz-naive
+    {root}/{ticker}/values.npy     (rows x features) float32 matrix (float16 with --dtype float16)
+    {root}/{ticker}/meta.json      feature names and row count
+
+The arrays are opened memory-mapped, so serving a ticker costs a file open
+instead of a CSV parse plus a pd.to_datetime pass.
+
+A full write goes to a staging directory that is renamed into place. An
+append writes the new rows after the stored ones and grows the .npy headers
+in place (np.save leaves room for that), so it costs the new rows only;
+meta.json is replaced last and readers never look past its row count, so a
+half-finished append is invisible.
+
+Convert an existing CSV directory with:
+
+    python -m utils.feature_store --src data_nasdaq --dst store/data_nasdaq
+"""
+import os
+import io
+import json
+import shutil
+import argparse
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['close', 'upper', 'lower', 'width', 'rsi', 'sma', 'roc',
+            'momentum', 'volume', 'diff', 'percent_change_close']
+
+# Stored value dtype. float16 halves the store again; readers widen it to float32.
+DTYPE = np.float32
+
+def ticker_dir(root, ticker):
+    return os.path.join(root, ticker)
+
+def has_ticker(root, ticker):
+    return os.path.isfile(os.path.join(ticker_dir(root, ticker), "meta.json"))
+
+def list_tickers(root):
+    """List every ticker present in the store."""
+    return sorted(t for t in os.listdir(root) if not t.startswith(".") and has_ticker(root, t))
+
+def read_meta(root, ticker):
+    with open(os.path.join(ticker_dir(root, ticker), "meta.json"), "r") as file:
+        return json.load(file)
+
+def last_datetime(root, ticker):
+    """datetime64[ns] of the last stored row of ticker, or None if it has no rows."""
+    if not has_ticker(root, ticker):
+        return None
+    datetime, _, _ = read_ticker(root, ticker)
+    return datetime[-1] if len(datetime) else None
+
+def write_meta(path, ticker, columns, rows):
+    tmp = os.path.join(path, f"meta.json.tmp{os.getpid()}")
+    with open(tmp, "w") as file:
+        json.dump({"ticker": ticker, "columns": list(columns), "rows": int(rows)}, file)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+def write_arrays(root, ticker, datetime, values, columns):
+    path = ticker_dir(root, ticker)
+    staging = os.path.join(root, f".{ticker}.tmp{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, "datetime.npy"), datetime)
+    np.save(os.path.join(staging, "values.npy"), values)
+
+    # meta.json last, then one rename, so a half-written ticker is never listed
+    write_meta(staging, ticker, columns, len(values))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+
+def append_npy(path, rows, new):
+    """
+    Write new after the first rows of an .npy array in place and grow its header to match.
+
+    Returns False, without touching the file, when it cannot be appended to in place
+    (another layout or dtype, or a header without room to grow).
+    """
+    fmt = np.lib.format
+    with open(path, "r+b") as file:
+        version = fmt.read_magic(file)
+        if version not in ((1, 0), (2, 0)):
+            return False
+        read_header, write_header = ((fmt.read_array_header_1_0, fmt.write_array_header_1_0) if version == (1, 0)
+                                     else (fmt.read_array_header_2_0, fmt.write_array_header_2_0))
+        shape, fortran_order, dtype = read_header(file)
+        offset = file.tell()
+        if fortran_order or dtype != new.dtype or shape[1:] != new.shape[1:] or shape[0] < rows:
+            return False
+
+        header = io.BytesIO()
+        write_header(header, {'descr': fmt.dtype_to_descr(dtype), 'fortran_order': False,
+                              'shape': (rows + len(new),) + shape[1:]})
+        if header.tell() != offset:
+            return False
+
+        # rows past `rows` are leftovers of an append that never reached meta.json
+        file.seek(offset + rows * dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64)))
+        file.write(np.ascontiguousarray(new).tobytes())
+        file.truncate()
+        file.seek(0)
+        file.write(header.getvalue())
+    return True
+
+def read_csv(path, dtype=np.float32):
+    """pd.read_csv of a data/{ticker}.csv file with every feature column parsed straight to dtype."""
+    return pd.read_csv(path, dtype=defaultdict(lambda: dtype, Datetime=object))
+
+def frame_to_arrays(ticker, df, columns=None, dtype=DTYPE):
+    """Split a '{ticker}_{feature}' frame into (datetime, values, columns) arrays."""
+    datetime = pd.to_datetime(df['Datetime'], utc=True).dt.tz_localize(None)
+    datetime = datetime.to_numpy(dtype='datetime64[ns]')
+
+    prefix = ticker + '_'
+    if columns is None:
+        columns = [c[len(prefix):] for c in df.columns if c.startswith(prefix)]
+    values = df[[prefix + c for c in columns]].to_numpy(dtype=dtype)
+    return datetime, values, columns
+
+def write_ticker(root, ticker, df, dtype=DTYPE):
+    """
+    Write one ticker frame to the store.
+
+    Parameters:
+    - root (str): Store directory.
+    - ticker (str): Ticker symbol.
+    - df (pandas.DataFrame): Frame with a 'Datetime' column and '{ticker}_{feature}'
+                             columns, as written to data/{ticker}.csv.
+    - dtype (numpy.dtype): Stored value dtype, float32 or float16.
+    """
+    write_arrays(root, ticker, *frame_to_arrays(ticker, df, dtype=dtype))
+
+def append_ticker(root, ticker, df):
+    """
+    Append rows in the write_ticker format to a stored ticker (or write it if missing).
+
+    The new rows are written after the stored ones in place, so an append costs the
+    new rows rather than the whole history; only a store that cannot be grown in place
+    is rewritten.
+    """
+    if not has_ticker(root, ticker):
+        return write_ticker(root, ticker, df)
+
+    datetime, values, columns = read_ticker(root, ticker)
+    rows = len(values)
+    new_datetime, new_values, _ = frame_to_arrays(ticker, df, columns, dtype=values.dtype)
+    if len(new_values) == 0:
+        return
+
+    path = ticker_dir(root, ticker)
+    if (append_npy(os.path.join(path, "datetime.npy"), rows, new_datetime)
+            and append_npy(os.path.join(path, "values.npy"), rows, new_values)):
+        write_meta(path, ticker, columns, rows + len(new_values))
+    else:
+        write_arrays(root, ticker,
+                     np.concatenate([datetime, new_datetime]),
+                     np.concatenate([values, new_values]),
+                     columns)
+
+def read_ticker(root, ticker, columns=None, mmap=True):
+    """
+    Read one ticker from the store.
+
+    Parameters:
+    - root (str): Store directory.
+    - ticker (str): Ticker symbol.
+    - columns (list): Feature names to return, in order. Default is every stored feature.
+    - mmap (bool): Memory-map the arrays instead of reading them into RAM.
+
+    Returns:
+    - tuple: (datetime, values, columns) where datetime is a datetime64[ns] array and
+             values is a (rows x len(columns)) array.
+    """
+    meta = read_meta(root, ticker)
+    path = ticker_dir(root, ticker)
+    mmap_mode = "r" if mmap else None
+
+    # an interrupted append can leave rows past meta["rows"]; they are not part of the ticker yet
+    rows = meta["rows"]
+    datetime = np.load(os.path.join(path, "datetime.npy"), mmap_mode=mmap_mode)[:rows]
+    values = np.load(os.path.join(path, "values.npy"), mmap_mode=mmap_mode)[:rows]
+
+    if columns is not None:
+        index = [meta["columns"].index(c) for c in columns]
+        if index != list(range(len(meta["columns"]))):
+            values = values[:, index]
+    else:
+        columns = meta["columns"]
+
+    return datetime, values, list(columns)
+
+def load_frame(root, ticker, columns=None):
+    """Read one ticker as the same DataFrame pd.read_csv(f"data/{ticker}.csv") produced."""
+    datetime, values, columns = read_ticker(root, ticker, columns=columns)
+    df = pd.DataFrame(np.asarray(values), columns=[ticker + '_' + c for c in columns])
+    df.insert(0, 'Datetime', datetime)
+    return df
+
+def write_stats(root, stats):
+    os.makedirs(root, exist_ok=True)
+    stats.to_csv(os.path.join(root, "STATS.csv"), index=False)
+
+def read_stats(root):
+    return pd.read_csv(os.path.join(root, "STATS.csv"))
+
+def csv_to_store(src, dst, tickers=None, dtype=DTYPE):
+    """Convert a directory of {ticker}.csv files plus STATS.csv into a store of dtype values."""
+    if tickers is None:
+        tickers = sorted(f[:-4] for f in os.listdir(src) if f.endswith(".csv") and f != "STATS.csv")
+
+    written = []
+    for ticker in tickers:
+        try:
+            df = read_csv(os.path.join(src, f"{ticker}.csv"))
+            write_ticker(dst, ticker, df, dtype=dtype)
+            written.append(ticker)
+        except Exception as e:
+            print(ticker, e)
+
+    if os.path.isfile(os.path.join(src, "STATS.csv")):
+        write_stats(dst, pd.read_csv(os.path.join(src, "STATS.csv")))
+
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert per-ticker CSVs into a feature store.')
+    parser.add_argument('--src', required=True, help='Directory holding {ticker}.csv and STATS.csv')
+    parser.add_argument('--dst', required=True, help='Feature store directory to write')
+    parser.add_argument('--tickers', nargs='+', default=None, help='Tickers to convert (default: all CSVs)')
+    parser.add_argument('--dtype', choices=['float32', 'float16'], default='float32', help='Stored value dtype')
+    args = parser.parse_args()
+
+    written = csv_to_store(args.src, args.dst, args.tickers, dtype=np.dtype(args.dtype))
+    print(f"Wrote {len(written)} tickers to {args.dst}")
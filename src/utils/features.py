@@ -0,0 +1,119 @@
+"""
+Per-ticker feature engineering for data/{ticker}.csv.
+
+This is the preprocessing that used to live commented out at the top of
+transformer.py: indicators (from utils/indicators.py), z-score normalization
+and the IQR outlier mask.
+"""
+import numpy as np
+import pandas as pd
+
+from utils import indicators
+
+WINDOW = 14
+
+# Bars of history recomputed before appending new ones. The SMA ewm(span=14)
+# is the longest memory; its weight after 200 bars is below 1e-12.
+LOOKBACK = 200
+
+def compute_indicators(ticker, data, window=WINDOW):
+    """Raw (un-normalized) feature frame for one ticker's OHLCV bars."""
+    computed = indicators.compute_features(data[['Close']].to_numpy(), data[['Volume']].to_numpy(), window)
+    return pd.DataFrame({ticker + '_' + name: values[:, 0] for name, values in computed.items()}, index=data.index)
+
+def compute_panel_indicators(data, window=WINDOW):
+    """
+    Raw feature frames for many tickers in one vectorized pass.
+
+    Each ticker's bars are stacked by position into one (bars x tickers) array,
+    NaN-padded at the end, so no ticker sees another's calendar. Every indicator
+    only looks back, so the padding never reaches a real bar and each frame is
+    the same as compute_indicators of that ticker alone.
+
+    Parameters:
+    - data (dict): ticker -> OHLCV bars indexed by Datetime.
+    - window (int): Indicator look-back. Default is 14.
+
+    Returns:
+    - dict: ticker -> feature frame, as compute_indicators returns for that ticker.
+    """
+    tickers = list(data)
+    lengths = [len(data[ticker]) for ticker in tickers]
+    close = np.full((max(lengths, default=0), len(tickers)), np.nan)
+    volume = np.full_like(close, np.nan)
+    for i, ticker in enumerate(tickers):
+        close[:lengths[i], i] = data[ticker]['Close'].to_numpy(dtype=np.float64)
+        volume[:lengths[i], i] = data[ticker]['Volume'].to_numpy(dtype=np.float64)
+
+    computed = indicators.compute_features(close, volume, window)
+    return {ticker: pd.DataFrame({ticker + '_' + name: values[:lengths[i], i] for name, values in computed.items()},
+                                 index=data[ticker].index)
+            for i, ticker in enumerate(tickers)}
+
+def outlier_bounds(ticker_df, lower=0.005, upper=0.995):
+    """Per-column (low, high) limits 1.5 IQR outside the [lower, upper] quantiles."""
+    Q1 = ticker_df.quantile(lower)
+    Q3 = ticker_df.quantile(upper)
+    IQR = Q3 - Q1
+    return Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+
+def remove_outliers(ticker_df, bounds=None):
+    """Drop rows where any feature falls outside bounds (default: outlier_bounds of ticker_df)."""
+    low, high = bounds if bounds is not None else outlier_bounds(ticker_df)
+    mask = ~((ticker_df < low) | (ticker_df > high)).any(axis=1)
+    return ticker_df[mask]
+
+def normalize(ticker_df, stats):
+    """Z-score ticker_df with the '{column}_mean' / '{column}_std' values in stats."""
+    MEAN = pd.Series({c: stats[f"{c}_mean"] for c in ticker_df.columns})
+    STD = pd.Series({c: stats[f"{c}_std"] for c in ticker_df.columns})
+    return (ticker_df - MEAN) / STD
+
+def build_features(ticker, data, window=WINDOW):
+    """
+    Compute, normalize and clean the features for one ticker.
+
+    Parameters:
+    - ticker (str): Ticker symbol, used as the column prefix.
+    - data (pandas.DataFrame): OHLCV bars indexed by Datetime.
+    - window (int): Indicator look-back. Default is 14.
+
+    Returns:
+    - tuple: (cleaned_df, stats, bounds) where stats maps '{column}_mean' / '{column}_std'
+             to the values used for normalization, as stored in STATS.csv, and bounds
+             is the (low, high) pair used by the outlier mask.
+    """
+    return normalize_features(compute_indicators(ticker, data, window))
+
+def normalize_features(ticker_df):
+    """
+    Normalize and clean a raw feature frame (from compute_indicators / compute_panel_indicators).
+
+    Returns:
+    - tuple: (cleaned_df, stats, bounds), as build_features.
+    """
+    MEAN = ticker_df.mean()
+    STD = ticker_df.std()
+
+    stats = {}
+    for column in MEAN.index:
+        stats[f"{column}_mean"] = MEAN[column]
+        stats[f"{column}_std"] = STD[column]
+
+    # Normalize the training features
+    ticker_df = (ticker_df - MEAN) / STD
+
+    bounds = outlier_bounds(ticker_df)
+    return remove_outliers(ticker_df, bounds), stats, bounds
+
+def update_features(ticker, history, new_rows, stats, bounds, window=WINDOW):
+    """
+    Features for only the last new_rows bars of history.
+
+    history must hold enough earlier bars for the rolling indicators to settle
+    (see LOOKBACK); the rows are normalized and masked with the stats and bounds
+    saved when the ticker was first built, so they line up with the stored ones.
+    """
+    ticker_df = compute_indicators(ticker, history, window).iloc[-new_rows:]
+    ticker_df = normalize(ticker_df, stats)
+    return remove_outliers(ticker_df, bounds)
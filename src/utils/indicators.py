@@ -0,0 +1,218 @@
+"""
+Vectorized technical indicators over (time x tickers) arrays.
+
+Every function takes a 1-D array, a 2-D (time x tickers) array, or a pandas
+Series/DataFrame, and computes along the time axis for all tickers at once.
+Pandas input comes back as pandas with the same index and columns. Results
+match the pandas formulations that used to be copy-pasted across the scripts
+(rolling windows need `window` valid bars, like pandas' default).
+
+float32 input is computed and returned in float32 (float16 is widened to
+float32, never computed in); anything else is computed in float64.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+def _float_dtype(data):
+    """float32 for float32 / float16 data, float64 for everything else."""
+    dtype = data.to_numpy().dtype if isinstance(data, pd.DataFrame) else getattr(data, 'dtype', None)
+    if dtype is None:
+        dtype = np.asarray(data).dtype
+    return np.float32 if dtype in (np.float32, np.float16) else np.float64
+
+def _as_array(data):
+    """Return (float array, wrap) where wrap turns a result back into data's type."""
+    dtype = _float_dtype(data)
+    if isinstance(data, pd.Series):
+        return data.to_numpy(dtype=dtype), lambda x: pd.Series(x, index=data.index, name=data.name)
+    if isinstance(data, pd.DataFrame):
+        return data.to_numpy(dtype=dtype), lambda x: pd.DataFrame(x, index=data.index, columns=data.columns)
+    return np.asarray(data, dtype=dtype), lambda x: x
+
+def _shift(x, periods):
+    out = np.full_like(x, np.nan)
+    out[periods:] = x[:-periods]
+    return out
+
+def _windows(x, window):
+    """(time - window + 1, ..., window) view of trailing windows along axis 0."""
+    return sliding_window_view(x, window, axis=0)
+
+def _rolling(x, window, reduce):
+    out = np.full_like(x, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = reduce(_windows(x, window))
+    return out
+
+def _rolling_partial_mean(x, window):
+    """Rolling mean that, like min_periods=1, averages whatever non-NaN bars are in the window."""
+    padded = np.concatenate([np.full((window - 1,) + x.shape[1:], np.nan, dtype=x.dtype), x])
+    valid = ~np.isnan(padded)
+    total = _windows(np.where(valid, padded, 0.0), window).sum(axis=-1)
+    count = _windows(valid, window).sum(axis=-1, dtype=x.dtype)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+def _step_budget(decay, dtype):
+    """Steps per scan block: decay ** -steps must stay far from overflow in dtype."""
+    return np.log(np.finfo(dtype).max) / 4 / -np.log(decay)
+
+def _blocks(steps, budget):
+    """Bar ranges whose largest per-ticker step sum stays within budget (at least one bar each)."""
+    per_bar = steps.reshape(len(steps), -1).max(axis=1, initial=0.0).astype(np.float64)
+    total = np.cumsum(per_bar)
+    start = 0
+    while start < len(steps):
+        before = total[start - 1] if start else 0.0
+        stop = max(start + 1, int(np.searchsorted(total, before + budget, side='right')))
+        yield start, stop
+        start = stop
+
+def _scan(u, steps, decay):
+    """
+    y_t = decay ** steps_t * y_{t-1} + u_t along axis 0, y_{-1} = 0.
+
+    Within a block of bars, with c the running sum of steps,
+    y = decay ** c * (y_before + cumsum(u * decay ** -c)), so each block is a
+    handful of whole-array operations and only the carry between blocks loops.
+    steps may be fractional; no single bar's step may exceed the block budget.
+    """
+    out = np.empty_like(u)
+    carry = np.zeros(u.shape[1:], dtype=u.dtype)
+    for start, stop in _blocks(steps, _step_budget(decay, u.dtype)):
+        c = np.cumsum(steps[start:stop], axis=0, dtype=u.dtype)
+        y = decay ** c * (carry + np.cumsum(u[start:stop] * decay ** -c, axis=0))
+        out[start:stop] = y
+        carry = y[-1]
+    return out
+
+def _ewm(x, alpha, adjust):
+    """Exponentially weighted mean along axis 0 for every ticker at once (see _scan)."""
+    valid = ~np.isnan(x)
+    value = np.where(valid, x, 0.0)
+    decay = x.dtype.type(1.0 - alpha)
+    alpha = x.dtype.type(alpha)
+    rows = np.arange(len(x)).reshape((-1,) + (1,) * (x.ndim - 1))
+    if decay == 0:  # span=1: the mean is the bar itself (the last valid one without adjust)
+        if adjust:
+            return x.copy()
+        index = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+        return np.where(index >= 0, np.take_along_axis(x, np.maximum(index, 0), axis=0), np.nan)
+
+    if adjust:
+        # weights decay on every bar, NaN bars included
+        steps = np.ones(x.shape, dtype=x.dtype)
+        num = _scan(value, steps, decay)
+        den = _scan(valid.astype(x.dtype), steps, decay)
+        started = den > 0
+        return np.where(started, num / np.where(started, den, 1.0), np.nan)
+
+    # y_t = w * y_prev + (1 - w) * x_t, seeded with the first valid value, NaN bars hold y.
+    # As in pandas (ignore_na=False) the old weight decays on NaN bars too: k bars after the
+    # previous valid one w = decay ** k / (decay ** k + alpha), which is 1 - alpha when k == 1.
+    started = np.logical_or.accumulate(valid, axis=0)
+    first = np.zeros((1,) + x.shape[1:], dtype=bool)
+    update = valid & np.concatenate([first, started[:-1]])
+    steps = update.astype(x.dtype)
+    u = np.where(update, alpha * value, value)
+
+    gapped = update & ~np.concatenate([first, valid[:-1]])
+    if gapped.any():
+        last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+        gap = np.broadcast_to(rows, x.shape)[gapped] - last[:-1][gapped[1:]]
+        old = decay ** gap.astype(x.dtype)
+        # below eps the old value no longer shows; the cap keeps every step inside the scan's budget
+        with np.errstate(divide='ignore'):  # old underflows to 0 over long gaps
+            steps[gapped] = np.maximum(np.log(old / (old + alpha)), np.log(np.finfo(x.dtype).eps)) / np.log(decay)
+        u[gapped] = alpha / (old + alpha) * value[gapped]
+    return np.where(started, _scan(u, steps, decay), np.nan)
+
+def ewm_mean(data, span, adjust=True):
+    """Exponentially weighted mean, as data.ewm(span=span, adjust=adjust).mean()."""
+    x, wrap = _as_array(data)
+    return wrap(_ewm(x, 2.0 / (span + 1.0), adjust))
+
+def calculate_momentum(data, periods=10):
+    """Calculate Momentum."""
+    x, wrap = _as_array(data)
+    return wrap(x - _shift(x, periods))
+
+def calculate_roc(data, periods=10):
+    """Calculate Rate of Change."""
+    x, wrap = _as_array(data)
+    previous = _shift(x, periods)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return wrap(((x - previous) / previous) * 100)
+
+def calculate_diff(data, periods=1):
+    x, wrap = _as_array(data)
+    return wrap(x - _shift(x, periods))
+
+def calculate_pct_change(data, periods=1):
+    x, wrap = _as_array(data)
+    previous = _shift(x, periods)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return wrap(x / previous - 1)
+
+def calculate_sma(data, window=10):
+    """Calculate Simple Moving Average."""
+    x, wrap = _as_array(data)
+    return wrap(_rolling(x, window, lambda w: w.mean(axis=-1)))
+
+def calculate_rsi(data, window=10):
+    """Calculate RSI from simple rolling means of gains and losses (min_periods=1)."""
+    x, wrap = _as_array(data)
+    delta = x - _shift(x, 1)
+    gain = np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None))
+    loss = np.where(np.isnan(delta), np.nan, -np.clip(delta, None, 0))
+    avg_gain = _rolling_partial_mean(gain, window)
+    avg_loss = _rolling_partial_mean(loss, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rs = avg_gain / avg_loss
+        return wrap(100 - (100 / (1 + rs)))
+
+def calculate_bollinger_bands(data, window=10, num_of_std=2):
+    """Calculate Bollinger Bands"""
+    x, wrap = _as_array(data)
+    rolling_mean = _rolling(x, window, lambda w: w.mean(axis=-1))
+    rolling_std = _rolling(x, window, lambda w: w.std(axis=-1, ddof=1))
+    upper_band = rolling_mean + (rolling_std * num_of_std)
+    lower_band = rolling_mean - (rolling_std * num_of_std)
+    return wrap(upper_band), wrap(lower_band)
+
+def calculate_macd(data, slow=26, fast=12, signal=9):
+    """Calculate Moving Average Convergence Divergence (MACD) and its signal line."""
+    x, wrap = _as_array(data)
+    macd = _ewm(x, 2.0 / (fast + 1.0), adjust=False) - _ewm(x, 2.0 / (slow + 1.0), adjust=False)
+    macd_signal = _ewm(macd, 2.0 / (signal + 1.0), adjust=False)
+    return wrap(macd), wrap(macd_signal)
+
+def compute_features(close, volume, window=14, dtype=None):
+    """
+    Compute every transformer feature for a whole universe in one pass.
+
+    Parameters:
+    - close (numpy.ndarray): (time x tickers) closes.
+    - volume (numpy.ndarray): (time x tickers) volumes.
+    - window (int): Indicator look-back. Default is 14.
+    - dtype (numpy.dtype): Compute dtype. Default follows close (float32 stays float32).
+
+    Returns:
+    - dict: feature name -> (time x tickers) array, in feature_store.FEATURES order.
+    """
+    close = np.asarray(close, dtype=dtype or _float_dtype(close))
+    upper, lower = calculate_bollinger_bands(close, window=window, num_of_std=2)
+    return {
+        'close': close,
+        'upper': upper,
+        'lower': lower,
+        'width': upper - lower,
+        'rsi': calculate_rsi(close, window=window),
+        'sma': ewm_mean(calculate_sma(close, window=window), span=window),
+        'roc': calculate_roc(close, periods=window),
+        'momentum': calculate_momentum(close, periods=window),
+        'volume': np.asarray(volume, dtype=close.dtype),
+        'diff': calculate_diff(close),
+        'percent_change_close': calculate_pct_change(close) * 100,
+    }
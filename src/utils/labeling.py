@@ -0,0 +1,95 @@
+"""
+Vectorized label engine.
+
+Labels are gathered for every ticker and horizon at once from a (T x tickers)
+close panel: one (T x horizons) index array of t + h, one fancy-index gather,
+and the return / direction columns are whole-array arithmetic on the result.
+Rows without a bar h steps ahead are NaN. Float input keeps its dtype, so the
+float32 panels the training script builds give float32 labels.
+
+Custom labels are vectorized callables applied to whole arrays, e.g.
+
+    def define_label(values):          # (T x horizons x tickers) -> same shape
+        return np.sign(values)
+
+never a per-element function passed to DataFrame.map.
+
+sequences.create_horizon_labels() cuts these labels down to one row per
+training window, which is how transformer.py scores its forecasts per horizon.
+"""
+import numpy as np
+import pandas as pd
+
+HORIZONS = (1, 6, 12, 24)
+
+def _float(values):
+    values = np.asarray(values)
+    return values if np.issubdtype(values.dtype, np.floating) else values.astype(np.float64)
+
+def future(values, horizons=HORIZONS):
+    """
+    values[t + h] for every t and every h, NaN past the end.
+
+    Parameters:
+    - values (numpy.ndarray): (T,) or (T x tickers) array.
+    - horizons (tuple): Bars ahead.
+
+    Returns:
+    - numpy.ndarray: (T x len(horizons)) or (T x len(horizons) x tickers), in the dtype of values.
+    """
+    values = _float(values)
+    T = len(values)
+    index = np.arange(T)[:, None] + np.asarray(horizons, dtype=np.int64)
+    gathered = values[np.minimum(index, max(T - 1, 0))]
+    gathered[index >= T] = np.nan
+    return gathered
+
+def make_labels(close, horizons=HORIZONS, mean=None, std=None, transform=None):
+    """
+    Multi-horizon labels for a close panel in one pass.
+
+    Parameters:
+    - close (numpy.ndarray): (T x tickers) closes, normalized if mean/std are given.
+    - horizons (tuple): Bars ahead.
+    - mean (numpy.ndarray): Per-ticker close mean to de-normalize with (optional).
+    - std (numpy.ndarray): Per-ticker close std to de-normalize with (optional).
+    - transform (callable): Vectorized (T x horizons x tickers) -> same-shape function
+                            applied to the future closes, for custom labels.
+
+    Returns:
+    - dict: 'next' future closes, 'return' relative moves and 'direction' signs
+            (-1, 0, 1, NaN past the end), each (T x len(horizons) x tickers) in the
+            dtype of close, plus 'label' when transform is given.
+    """
+    close = _float(close)
+    if close.ndim == 1:
+        close = close[:, None]
+    if mean is not None:
+        dtype = close.dtype
+        close = (close * np.asarray(std, dtype=dtype) + np.asarray(mean, dtype=dtype)).astype(dtype, copy=False)
+
+    ahead = future(close, horizons)
+    now = close[:, None, :]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = (ahead - now) / np.abs(now)
+
+    labels = {'next': ahead, 'return': returns, 'direction': np.sign(ahead - now)}
+    if transform is not None:
+        labels['label'] = transform(ahead)
+    return labels
+
+def panel(frame, tickers, column='close', dtype=np.float32):
+    """(T x tickers) array of one feature from a wide '{ticker}_{column}' frame."""
+    return frame[[f"{ticker}_{column}" for ticker in tickers]].to_numpy(dtype=dtype)
+
+def shift_labels(frame, transform=None, periods=1):
+    """
+    Vectorized frame.shift(-periods).map(transform): the numeric columns are shifted
+    as one block and transform, if given, is called once on the whole (T x columns) array.
+    """
+    shifted = frame.shift(-periods)
+    if transform is None:
+        return shifted
+    numeric = shifted.select_dtypes('number').columns
+    shifted[numeric] = transform(shifted[numeric].to_numpy())
+    return shifted
@@ -0,0 +1,113 @@
+"""
+TFLite / ONNX export of the trained transformer and a thin CPU predictor.
+
+The exported file only maps (batch x 24 x 7) normalized windows to the
+normalized next close, the same as model.predict. LitePredictor runs it
+through tflite_runtime / ai_edge_litert or onnxruntime, so a signal worker
+does not need to import TensorFlow at all. Without either runtime it falls
+back to tf.lite.Interpreter.
+
+Export and check parity against Keras with export_model.py.
+"""
+import os
+import json
+
+import numpy as np
+
+from utils import sequences as seq
+
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        Interpreter = None
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+def spec_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+def write_spec(path, model):
+    """Input shape next to the exported file, so the predictor can validate windows without TF."""
+    with open(spec_path(path), "w") as file:
+        json.dump({"input_shape": list(model.input_shape[1:])}, file)
+
+def export_tflite(model, path):
+    """Convert a Keras model to a .tflite flatbuffer."""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(path, "wb") as file:
+        file.write(converter.convert())
+    write_spec(path, model)
+    return path
+
+def export_onnx(model, path, opset=13):
+    """Convert a Keras model to ONNX (needs tf2onnx)."""
+    import tensorflow as tf
+    try:
+        import tf2onnx
+    except ImportError:
+        raise ImportError("ONNX export needs tf2onnx: pip install tf2onnx")
+
+    signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="windows")]
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=path)
+    write_spec(path, model)
+    return path
+
+class LitePredictor:
+    """Runs an exported .tflite or .onnx model on (batch x sequence_length x features) windows."""
+    def __init__(self, path, threads=None):
+        self.path = path
+        with open(spec_path(path), "r") as file:
+            self.input_shape = tuple(json.load(file)["input_shape"])
+
+        if path.endswith(".onnx"):
+            if onnxruntime is None:
+                raise ImportError("Running .onnx models needs onnxruntime: pip install onnxruntime")
+            options = onnxruntime.SessionOptions()
+            if threads:
+                options.intra_op_num_threads = threads
+            self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            self.input_name = self.session.get_inputs()[0].name
+            self._run = self._run_onnx
+        else:
+            interpreter = Interpreter
+            if interpreter is None:
+                import tensorflow as tf
+                interpreter = tf.lite.Interpreter
+            self.interpreter = interpreter(model_path=path, num_threads=threads)
+            self.input_index = self.interpreter.get_input_details()[0]["index"]
+            self.output_index = self.interpreter.get_output_details()[0]["index"]
+            self.batch_size = None
+            self._run = self._run_tflite
+
+    def _run_onnx(self, windows):
+        return self.session.run(None, {self.input_name: windows})[0]
+
+    def _run_tflite(self, windows):
+        if self.batch_size != len(windows):
+            self.interpreter.resize_tensor_input(self.input_index, windows.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(windows)
+        self.interpreter.set_tensor(self.input_index, windows)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)
+
+    def predict(self, windows):
+        """(batch x 1) normalized next close, like model.predict."""
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        if windows.shape[1:] != self.input_shape:
+            raise ValueError(f"Expected windows of shape (batch, {self.input_shape}), got {windows.shape}")
+        return self._run(windows)
+
+def parity(model, predictor, windows, batch_size=512):
+    """Largest absolute difference between Keras and the exported model on windows."""
+    expected = model.predict(windows, batch_size=batch_size, verbose=0)
+    actual = np.concatenate([predictor.predict(batch) for batch, in seq.iter_batches(windows, batch_size=batch_size)])
+    return float(np.max(np.abs(expected - actual)))
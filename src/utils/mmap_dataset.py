@@ -0,0 +1,140 @@
+"""
+Memory-mapped training windows with a deterministic shuffle.
+
+write_dataset() stores the per-ticker feature matrices once, packed end to
+end, plus the first row of every window:
+
+    {path}/features.npy   (rows x features) packed matrices
+    {path}/starts.npy     int32 first packed row of each window
+    {path}/tickers.npy    int32 ticker id of each window
+    {path}/stats.npy      (tickers x 2) close mean / std
+    {path}/meta.json      sequence length, horizon, counts and the build key
+
+MmapSequence opens them memory-mapped and, each epoch, draws an int32
+permutation seeded with (seed, epoch) and gathers one batch of windows at a
+time. Only the permutation and one batch ever live in RAM, so there is no
+shuffled copy of the training tensor and the data can exceed memory.
+
+Pass the cache.build_key() of the inputs as key= to both write_dataset() and
+has_dataset(), so a directory written from other inputs is rebuilt instead
+of silently reused.
+"""
+import os
+import json
+
+import numpy as np
+import tensorflow as tf
+
+from utils import dataset
+from utils import sequences as seq
+
+def write_dataset(path, matrices, means, stds, split='train',
+                  sequence_length=seq.SEQUENCE_LEN, horizon=seq.HORIZON, key=None):
+    """
+    Write the windows of one split to path.
+
+    Parameters:
+    - path (str): Output directory.
+    - matrices (list): Per-ticker (T x features) arrays with the close in column 0.
+    - means (list): Close mean per ticker.
+    - stds (list): Close std per ticker.
+    - split (str): Which split's windows to index.
+    - key (str): Build key of the inputs (see cache.build_key), checked by has_dataset.
+    """
+    os.makedirs(path, exist_ok=True)
+    # drop the old meta.json first, so a rebuild that dies halfway is not mistaken for a finished one
+    if has_dataset(path):
+        os.remove(os.path.join(path, "meta.json"))
+    lengths = np.array([len(m) for m in matrices], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    if offsets[-1] > np.iinfo(np.int32).max:
+        raise ValueError(f"{offsets[-1]} packed rows do not fit int32 window indices")
+
+    # stream the matrices into the file instead of concatenating them in RAM first
+    features = np.lib.format.open_memmap(os.path.join(path, "features.npy"), mode="w+",
+                                         dtype=matrices[0].dtype, shape=(int(offsets[-1]), matrices[0].shape[1]))
+    for i, m in enumerate(matrices):
+        features[offsets[i]:offsets[i + 1]] = m
+    features.flush()
+    del features
+
+    starts, ticker_ids = dataset.window_starts(offsets, split, sequence_length, horizon)
+    np.save(os.path.join(path, "starts.npy"), starts.astype(np.int32))
+    np.save(os.path.join(path, "tickers.npy"), ticker_ids.astype(np.int32))
+    np.save(os.path.join(path, "stats.npy"), np.column_stack([means, stds]).astype(np.float64))
+
+    # meta.json last, so a half-written dataset is never opened
+    with open(os.path.join(path, "meta.json"), "w") as file:
+        json.dump({"split": split,
+                   "sequence_length": int(sequence_length),
+                   "horizon": int(horizon),
+                   "windows": int(len(starts)),
+                   "tickers": int(len(matrices)),
+                   "key": key}, file)
+
+def has_dataset(path, key=None):
+    """True if path holds a finished dataset (built from inputs with this key, when one is given)."""
+    try:
+        with open(os.path.join(path, "meta.json"), "r") as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return False
+    return key is None or meta.get("key") == key
+
+def permutation(n, seed, epoch):
+    """Reproducible int32 shuffle of n windows for one epoch."""
+    return np.random.default_rng([seed, epoch]).permutation(n).astype(np.int32)
+
+class MmapSequence(tf.keras.utils.PyDataset):
+    """
+    Keras dataset over a write_dataset() directory.
+
+    Parameters:
+    - path (str): Dataset directory.
+    - batch_size (int): Windows per batch.
+    - shuffle (bool): Reshuffle every epoch; otherwise windows come in stored order.
+    - seed (int): Base seed of the per-epoch permutations.
+    """
+    def __init__(self, path, batch_size=512, shuffle=True, seed=42, **kwargs):
+        super().__init__(**kwargs)
+        with open(os.path.join(path, "meta.json"), "r") as file:
+            self.meta = json.load(file)
+        self.features = np.load(os.path.join(path, "features.npy"), mmap_mode="r")
+        self.starts = np.load(os.path.join(path, "starts.npy"), mmap_mode="r")
+        self.ticker_ids = np.load(os.path.join(path, "tickers.npy"), mmap_mode="r")
+        self.stats = np.load(os.path.join(path, "stats.npy"))
+
+        self.sequence_length = self.meta["sequence_length"]
+        self.horizon = self.meta["horizon"]
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.window = np.arange(self.sequence_length, dtype=np.int64)
+        self.set_epoch(0)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+        if self.shuffle:
+            self.order = permutation(len(self.starts), self.seed, epoch)
+        else:
+            self.order = np.arange(len(self.starts), dtype=np.int32)
+
+    def on_epoch_end(self):
+        self.set_epoch(self.epoch + 1)
+
+    def __len__(self):
+        return int(np.ceil(len(self.starts) / self.batch_size))
+
+    def __getitem__(self, index):
+        batch = self.order[index * self.batch_size:(index + 1) * self.batch_size]
+        starts = self.starts[batch].astype(np.int64)
+        ticker_ids = self.ticker_ids[batch]
+
+        rows = starts[:, None] + self.window
+        sequences = self.features[rows.ravel()].reshape(len(batch), self.sequence_length, -1)
+        close = self.features[:, 0]
+        labels = np.column_stack([close[starts + self.sequence_length - 1],
+                                  close[starts + self.sequence_length + self.horizon],
+                                  self.stats[ticker_ids, 0],
+                                  self.stats[ticker_ids, 1]])
+        return sequences, labels.astype(sequences.dtype)
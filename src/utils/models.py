@@ -0,0 +1,241 @@
+"""
+Transformer model, losses and metrics shared by the training scripts.
+
+The default path is the float32 model with float32 metric math (the
+float64 dir_acc / custom_mae_loss are kept as the reference, see
+compile_model(fp32_metrics=False)). enable_fast_mode / compile_model(fast=True)
+add an XLA-compiled train step and, on CPUs with native bfloat16, a
+mixed_bfloat16 policy. benchmarks/training.py reports steps/sec for each
+combination.
+"""
+import math
+
+import tensorflow as tf
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import Input, Dense, Dropout, LayerNormalization, MultiHeadAttention, Add, GlobalAveragePooling1D
+
+###########################
+## DEFINE NEURAL NETWORK ##
+###########################
+def transformer_encoder(inputs, head_size, num_heads, ff_dim, dropout=0):
+    # Attention and Normalization
+    x = LayerNormalization(epsilon=1e-6)(inputs)
+    x = MultiHeadAttention(key_dim=head_size, num_heads=num_heads, dropout=dropout)(x, x)
+    x = Add()([x, inputs])
+
+    # Feed Forward Part
+    y = LayerNormalization(epsilon=1e-6)(x)
+    y = Dense(ff_dim, activation="relu")(y)
+    y = Dropout(dropout)(y)
+    y = Dense(inputs.shape[-1])(y)
+    return Add()([y, x])
+
+def build_transformer_model(input_shape, head_size, num_heads, ff_dim, num_layers, dropout=0):
+    inputs = Input(shape=input_shape)
+    x = inputs
+
+    #vocab_size=10000
+    #embedding_dim=32
+    #x = Embedding(vocab_size, embedding_dim)(x)
+    
+    # Create multiple layers of the Transformer block
+    for _ in range(num_layers):
+        x = transformer_encoder(x, head_size, num_heads, ff_dim, dropout)
+
+    # Final part of the model
+    x = GlobalAveragePooling1D()(x)
+    x = LayerNormalization(epsilon=1e-6)(x)
+    # float32 head so predictions and losses stay float32 under a mixed precision policy
+    outputs = Dense(1, activation="linear", dtype="float32")(x)
+
+    # Compile model
+    model = Model(inputs=inputs, outputs=outputs)
+    return model
+
+##########################
+## CUSTOM LOSS FUNCTION ##
+##########################
+
+def directional_mse_loss(y_true, y_pred):
+    """
+    This loss function penalizes predictions that are in the wrong direction more heavily than those that are merely inaccurate in magnitude.
+    It can be seen as an extension of the mean squared error that incorporates the directionality:
+    """
+    mean = y_true[:, 2]
+    std = y_true[:, 3]
+    
+    def unnormalize(values):
+        return values * std + mean
+
+    y_true_prev = unnormalize(y_true[:, 0])
+    y_true_next = unnormalize(y_true[:, 1])
+    y_pred_next = unnormalize(y_pred[:, 0])
+    
+    true_change = y_true_next - y_true_prev
+    pred_change = y_pred_next - y_true_prev
+
+    # Calculate squared error
+    squared_error = tf.square(y_true_next - y_pred_next)
+
+    # Check if predicted and true change have the same sign
+    same_direction = tf.equal(tf.sign(true_change), tf.sign(pred_change))
+    same_direction = tf.cast(same_direction, tf.float32)
+
+    # Penalize errors in the wrong direction more
+    direction_penalty = 1 + (1 - same_direction) * 10  # Increase the weight of wrong direction errors
+
+    directional_mse = squared_error * direction_penalty
+    return tf.reduce_mean(directional_mse)
+
+
+def directional_bce_loss(y_true, y_pred):
+    """
+    This loss function treats the problem as a classification task where the classes are "price went up" and "price went down".
+    It uses the sigmoid of the predicted change and actual change to compute a binary cross-entropy loss, which inherently captures the direction:
+    """
+    mean = y_true[:, 2]
+    std = y_true[:, 3]
+    
+    def unnormalize(values):
+        return values * std + mean
+
+    y_true_prev = unnormalize(y_true[:, 0])
+    y_true_next = unnormalize(y_true[:, 1])
+    y_pred_next = unnormalize(y_pred[:, 0])
+    
+    true_change = y_true_next - y_true_prev
+    pred_change = y_pred_next - y_true_prev
+
+    # Compute binary labels for direction
+    true_label = tf.cast(tf.greater(true_change, 0), tf.float32)
+    pred_prob = tf.sigmoid(pred_change)  # Use sigmoid to squash the output between 0 and 1
+
+    # Use binary cross-entropy
+    loss = tf.keras.losses.binary_crossentropy(true_label, pred_prob)
+    return tf.reduce_mean(loss)
+
+def custom_mae_loss(y_true, y_pred):
+    y_true_next = tf.cast(y_true[:, 1], tf.float64)
+    y_pred_next = tf.cast(y_pred[:, 0], tf.float64)
+    abs_error = tf.abs(y_true_next - y_pred_next)
+    
+    return tf.reduce_mean(abs_error)
+
+def dir_acc(y_true, y_pred):
+    mean, std = tf.cast(y_true[:, 2], tf.float64), tf.cast(y_true[:, 3], tf.float64)
+    
+    y_true_prev = (tf.cast(y_true[:, 0], tf.float64) * std) + mean
+    y_true_next = (tf.cast(y_true[:, 1], tf.float64) * std) + mean
+    y_pred_next = (tf.cast(y_pred[:, 0], tf.float64) * std) + mean
+    
+    true_change = y_true_next - y_true_prev
+    pred_change = y_pred_next - y_true_prev
+    
+    correct_direction = tf.equal(tf.sign(true_change), tf.sign(pred_change))
+    
+    return tf.reduce_mean(tf.cast(correct_direction, tf.float64))
+
+#####################
+## FLOAT32 METRICS ##
+#####################
+# The float64 versions above are the reference. Since std > 0, unnormalizing
+# never changes the sign of a move, so these take the sign straight off the
+# normalized values in float32; evaluation.direction_mismatches() counts the
+# windows where the two disagree.
+
+def custom_mae_loss_fp32(y_true, y_pred):
+    y_true_next = tf.cast(y_true[:, 1], tf.float32)
+    y_pred_next = tf.cast(y_pred[:, 0], tf.float32)
+    return tf.reduce_mean(tf.abs(y_true_next - y_pred_next))
+
+def dir_acc_fp32(y_true, y_pred):
+    y_true = tf.cast(y_true, tf.float32)
+    y_pred = tf.cast(y_pred, tf.float32)
+
+    true_change = y_true[:, 1] - y_true[:, 0]
+    pred_change = y_pred[:, 0] - y_true[:, 0]
+
+    correct_direction = tf.equal(tf.sign(true_change), tf.sign(pred_change))
+    return tf.reduce_mean(tf.cast(correct_direction, tf.float32))
+
+def bfloat16_supported():
+    """True if the CPU has native bfloat16 instructions (AVX512_BF16 or AMX)."""
+    try:
+        with open("/proc/cpuinfo", "r") as file:
+            flags = file.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+def enable_fast_mode(precision="auto"):
+    """
+    Set the global Keras dtype policy for fast training. Call before building the model.
+
+    Parameters:
+    - precision (str): 'bfloat16', 'float32', or 'auto' for bfloat16 when the CPU supports it.
+
+    Returns:
+    - str: The policy that was set.
+    """
+    if precision == "auto":
+        precision = "bfloat16" if bfloat16_supported() else "float32"
+    policy = "mixed_bfloat16" if precision == "bfloat16" else "float32"
+    tf.keras.mixed_precision.set_global_policy(policy)
+    return policy
+
+def compile_model(model, loss, learning_rate=0.001, fast=False, jit_compile=None, fp32_metrics=True):
+    """
+    Compile with Adam and the dir_acc metric.
+
+    fp32_metrics computes dir_acc / custom_mae_loss in float32 (still reported
+    as 'dir_acc' so the checkpoints keep monitoring val_dir_acc); False uses the
+    float64 reference versions. fast=True turns on jit_compile, an XLA-compiled
+    train step, which can also be set on its own.
+    """
+    jit_compile = fast if jit_compile is None else jit_compile
+
+    metric = dir_acc
+    if fp32_metrics:
+        metric = tf.keras.metrics.MeanMetricWrapper(dir_acc_fp32, name="dir_acc")
+        if loss is custom_mae_loss:
+            loss = custom_mae_loss_fp32
+
+    # left unset, Keras already skips XLA on CPU-only machines
+    extra = dict(jit_compile=True) if jit_compile else {}
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate), loss=loss, metrics=[metric], **extra)
+    return model
+
+def lr_schedule(batch_size=16, mode='cos', epochs=500, ramp=0.25, sustain=0.10, lr_per_sample=6e-6):
+    """
+    Warm-up / cosine-decay learning rate per epoch, as used by transformer.py's get_lr_callback.
+
+    Parameters:
+    - batch_size (int): Global batch size; the peak rate is lr_per_sample * batch_size.
+    - mode (str): 'cos' for cosine decay after the warm-up, anything else holds the minimum.
+    - epochs (int): Total epochs.
+    - ramp (float): Fraction of epochs spent warming up.
+    - sustain (float): Fraction of epochs (counted from the start) held at the peak.
+    - lr_per_sample (float): Peak rate per sample in the batch.
+
+    Returns:
+    - function: epoch -> learning rate.
+    """
+    lr_start, lr_max, lr_min = 5e-6, lr_per_sample * batch_size, 1e-6  # Adjust learning rate boundaries
+    lr_ramp_ep = int(ramp * epochs)
+    lr_sus_ep = max(0, int(sustain * epochs) - lr_ramp_ep)
+
+    def lrfn(epoch):
+        if epoch < lr_ramp_ep:  # Warm-up phase
+            lr = (lr_max - lr_start) / lr_ramp_ep * epoch + lr_start
+        elif epoch < lr_ramp_ep + lr_sus_ep:  # Sustain phase at max learning rate
+            lr = lr_max
+        elif mode == 'cos':
+            decay_total_epochs, decay_epoch_index = epochs - lr_ramp_ep - lr_sus_ep, epoch - lr_ramp_ep - lr_sus_ep
+            phase = math.pi * decay_epoch_index / decay_total_epochs
+            lr = (lr_max - lr_min) * 0.5 * (1 + math.cos(phase)) + lr_min
+        else:
+            lr = lr_min  # Default to minimum learning rate if mode is not recognized
+
+        return lr
+
+    return lrfn
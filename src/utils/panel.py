@@ -0,0 +1,155 @@
+"""
+Long-format (ticker, datetime) feature panel.
+
+Instead of one wide pd.concat(axis=1) frame with a Datetime column and 11
+feature columns per ticker, every ticker's rows are packed end to end into a
+single contiguous float32 block:
+
+    values    (rows x features) float32, ticker i owns rows offsets[i]:offsets[i+1]
+    offsets   (tickers + 1,) int64
+    datetime  (rows,) datetime64[ns], one timestamp per row
+
+Missing values are dropped per ticker, so one ticker with a gap no longer
+removes that row from the whole universe. Tickers can still be put on a
+shared calendar with align() when they have to line up bar for bar, or
+spread into a (T x tickers) array with wide().
+"""
+import numpy as np
+
+from utils import feature_store
+
+class Panel:
+    """
+    Packed per-ticker feature rows.
+
+    Parameters:
+    - tickers (list): Ticker symbols, in block order.
+    - columns (list): Feature names of the value columns.
+    - values (numpy.ndarray): (rows x features) block.
+    - offsets (numpy.ndarray): (tickers + 1,) row offsets into values.
+    - datetime (numpy.ndarray): (rows,) timestamps.
+    - dropped (numpy.ndarray): Rows pack() dropped per ticker for a NaN / inf (optional).
+    """
+    def __init__(self, tickers, columns, values, offsets, datetime, dropped=None):
+        self.tickers = list(tickers)
+        self.columns = list(columns)
+        self.values = values
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.datetime = datetime
+        self.dropped = dropped
+        self._index = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes + self.datetime.nbytes
+
+    def rows(self, ticker):
+        i = self._index[ticker]
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def matrix(self, ticker):
+        """(rows x features) view of one ticker."""
+        return self.values[self.rows(ticker)]
+
+    def times(self, ticker):
+        return self.datetime[self.rows(ticker)]
+
+    def matrices(self):
+        return [self.values[self.offsets[i]:self.offsets[i + 1]] for i in range(len(self))]
+
+    def ticker_ids(self):
+        """Ticker id of every packed row."""
+        return np.repeat(np.arange(len(self), dtype=np.int32), self.lengths)
+
+    def select(self, keep):
+        """New panel with only the packed rows where the boolean mask keep is set."""
+        counts = np.bincount(self.ticker_ids(), weights=keep, minlength=len(self)).astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return Panel(self.tickers, self.columns, self.values[keep], offsets, self.datetime[keep])
+
+    def drop_last(self, n=1):
+        """Drop each ticker's last n rows (e.g. the rows without a next-bar label)."""
+        position = np.arange(len(self.values)) - np.repeat(self.offsets[:-1], self.lengths)
+        return self.select(position < np.repeat(self.lengths - n, self.lengths))
+
+    def common_calendar(self):
+        """Timestamps every ticker has a row for."""
+        stamps, counts = np.unique(self.datetime, return_counts=True)
+        return stamps[counts == len(self)]
+
+    def align(self, calendar=None):
+        """Keep only rows on calendar (default: the timestamps all tickers share), so tickers line up bar for bar."""
+        calendar = self.common_calendar() if calendar is None else np.asarray(calendar, dtype=self.datetime.dtype)
+        return self.select(np.isin(self.datetime, calendar))
+
+    def wide(self, column, calendar=None):
+        """
+        One feature as a (T x tickers) array on calendar (default: the union of all
+        timestamps), NaN where a ticker has no row.
+
+        Returns:
+        - tuple: (calendar, array).
+        """
+        calendar = np.unique(self.datetime) if calendar is None else np.asarray(calendar, dtype=self.datetime.dtype)
+        position = np.searchsorted(calendar, self.datetime)
+        found = (position < len(calendar)) & (calendar[np.minimum(position, len(calendar) - 1)] == self.datetime)
+
+        out = np.full((len(calendar), len(self)), np.nan, dtype=self.values.dtype)
+        out[position[found], self.ticker_ids()[found]] = self.values[found, self.columns.index(column)]
+        return calendar, out
+
+    def arrays(self):
+        """The three arrays, e.g. for utils/cache.py."""
+        return {'values': self.values, 'offsets': self.offsets, 'datetime': self.datetime}
+
+    @classmethod
+    def from_arrays(cls, arrays, tickers, columns):
+        return cls(tickers, columns, arrays['values'], arrays['offsets'], arrays['datetime'])
+
+def pack(tickers, blocks, columns, dtype=np.float32):
+    """
+    Build a panel from per-ticker (datetime, values) pairs, dropping every row that
+    has a NaN or inf in any column of that ticker. Blocks are checked in their own
+    dtype and cast to dtype only once, when they are copied into the panel.
+    """
+    datetimes, values, dropped = [], [], []
+    for datetime, block in blocks:
+        block = np.asarray(block)
+        if block.dtype.kind not in 'fiu':
+            block = block.astype(dtype)
+        finite = np.isfinite(block).all(axis=1)
+        datetimes.append(np.asarray(datetime, dtype='datetime64[ns]')[finite])
+        values.append(block[finite])
+        dropped.append(len(block) - len(values[-1]))
+
+    lengths = np.array([len(v) for v in values], dtype=np.int64)
+    packed = np.empty((int(lengths.sum()), len(columns)), dtype=dtype)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    for i, block in enumerate(values):
+        packed[offsets[i]:offsets[i + 1]] = block
+    datetime = np.concatenate(datetimes) if datetimes else np.empty(0, dtype='datetime64[ns]')
+    return Panel(tickers, columns, packed, offsets, datetime, dropped=np.array(dropped, dtype=np.int64))
+
+def from_frames(frames, tickers, columns):
+    """Panel from per-ticker frames with a Datetime column and '{ticker}_{column}' columns."""
+    blocks = [(frame['Datetime'].to_numpy(), frame[[f"{ticker}_{c}" for c in columns]].to_numpy())
+              for ticker, frame in zip(tickers, frames)]
+    return pack(tickers, blocks, columns)
+
+def from_store(root, tickers, columns, min_rows=0):
+    """Panel straight from the feature store arrays, skipping missing tickers and ones shorter than min_rows."""
+    kept, blocks = [], []
+    for ticker in tickers:
+        if not feature_store.has_ticker(root, ticker): continue
+        if feature_store.read_meta(root, ticker)["rows"] < min_rows: continue
+        datetime, values, _ = feature_store.read_ticker(root, ticker, columns=columns)
+        kept.append(ticker)
+        blocks.append((datetime, values))
+    return pack(kept, blocks, columns)
@@ -0,0 +1,174 @@
+"""
+Per-stage timing and memory report for the training script.
+
+transformer.py runs top to bottom, so stages are marked rather than wrapped;
+starting a stage ends the previous one:
+
+    profiler = profiling.Profiler()
+    profiler.stage("load")
+    ...
+    profiler.record("rows", n)          # counts for the current stage
+    profiler.array("panel", values)     # shape / dtype / MiB
+    profiler.stage("sequences")
+    ...
+    profiler.finish("profiles/run.json")
+
+Every stage gets its wall time, the RSS at its end, how much the RSS grew
+during it and the process peak RSS so far. cprofile= wraps the whole run in
+cProfile (the .prof file is written next to the report and the slowest
+functions are listed in it); tf_logdir= captures a TensorFlow profiler trace
+for the stages named in tf_stages, for TensorBoard's profile tab.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import pstats
+import cProfile
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+MiB = 2 ** 20
+
+def rss():
+    """Current resident set size in bytes (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def peak_rss():
+    """Peak resident set size of this process in bytes (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB on Linux
+
+def _mib(size):
+    return None if size is None else round(size / MiB, 2)
+
+def describe(array):
+    """shape, dtype and size of an array (anything with shape / dtype / nbytes)."""
+    return {'shape': list(array.shape), 'dtype': str(array.dtype), 'mib': _mib(array.nbytes)}
+
+class Profiler:
+    """
+    Collects stage timings and values for one run.
+
+    Parameters:
+    - cprofile (bool): Run the whole script under cProfile.
+    - tf_logdir (str): Directory for a TensorFlow profiler trace (optional).
+    - tf_stages (tuple): Stages the TensorFlow trace covers.
+    - top (int): Functions to list from the cProfile stats.
+    """
+    def __init__(self, cprofile=False, tf_logdir=None, tf_stages=("fit",), top=30):
+        self.started = time.time()
+        self.start_time = time.perf_counter()
+        self.stages = []
+        self.values = {}
+        self.tf_logdir = tf_logdir
+        self.tf_stages = tuple(tf_stages)
+        self.top = top
+        self._current = None
+        self._tracing = False
+
+        self._cprofile = cProfile.Profile() if cprofile else None
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def stage(self, name):
+        """End the current stage (if any) and start name."""
+        self.end()
+        if self.tf_logdir and name in self.tf_stages:
+            import tensorflow as tf
+            tf.profiler.experimental.start(self.tf_logdir)
+            self._tracing = True
+        self._current = {'name': name, 'values': {}, 'arrays': {},
+                         '_start': time.perf_counter(), '_rss': rss()}
+
+    def end(self):
+        """End the current stage."""
+        if self._current is None:
+            return
+        if self._tracing:
+            import tensorflow as tf
+            tf.profiler.experimental.stop()
+            self._tracing = False
+
+        stage = self._current
+        now = rss()
+        start_rss = stage.pop('_rss')
+        stage['seconds'] = round(time.perf_counter() - stage.pop('_start'), 4)
+        stage['rss_mib'] = _mib(now)
+        stage['rss_delta_mib'] = _mib(now - start_rss) if now is not None and start_rss is not None else None
+        stage['peak_rss_mib'] = _mib(peak_rss())
+        self.stages.append(stage)
+        self._current = None
+
+    def record(self, name, value):
+        """Store a JSON-serializable value on the current stage (or on the run outside a stage)."""
+        target = self._current['values'] if self._current is not None else self.values
+        target[name] = value.item() if hasattr(value, 'item') else value
+
+    def array(self, name, array):
+        """Store the shape, dtype and size of array on the current stage."""
+        target = self._current['arrays'] if self._current is not None else self.values
+        target[name] = describe(array)
+
+    def report(self):
+        """The run so far as a dict (the current stage is not included until it ends)."""
+        return {'argv': sys.argv,
+                'started': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                'host': socket.gethostname(),
+                'pid': os.getpid(),
+                'cpus': os.cpu_count(),
+                'seconds': round(time.perf_counter() - self.start_time, 4),
+                'peak_rss_mib': _mib(peak_rss()),
+                'values': self.values,
+                'stages': self.stages}
+
+    def _cprofile_stats(self, path):
+        self._cprofile.disable()
+        self._cprofile.dump_stats(path)
+        stats = pstats.Stats(self._cprofile)
+        top = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            top.append({'function': f"{filename}:{line}({function})", 'calls': calls,
+                        'tottime': round(tottime, 4), 'cumtime': round(cumtime, 4)})
+        top.sort(key=lambda row: row['cumtime'], reverse=True)
+        return {'path': path, 'top': top[:self.top]}
+
+    def finish(self, path=None):
+        """
+        End the current stage and write the JSON report.
+
+        Parameters:
+        - path (str): Report file. Without one the report is only returned.
+
+        Returns:
+        - dict: The report.
+        """
+        self.end()
+        report = self.report()
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self._cprofile is not None:
+            report['cprofile'] = self._cprofile_stats(os.path.splitext(path or "profile")[0] + ".prof")
+            self._cprofile = None
+        if self.tf_logdir:
+            report['tf_logdir'] = self.tf_logdir
+
+        if path is not None:
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2, default=str)
+        return report
+
+    def summary(self):
+        """One line per finished stage, for printing at the end of a run."""
+        return "\n".join(f"{s['name']:<12} {s['seconds']:>10.2f}s  rss {s['rss_mib']} MiB  peak {s['peak_rss_mib']} MiB"
+                         for s in self.stages)
@@ -0,0 +1,113 @@
+"""
+Sliding-window sequence builder shared by the training and inference scripts.
+
+Windows are strided views over the (T x features) ticker matrix, so building
+them costs no copy; labels are filled into one preallocated (N x 4) array of
+[prev, next, mean, std] where prev is the last close in the window and next
+is the close `horizon` bars after it. create_horizon_labels() adds the
+multi-horizon direction / return labels of utils/labeling.py for the same
+windows.
+
+Training over many tickers gathers windows per batch through utils/dataset.py;
+iter_batches() does the same for arrays already in memory, copying one batch
+of a window view at a time.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils import labeling
+
+SEQUENCE_LEN = 24
+HORIZON = 12
+
+def num_sequences(data_size, sequence_length=SEQUENCE_LEN, horizon=HORIZON):
+    """Number of windows that still have a label `horizon` steps ahead."""
+    return max(0, data_size - (sequence_length + horizon))
+
+def window_view(data, sequence_length=SEQUENCE_LEN):
+    """Read-only (T - sequence_length + 1, sequence_length, features) view over data."""
+    return np.moveaxis(sliding_window_view(data, sequence_length, axis=0), -1, 1)
+
+def create_labels(data, mean, std, sequence_length=SEQUENCE_LEN, horizon=HORIZON, column=0, label_offset=0):
+    """
+    Build the [prev, next, mean, std] label matrix for every window of data.
+
+    label_offset moves prev and next that many bars past the window end, for
+    labels taken from a shift(-1) frame as transformerMediumArticle.py does.
+    """
+    n = num_sequences(len(data), sequence_length, horizon + label_offset)
+    prev = sequence_length - 1 + label_offset
+    labels = np.empty((n, 4), dtype=data.dtype)
+    labels[:, 0] = data[prev:prev + n, column]
+    labels[:, 1] = data[prev + horizon + 1:prev + horizon + 1 + n, column]
+    labels[:, 2] = mean
+    labels[:, 3] = std
+    return labels
+
+def create_horizon_labels(data, mean=None, std=None, sequence_length=SEQUENCE_LEN, horizon=HORIZON,
+                          horizons=labeling.HORIZONS, column=0, transform=None):
+    """
+    Multi-horizon labels for every window of data, measured from the window's last close.
+
+    Parameters:
+    - data (numpy.ndarray): (T x features) matrix with the close in column 0.
+    - mean (float): Close mean to de-normalize with, so 'return' is a real relative move (optional).
+    - std (float): Close std to de-normalize with (optional).
+    - horizons (tuple): Bars ahead of the last close in the window.
+    - transform (callable): Vectorized custom label, see labeling.make_labels.
+
+    Returns:
+    - dict: 'next', 'return', 'direction' (and 'label') arrays of shape (N, len(horizons))
+            in the dtype of data, row i belonging to window i of create_sequences.
+    """
+    n = num_sequences(len(data), sequence_length, horizon)
+    labels = labeling.make_labels(data[:, column], horizons, mean=mean, std=std, transform=transform)
+    return {key: value[sequence_length - 1:sequence_length - 1 + n, :, 0] for key, value in labels.items()}
+
+def create_sequences(data, mean, std, sequence_length=SEQUENCE_LEN, horizon=HORIZON, copy=False, label_offset=0):
+    """
+    Create every window of data and its label.
+
+    Parameters:
+    - data (numpy.ndarray): (T x features) matrix with the close in column 0.
+    - mean (float): Close mean used to normalize the ticker.
+    - std (float): Close std used to normalize the ticker.
+    - sequence_length (int): Bars per window. Default is 24 (2 hours of 5m bars).
+    - horizon (int): Bars between the window end and the predicted close. Default is 12.
+    - copy (bool): Return a contiguous copy of the windows instead of a view.
+    - label_offset (int): Bars the labels lag the window end by (see create_labels). Default is 0.
+
+    Returns:
+    - tuple: (sequences, labels) with shapes (N, sequence_length, features) and (N, 4).
+    """
+    n = num_sequences(len(data), sequence_length, horizon + label_offset)
+    if n == 0:
+        sequences = np.empty((0, sequence_length) + data.shape[1:], dtype=data.dtype)
+    else:
+        sequences = window_view(data, sequence_length)[:n]
+    labels = create_labels(data, mean, std, sequence_length, horizon, label_offset=label_offset)
+
+    if copy:
+        sequences = np.ascontiguousarray(sequences)
+    return sequences, labels
+
+def iter_batches(*arrays, batch_size=512, indices=None):
+    """
+    Materialize windows lazily, one batch at a time.
+
+    Parameters:
+    - arrays (numpy.ndarray): Window views from create_sequences and any arrays that go
+                              with them (labels, ...), all of the same length.
+    - batch_size (int): Windows per batch.
+    - indices (numpy.ndarray): Optional order to visit the windows in (e.g. a permutation).
+
+    Yields:
+    - tuple: One contiguous batch of every array; only this batch is copied.
+    """
+    n = len(arrays[0])
+    for start in range(0, n, batch_size):
+        if indices is None:
+            batch = slice(start, min(start + batch_size, n))
+        else:
+            batch = indices[start:start + batch_size]
+        yield tuple(np.ascontiguousarray(array[batch]) for array in arrays)
@@ -0,0 +1,157 @@
+"""
+Online forecasting service around an exported inference artifact.
+
+Requests are queued and a single worker thread drains them in micro-batches:
+it takes whatever has arrived, waits up to max_wait for more (or until
+max_batch), and answers the whole batch with one model call. Concurrent
+callers therefore share one forward pass instead of paying one each.
+
+HTTP API (see serve.py):
+
+    POST /predict  {"ticker": "AAPL", "bars": [[...features...] x sequence_length], "raw": false}
+                -> {"ticker": "AAPL", "prediction": ..., "next_close": ..., "last_close": ...,
+                    "direction": "UP" | "DOWN"}
+    GET  /health   -> artifact spec summary and batching counters
+
+Malformed requests and tickers the artifact has no stats for get a 400 with
+{"error": ...}.
+"""
+import json
+import time
+import queue
+import threading
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+class MicroBatcher:
+    """
+    Collects (ticker, window) requests into batches for predictor.predict.
+
+    Parameters:
+    - predictor (artifact.Predictor): Loaded artifact.
+    - max_batch (int): Largest batch per model call.
+    - max_wait (float): Seconds to wait for more requests after the first one arrives.
+    """
+    def __init__(self, predictor, max_batch=64, max_wait=0.005):
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.tickers = set(predictor.tickers)
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.served = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, ticker, window, raw=False):
+        """Queue one window; returns a Future resolving to that ticker's forecast dict."""
+        # the artifact answers unknown tickers with NaN rather than failing
+        if ticker not in self.tickers:
+            raise ValueError(f"Unknown ticker {ticker!r}, the artifact has no stats for it")
+        window = np.asarray(window, dtype=np.float32)
+        expected = (self.predictor.sequence_length, len(self.predictor.features))
+        if window.shape != expected:
+            raise ValueError(f"Expected bars of shape {expected}, got {window.shape}")
+        future = Future()
+        self.requests.put((ticker, window, bool(raw), future))
+        return future
+
+    def predict(self, ticker, window, raw=False, timeout=None):
+        return self.submit(ticker, window, raw).result(timeout)
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # raw and normalized windows go through different signatures
+            for raw in (False, True):
+                group = [request for request in batch if request[2] == raw]
+                if group:
+                    self._answer(group, raw)
+            self.batches += 1
+            self.served += len(batch)
+
+    def _answer(self, group, raw):
+        tickers = [ticker for ticker, _, _, _ in group]
+        try:
+            out = self.predictor.predict(tickers, np.stack([window for _, window, _, _ in group]), raw=raw)
+        except Exception as e:
+            for *_, future in group:
+                future.set_exception(e)
+            return
+
+        for i, (ticker, _, _, future) in enumerate(group):
+            future.set_result({'ticker': ticker,
+                               'prediction': float(out['prediction'][i]),
+                               'next_close': float(out['next_close'][i]),
+                               'last_close': float(out['last_close'][i]),
+                               'direction': 'UP' if out['direction'][i] > 0 else 'DOWN'})
+
+def make_handler(batcher, timeout=5.0):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._send(404, {'error': f"Unknown path {self.path}"})
+            predictor = batcher.predictor
+            self._send(200, {'tickers': len(predictor.tickers),
+                             'features': predictor.features,
+                             'sequence_length': predictor.sequence_length,
+                             'horizon': predictor.horizon,
+                             'batches': batcher.batches,
+                             'served': batcher.served})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                return self._send(404, {'error': f"Unknown path {self.path}"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                result = batcher.predict(request['ticker'], request['bars'], request.get('raw', False), timeout)
+            except (KeyError, ValueError) as e:
+                return self._send(400, {'error': str(e)})
+            except Exception as e:
+                return self._send(500, {'error': str(e)})
+            self._send(200, result)
+
+        def log_message(self, format, *args):
+            pass  # one line per tick would drown the console
+
+    return Handler
+
+class Server(ThreadingHTTPServer):
+    # the stdlib default backlog of 5 resets connections under a burst of concurrent callers
+    request_queue_size = 128
+    daemon_threads = True
+
+def make_server(batcher, host="127.0.0.1", port=8500):
+    return Server((host, port), make_handler(batcher))
+
+def forecast(url, ticker, bars, raw=False, timeout=5.0):
+    """Client helper: POST one window to a running server and return its forecast dict."""
+    body = json.dumps({'ticker': ticker, 'bars': np.asarray(bars).tolist(), 'raw': raw}).encode()
+    request = urllib.request.Request(url.rstrip("/") + "/predict", data=body,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
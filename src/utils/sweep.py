@@ -0,0 +1,185 @@
+"""
+Parallel hyperparameter sweep for the transformer.
+
+prepare() writes the train and validation windows once as memory-mapped
+datasets (utils/mmap_dataset.py); every trial process maps the same files,
+so the data is loaded once per sweep and shared through the page cache.
+The datasets carry the build key of their inputs and are rebuilt when it
+changes.
+
+Trials run in a spawn-context process pool. Each worker is pinned to its own
+slice of cores and caps TF's intra-op threads to match, so N workers do not
+each start one thread per core. Workers import this module before their
+initializer runs, so nothing that imports TensorFlow may be imported at
+module scope here. Per-epoch val_dir_acc of every trial goes to a shared
+dict, and a trial that falls below the median of the others at the same
+epoch (after a grace period) is stopped early.
+"""
+import os
+import time
+import random
+import itertools
+import multiprocessing as mp
+
+import pandas as pd
+
+# Trial values left in transformer.py's comments
+SPACE = {'head_size': [12, 32, 128],
+         'num_heads': [2, 8, 16],
+         'ff_dim': [24, 64, 512],
+         'num_layers': [2, 6],
+         'dropout': [0.1, 0.5, 0.9],
+         'batch_size': [256, 512],
+         'lr_per_sample': [3e-6, 6e-6, 1.2e-5],
+         'lr_ramp': [0.1, 0.25]}
+
+def grid(space=SPACE):
+    """Every combination of space, as a list of parameter dicts."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*space.values())]
+
+def sample(space=SPACE, n=16, seed=42):
+    """n distinct random combinations of space."""
+    trials = grid(space)
+    return random.Random(seed).sample(trials, min(n, len(trials)))
+
+def prepare(path, matrices, means, stds, sequence_length, horizon, key=None):
+    """Write the train and validation windows the trials read, unless they already exist for this build key."""
+    from utils import mmap_dataset
+
+    for split in ('train', 'validation'):
+        split_path = os.path.join(path, split)
+        if not mmap_dataset.has_dataset(split_path, key=key):
+            mmap_dataset.write_dataset(split_path, matrices, means, stds, split=split,
+                                       sequence_length=sequence_length, horizon=horizon, key=key)
+
+def core_slices(workers, threads):
+    """Disjoint core sets, one per worker, out of the cores this process may use."""
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    return [cores[(i * threads) % len(cores):(i * threads) % len(cores) + threads] for i in range(workers)]
+
+##################
+## WORKER STATE ##
+##################
+_worker = {}
+
+def _init_worker(cores, threads, data_path, scores):
+    # runs before this process touches TF, so the thread pools come up at the pinned size
+    core_set = cores.get()
+    if hasattr(os, "sched_setaffinity") and core_set:
+        os.sched_setaffinity(0, core_set)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    _worker.update(data_path=data_path, scores=scores, cores=core_set)
+
+def _median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+def _pruner(trial_id, scores, grace, min_trials):
+    import tensorflow as tf
+
+    class MedianPruner(tf.keras.callbacks.Callback):
+        """Stop when val_dir_acc is below the median of the other trials at this epoch."""
+        pruned = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            history = scores.get(trial_id, []) + [float(logs.get("val_dir_acc", 0.0))]
+            scores[trial_id] = history  # proxies only see reassignment, not in-place appends
+            if epoch + 1 < grace:
+                return
+            others = [h[epoch] for key, h in scores.items() if key != trial_id and len(h) > epoch]
+            if len(others) >= min_trials and history[-1] < _median(others):
+                self.pruned = True
+                self.model.stop_training = True
+
+    return MedianPruner()
+
+def run_trial(trial_id, params, epochs=10, patience=3, grace=2, min_trials=2):
+    """
+    Train one configuration on the shared dataset (inside a pool worker).
+
+    Returns:
+    - dict: params plus best val_dir_acc, the epoch it was reached, epochs run,
+            whether the trial was pruned, and wall time.
+    """
+    import tensorflow as tf
+    from utils import mmap_dataset, models
+
+    start = time.perf_counter()
+    tf.keras.backend.clear_session()
+    tf.keras.utils.set_random_seed(trial_id)
+    data_path = _worker["data_path"]
+    train = mmap_dataset.MmapSequence(os.path.join(data_path, "train"), batch_size=params['batch_size'])
+    validation = mmap_dataset.MmapSequence(os.path.join(data_path, "validation"), batch_size=2048, shuffle=False)
+    input_shape = (train.sequence_length, train.features.shape[1])
+
+    model = models.build_transformer_model(input_shape, params['head_size'], params['num_heads'],
+                                           params['ff_dim'], params['num_layers'], params['dropout'])
+    models.compile_model(model, models.directional_bce_loss)
+
+    lrfn = models.lr_schedule(batch_size=params['batch_size'], epochs=epochs,
+                              ramp=params['lr_ramp'], lr_per_sample=params['lr_per_sample'])
+    pruner = _pruner(trial_id, _worker["scores"], grace, min_trials)
+    callbacks = [tf.keras.callbacks.LearningRateScheduler(lrfn),
+                 tf.keras.callbacks.EarlyStopping(monitor="val_dir_acc", mode="max", patience=patience),
+                 pruner]
+    history = model.fit(train, validation_data=validation, epochs=epochs, callbacks=callbacks, verbose=0)
+
+    scores = history.history["val_dir_acc"]
+    best = max(range(len(scores)), key=scores.__getitem__)
+    return {'trial': trial_id, **params,
+            'val_dir_acc': scores[best],
+            'best_epoch': best + 1,
+            'epochs': len(scores),
+            'pruned': pruner.pruned,
+            'seconds': time.perf_counter() - start,
+            'cores': ",".join(map(str, _worker["cores"]))}
+
+def sweep(data_path, trials, workers=2, threads=None, epochs=10, patience=3, grace=2, min_trials=2,
+          results_path=None):
+    """
+    Run trials in a process pool over a prepare()d dataset.
+
+    Parameters:
+    - data_path (str): Directory written by prepare().
+    - trials (list): Parameter dicts (see grid / sample), with every key of SPACE.
+    - workers (int): Concurrent trial processes.
+    - threads (int): Cores / TF intra-op threads per worker. Default splits the cores evenly.
+    - epochs (int): Epoch budget per trial.
+    - patience (int): EarlyStopping patience on val_dir_acc.
+    - grace (int): Epochs before a trial can be pruned.
+    - min_trials (int): Other trials that must have reached an epoch before pruning at it.
+    - results_path (str): CSV to rewrite after every finished trial.
+
+    Returns:
+    - pandas.DataFrame: One row per trial, best val_dir_acc first.
+    """
+    cores = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else range(os.cpu_count())
+    threads = threads or max(1, len(cores) // workers)
+
+    context = mp.get_context("spawn")  # TF is not fork-safe
+    with context.Manager() as manager:
+        scores = manager.dict()
+        core_queue = manager.Queue()
+        for core_set in core_slices(workers, threads):
+            core_queue.put(core_set)
+
+        rows = []
+        with context.Pool(workers, initializer=_init_worker,
+                          initargs=(core_queue, threads, data_path, scores), maxtasksperchild=None) as pool:
+            pending = [pool.apply_async(run_trial, (i, params, epochs, patience, grace, min_trials))
+                       for i, params in enumerate(trials)]
+            for job in pending:
+                rows.append(job.get())
+                print(f"trial {rows[-1]['trial']}: val_dir_acc={rows[-1]['val_dir_acc']:.4f} "
+                      f"epochs={rows[-1]['epochs']}{' (pruned)' if rows[-1]['pruned'] else ''}")
+                if results_path:
+                    pd.DataFrame(rows).to_csv(results_path, index=False)
+
+    return pd.DataFrame(rows).sort_values('val_dir_acc', ascending=False).reset_index(drop=True)